@@ -1,103 +1,545 @@
 # Kronos Inference Service with FastAPI-or-HTTP fallback
 # - If FastAPI/uvicorn are available, run a FastAPI app
-# - Otherwise, fall back to a built-in http.server that exposes the same /forecast endpoint
+# - Otherwise, fall back to a built-in http.server (fallback.py) that exposes the same endpoints
 
-from typing import List, Optional, Dict, Any
+from collections import Counter
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import List, Optional, Dict, Any, Set, Tuple
+import asyncio
+import functools
 import math
-import json
+import os
+import time
 
-HOST = "127.0.0.1"
-PORT = 8001
+import backend
+import batcher
+from cache import fingerprint
+import cache
+import candle_store
+from candle_store import SeriesNotFound
+from coalesce import FLIGHTS
+import degrade
+from deadline import HEADER_BUDGET, Deadline, DeadlineExceeded, from_budget
+from executor import Saturated
+import executor
+import fallback
+import metrics
+import shmring
+from models import REGISTRY, ModelSpec, ModelUnavailable, UnknownModel, preload_from_env
+from streaming import STREAMS, StreamNotFound
+import wire
 
+HOST = os.environ.get("KRONOS_HOST", "127.0.0.1")
+PORT = int(os.environ.get("KRONOS_PORT", "8001"))
+# co-located callers: KRONOS_UDS serves HTTP on a Unix socket instead of HOST:PORT, and
+# KRONOS_SHM_SOCKET additionally accepts shared-memory ring callers (shmring.py)
+UDS_PATH = os.environ.get("KRONOS_UDS", "")
+SHM_SOCKET = os.environ.get("KRONOS_SHM_SOCKET", "")
+# meta.impl / health "impl": server flavour + signal backend picked by backend.py
+FALLBACK_IMPL = f"http.server+{backend.BACKEND}"
+FASTAPI_IMPL = f"fastapi+{backend.BACKEND}"
+SHM_IMPL = f"shm+{backend.BACKEND}"
 
-def clamp01(x: float) -> float:
-    if not math.isfinite(x):
-        return 0.0
-    return max(0.0, min(1.0, x))
+# Stateless scoring goes through models.REGISTRY: requests pick a model with a "model" field or
+# the X-Kronos-Model header, and each model runs on its own executor (executor.py). Streams keep
+# per-series state for simple_signal only and are always updated inline (O(new candles)).
+STREAM_MODEL = "simple_signal"
 
 
-def simple_signal(ohlcv: List[List[float]]) -> Dict[str, float]:
-    n = len(ohlcv)
-    if n < 10:
-        return {"long": 0.5, "short": 0.5, "conf": 0.4}
+def _overloaded(e: Saturated) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    return {"error": "overloaded", "message": str(e)}, {"Retry-After": str(e.retry_after_s)}
 
-    closes = [row[4] for row in ohlcv[-200:]]  # up to last 200 closes
-    n2 = len(closes)
-    avg20 = sum(closes[-20:]) / max(1, min(20, n2))
-    last = closes[-1]
 
-    # momentum proxy: last close vs 20-avg; normalize by recent std-like proxy
-    diffs = [abs(closes[i] - closes[i - 1]) for i in range(1, n2)]
-    vol = (sum(diffs) / max(1, len(diffs))) or 1.0
-    slope = (last - avg20) / vol
-    # map slope to [0,1] via sigmoid-like
-    long_score = 1.0 / (1.0 + math.exp(-slope))  # (0,1)
-    short_score = 1.0 - long_score
+def _forecast_payload(
+    sig: Dict[str, float], symbol: str, interval: str, n: int, impl: str, spec: ModelSpec
+) -> Dict[str, Any]:
+    return {
+        "score_long": sig["long"],
+        "score_short": sig["short"],
+        "confidence": sig["conf"],
+        "meta": {
+            "version": spec.version,
+            "model": spec.name,
+            "interval": interval,
+            "symbol": symbol,
+            "n": n,
+            "impl": impl,
+        },
+    }
 
-    # confidence: grows with sample size and trend magnitude
-    conf = min(0.9, 0.4 + 0.5 * clamp01(abs(slope) / 3.0) + 0.1 * clamp01(n / 480))
 
-    return {"long": clamp01(long_score), "short": clamp01(short_score), "conf": clamp01(conf)}
+def _health_payload(impl: str, **extra: Any) -> Dict[str, Any]:
+    # /health for both servers; `extra` holds what only one of them knows (the fallback's connections)
+    return {
+        "status": "ok",
+        "impl": impl,
+        "backend": backend.info(),
+        "cache": cache.CACHE.stats(),
+        "executor": executor.stats(),
+        "batching": batcher.stats(),
+        "degradation": degrade.stats(),
+        "coalesce": FLIGHTS.stats(),
+        "models": REGISTRY.status(),
+        "store": candle_store.STORE.stats(),
+        "shm": RING.stats() if RING is not None else None,
+        **extra,
+    }
 
 
-def run_fallback_server():
-    from http.server import BaseHTTPRequestHandler, HTTPServer
-    import json as _json
+def _cached_signals(
+    items: List[Dict[str, Any]], specs: List[ModelSpec]
+) -> List[Tuple[Any, Optional[Dict[str, float]]]]:
+    # cache lookups for decoded items; returns (key, sig-or-None) per item. Items read from the
+    # candle store carry a "ref" tuple and are keyed on it instead of hashing their closes. Keys
+    # are still computed with the cache off, for request coalescing.
+    if not cache.CACHE.enabled and not FLIGHTS.enabled:
+        return [(None, None)] * len(items)
+    out = []
+    for item, spec in zip(items, specs):
+        ref = item.get("ref")
+        if ref is not None:
+            key = ("ref", spec.model_id) + tuple(ref)
+        else:
+            key = fingerprint(
+                item["symbol"], item["interval"], item["ohlcv"], item.get("last_ts"), spec.model_id, spec.lookback
+            )
+        out.append((key, cache.CACHE.get(key)))
+    if cache.CACHE.enabled:
+        hits = sum(sig is not None for _, sig in out)
+        metrics.METRICS.count_cache(hits, len(out) - hits)
+    return out
 
-    class FallbackHandler(BaseHTTPRequestHandler):
-        def _send_json(self, code: int, payload: Dict[str, Any]):
-            body = _json.dumps(payload).encode("utf-8")
-            self.send_response(code)
-            self.send_header("Content-Type", "application/json; charset=utf-8")
-            self.send_header("Content-Length", str(len(body)))
-            self.end_headers()
-            self.wfile.write(body)
 
-        def do_GET(self):  # noqa: N802
-            if self.path == "/health":
-                self._send_json(200, {"status": "ok", "impl": "http.server"})
-            else:
-                self._send_json(404, {"error": "not_found"})
+def _land(
+    idxs: List[int],
+    lookups: List[Tuple[Any, Optional[Dict[str, float]]]],
+    pending: Dict[int, Future],
+    scored: Optional[Future] = None,
+    error: Optional[BaseException] = None,
+) -> None:
+    # complete the futures of items this request scored; the cache is filled before the flight is
+    # released, so an identical request arriving afterwards hits it instead of scoring again
+    if error is None:
+        try:
+            sigs = scored.result()
+        except BaseException as e:  # noqa: BLE001
+            error = e
+    for pos, i in enumerate(idxs):
+        key, fut = lookups[i][0], pending[i]
+        if error is None and key is not None:
+            cache.CACHE.put(key, sigs[pos])
+        if key is not None:
+            FLIGHTS.done(key, fut)
+        if error is None:
+            fut.set_result(sigs[pos])
+        else:
+            fut.set_exception(error)
+
+
+def _score_flight(item: Dict[str, Any], spec: ModelSpec, key: Any, flight: Future, deadline: Optional[Deadline]):
+    # score one item as the leader of `flight`; failing to submit fails the flight
+    try:
+        if deadline is not None:
+            deadline.check()
+        started = time.monotonic()
+        scored = batcher.score(spec.name, spec.execution, [item["ohlcv"]], deadline)
+    except BaseException as e:  # noqa: BLE001
+        _land([0], [(key, None)], {0: flight}, error=e)
+        return
+    scored.add_done_callback(functools.partial(degrade.observe, spec.name, started))
+    scored.add_done_callback(lambda f: _land([0], [(key, None)], {0: flight}, scored=f))
+
+
+def _follow(
+    flight: Future, item: Dict[str, Any], spec: ModelSpec, key: Any, deadline: Optional[Deadline]
+) -> Future:
+    # a follower's result: its flight's, unless the leader's request was shed (its deadline passed
+    # or its client left while the work was queued). Then the item joins a new flight, or leads
+    # one, under this request's own deadline, so one client hanging up never fails the others.
+    out: Future = Future()
+    out.set_running_or_notify_cancel()  # like the flight itself: a waiter going away cannot cancel it
+
+    def landed(f: Future, leader: bool = False) -> None:
+        error = f.exception()
+        if error is None:
+            out.set_result(f.result())
+        elif leader or not isinstance(error, DeadlineExceeded):
+            out.set_exception(error)
+        else:
+            again, leads = FLIGHTS.join(key)
+            if leads:
+                _score_flight(item, spec, key, again, deadline)
+            again.add_done_callback(functools.partial(landed, leader=leads))
+
+    flight.add_done_callback(landed)
+    return out
+
+
+def _submit_misses(
+    items: List[Dict[str, Any]], default_model: Optional[str] = None, deadline: Optional[Deadline] = None
+):
+    # resolve each item's model (its "model" field, else `default_model`, else the registry
+    # default), look results up in the cache and hand each model's misses to its executor in one
+    # call, or to its micro-batcher (batcher.py) which may merge them with other requests' misses.
+    # A miss identical to one already being scored joins that flight instead (coalesce.py).
+    # Misses are submitted with the request's deadline, so they are shed if it passes in a queue;
+    # a flight carries its leader's deadline, and its followers re-submit under their own if the
+    # leader's is what shed it. An overloaded model's items are routed to a cheaper
+    # tier (degrade.py) and looked up and scored as that tier.
+    # Returns (specs, lookups, {index: future of its signal}, indexes that joined a flight,
+    # {index: (tier level, requested model)} for degraded items).
+    # Raises models.UnknownModel for an unregistered name, executor.Saturated when a pool is full
+    # and deadline.DeadlineExceeded when the request expired (or its client left) before this.
+    if deadline is not None:
+        deadline.check()
+    requested = [REGISTRY.resolve(item.get("model") or default_model) for item in items]
+    counts = Counter(spec.name for spec in requested)
+    by_name = {spec.name: spec for spec in requested}
+    routes = {name: degrade.route(by_name[name], count) for name, count in counts.items()}  # once per model
+    specs = [routes[spec.name][0] for spec in requested]
+    degraded = {i: (routes[spec.name][1], spec.name) for i, spec in enumerate(requested) if routes[spec.name][1]}
+    lookups = _cached_signals(items, specs)
+    pending: Dict[int, Future] = {}
+    followers: Set[int] = set()
+    groups: Dict[str, List[int]] = {}
+    for i, (key, sig) in enumerate(lookups):
+        if sig is not None:
+            continue
+        flight, leader = FLIGHTS.join(key)
+        if leader:
+            pending[i] = flight
+            groups.setdefault(specs[i].name, []).append(i)
+        else:
+            pending[i] = _follow(flight, items[i], specs[i], key, deadline)
+            followers.add(i)
+    submitted = 0
+    try:
+        for name, idxs in groups.items():
+            started = time.monotonic()
+            scored = batcher.score(name, specs[idxs[0]].execution, [items[i]["ohlcv"] for i in idxs], deadline)
+            submitted += 1
+            scored.add_done_callback(functools.partial(degrade.observe, name, started))
+            scored.add_done_callback(lambda f, idxs=idxs: _land(idxs, lookups, pending, scored=f))
+    except BaseException as e:
+        # release the flights this request leads but never submitted, failing their followers too
+        for idxs in list(groups.values())[submitted:]:
+            _land(idxs, lookups, pending, error=e)
+        raise
+    return specs, lookups, pending, followers, degraded
+
+
+def _batch_payload(
+    items: List[Dict[str, Any]],
+    specs: List[ModelSpec],
+    lookups: List[Tuple[Any, Optional[Dict[str, float]]]],
+    fresh: Dict[int, Dict[str, float]],
+    impl: str,
+    followers: Set[int] = frozenset(),
+    deadline: Optional[Deadline] = None,
+    degraded: Optional[Dict[int, Tuple[int, str]]] = None,
+) -> Dict[str, Any]:
+    results = []
+    budget_ms = deadline.budget_ms() if deadline is not None else None
+    for i, item in enumerate(items):
+        sig = fresh[i] if i in fresh else lookups[i][1]
+        resp = _forecast_payload(
+            sig,
+            item.get("symbol") or "UNKNOWN",
+            item.get("interval") or "UNKNOWN",
+            len(item["ohlcv"]),
+            impl,
+            specs[i],
+        )
+        resp["meta"]["cached"] = i not in fresh
+        if i in followers:
+            resp["meta"]["coalesced"] = True
+        if budget_ms is not None:
+            resp["meta"]["budget_ms"] = budget_ms
+        if degraded and i in degraded:
+            resp["meta"]["degraded"] = True
+            resp["meta"]["tier"], resp["meta"]["requested"] = degraded[i]
+        results.append(resp)
+    return {"results": results}
+
+
+def _wait_for(pending: Dict[int, Future], deadline: Optional[Deadline]) -> Dict[int, Dict[str, float]]:
+    # results of the pending futures; with a deadline, gives up (raising DeadlineExceeded and
+    # cancelling the deadline so queued work is shed) once it passes or the client disconnects
+    if deadline is None:
+        return {i: future.result() for i, future in pending.items()}
+    fresh = {}
+    for i, future in pending.items():
+        while i not in fresh:
+            try:
+                fresh[i] = future.result(timeout=deadline.wait_s())
+            except FutureTimeout:
+                deadline.check()
+    return fresh
+
+
+def build_batch(
+    items: List[Dict[str, Any]], impl: str, default_model: Optional[str] = None, deadline: Optional[Deadline] = None
+) -> Dict[str, Any]:
+    # one response per decoded item, in request order; cache misses are scored together per model
+    specs, lookups, pending, followers, degraded = _submit_misses(items, default_model, deadline)
+    fresh = _wait_for(pending, deadline)
+    return _batch_payload(items, specs, lookups, fresh, impl, followers, deadline, degraded)
+
+
+def build_forecast(
+    symbol: str,
+    interval: str,
+    ohlcv: Any,
+    impl: str,
+    last_ts: Optional[float] = None,
+    model: Optional[str] = None,
+) -> Dict[str, Any]:
+    # ohlcv is a list of rows, a (rows, 6) array (binary body) or a close vector (JSON body)
+    item = {"symbol": symbol, "interval": interval, "ohlcv": ohlcv, "last_ts": last_ts, "model": model}
+    return build_batch([item], impl)["results"][0]
 
-        def do_POST(self):  # noqa: N802
-            if self.path != "/forecast":
-                self._send_json(404, {"error": "not_found"})
+
+def resolve_ref(ref: Dict[str, Any]) -> Dict[str, Any]:
+    """Forecast item for a /forecast/ref body (see wire.decode_ref_item), read from the candle store.
+
+    Raises candle_store.SeriesNotFound for an unknown series or when no candle is at or before
+    end_ts. The cache reference pins the resolved last candle and the store generation,
+    so any end_ts inside the same candle shares one entry and a re-ingested series starts fresh.
+    """
+    series = candle_store.STORE.series(ref["symbol"], ref["interval"])
+    closes, last_ts = series.window(ref["end_ts"], ref["lookback"])
+    return {
+        "symbol": ref["symbol"],
+        "interval": ref["interval"],
+        "ohlcv": closes,
+        "last_ts": last_ts,
+        "model": ref.get("model"),
+        "ref": (ref["symbol"], ref["interval"], ref["lookback"], last_ts, series.stamp),
+    }
+
+
+def _with_ref_meta(resp: Dict[str, Any], item: Dict[str, Any]) -> Dict[str, Any]:
+    resp["meta"]["ref"] = {"last_ts": item["last_ts"]}
+    return resp
+
+
+def build_stream_forecast(
+    data: Dict[str, Any], impl: str, default_model: Optional[str] = None, deadline: Optional[Deadline] = None
+) -> Dict[str, Any]:
+    # raises StreamNotFound when the service holds no state and the caller did not reset. Stream
+    # updates are O(new candles) and advance per-series state, so they are never shed; the
+    # deadline only reports the remaining budget.
+    spec = REGISTRY.resolve(data.get("model") or default_model)
+    if spec.name != STREAM_MODEL:
+        raise ValueError(f"/forecast/stream only serves {STREAM_MODEL}, not {spec.name!r}")
+    symbol = data.get("symbol") or "UNKNOWN"
+    interval = data.get("interval") or "UNKNOWN"
+    update = wire.decode_stream_item(data)  # rows are applied one by one: reject a bad body before any of them
+    sig, info = STREAMS.update(
+        symbol,
+        interval,
+        update["ohlcv"],
+        reset=update["reset"],
+        lookback=update["lookback"],
+    )
+    resp = _forecast_payload(sig, symbol, interval, info["n"], impl, spec)
+    resp["meta"]["stream"] = {"applied": info["applied"], "last_ts": info["last_ts"]}
+    budget_ms = deadline.budget_ms() if deadline is not None else None
+    if budget_ms is not None:
+        resp["meta"]["budget_ms"] = budget_ms
+    return resp
+
+
+RING_SOCKET = None  # ring doorbell socket bound before fork by serve.py (else SHM_SOCKET is bound here)
+RING: Optional[shmring.RingServer] = None
+
+
+def _ring_forecast(read) -> Tuple[int, int, Tuple[float, float, float]]:
+    # one shared-memory ring call: /forecast for a binary body, answered with the status code
+    # /forecast would send, the result flags and the scores. Recorded under path "shm".
+    stages, arrived = metrics.StageTimer(), time.monotonic()
+    status, flags, scores = 200, 0, (0.0, 0.0, 0.0)
+    try:
+        item, budget_ms = read()
+        stages.lap("decode")
+        deadline = from_budget(str(budget_ms) if budget_ms else None, arrived)
+        resp = build_batch([item], SHM_IMPL, None, deadline)["results"][0]
+        stages.lap("compute")
+        meta = resp["meta"]
+        flags = (
+            (shmring.FLAG_CACHED if meta["cached"] else 0)
+            | (shmring.FLAG_COALESCED if meta.get("coalesced") else 0)
+            | (shmring.FLAG_DEGRADED if meta.get("degraded") else 0)
+        )
+        scores = (resp["score_long"], resp["score_short"], resp["confidence"])
+    except ModelUnavailable:
+        status = 503
+    except Saturated:
+        status = 429
+    except DeadlineExceeded:
+        status = 504
+    except Exception:  # noqa: BLE001  (UnknownModel and malformed slots included)
+        status = 400
+    stages.finish("shm", status)
+    return status, flags, scores
+
+
+def start_ring() -> Optional[shmring.RingServer]:
+    """Serve the shared-memory ring transport when configured (RING_SOCKET or KRONOS_SHM_SOCKET)."""
+    global RING
+    sock = RING_SOCKET if RING_SOCKET is not None else shmring.bind_unix(SHM_SOCKET) if SHM_SOCKET else None
+    if sock is None:
+        return None
+    RING = shmring.RingServer(sock, _ring_forecast).start()
+    print(f"[Kronos] Shared-memory ring callers accepted on {sock.getsockname()}")
+    return RING
+
+
+def stop_ring() -> None:
+    global RING
+    if RING is not None:
+        RING.close()
+        RING = None
+        if RING_SOCKET is None:  # bound by start_ring; a pre-fork supervisor removes its own
+            try:
+                os.unlink(SHM_SOCKET)
+            except OSError:
+                pass
+
+
+class ServiceHandler(fallback.FallbackHandler):
+    # the service's routes on the built-in server (run_fallback_server); FastAPI's are below
+
+    def do_GET(self):  # noqa: N802
+        self._stages = metrics.StageTimer()
+        if self.path == "/metrics":
+            self._send(200, metrics.METRICS.render().encode("utf-8"), metrics.CONTENT_TYPE)
+        elif self.path == "/health":
+            self._send_json(200, _health_payload(FALLBACK_IMPL, connections=self.server.stats()))
+        else:
+            self._send_json(404, {"error": "not_found"})
+
+    def do_POST(self):  # noqa: N802
+        stages = self._stages = metrics.StageTimer()
+        arrived, self._accepted_at = self._accepted_at or time.monotonic(), None
+        raw = self._read_body()
+        if raw is None:
+            return
+        stages.lap("read")
+        if self.path not in ("/forecast", "/forecast/batch", "/forecast/stream", "/forecast/ref"):
+            self._send_json(404, {"error": "not_found"})
+            return
+        model = self.headers.get(wire.HEADER_MODEL)
+        try:
+            deadline = from_budget(self.headers.get(HEADER_BUDGET), arrived, self._client_connected)
+            if self.path == "/forecast":
+                if wire.is_binary(self.headers.get("Content-Type")):
+                    data = wire.decode_request(raw, self.headers)
+                    stages.lap("decode")
+                else:
+                    data = wire.loads(raw)
+                    stages.lap("decode")
+                    data = wire.decode_json_item(data, strict=False)
+                    stages.lap("validate")
+                resp = build_batch([data], FALLBACK_IMPL, model, deadline)["results"][0]
+                stages.lap("compute")
+                self._send_json(200, resp)
+                return
+            data = wire.loads(raw)
+            stages.lap("decode")
+            if self.path == "/forecast/batch":
+                items = data.get("items") or []
+                if not isinstance(items, list):
+                    raise ValueError("items must be a list")
+                items = [wire.decode_json_item(it, strict=False) for it in items]
+                stages.lap("validate")
+                metrics.METRICS.observe_batch(len(items))
+                out = build_batch(items, FALLBACK_IMPL, data.get("model") or model, deadline)
+                stages.lap("compute")
+                self._send_json(200, out)
+                return
+            if self.path == "/forecast/ref":
+                try:
+                    item = resolve_ref(wire.decode_ref_item(data))
+                except SeriesNotFound as e:
+                    self._send_json(404, {"error": "history_not_found", "message": str(e.args[0])})
+                    return
+                stages.lap("validate")  # includes reading the window from the candle store
+                resp = build_batch([item], FALLBACK_IMPL, model, deadline)["results"][0]
+                stages.lap("compute")
+                self._send_json(200, _with_ref_meta(resp, item))
                 return
             try:
-                length = int(self.headers.get("Content-Length", "0"))
-                raw = self.rfile.read(max(0, length))
-                data = _json.loads(raw.decode("utf-8")) if raw else {}
-                ohlcv = data.get("ohlcv") or []
-                symbol = data.get("symbol") or "UNKNOWN"
-                interval = data.get("interval") or "UNKNOWN"
-                sig = simple_signal(ohlcv)
-                resp = {
-                    "score_long": sig["long"],
-                    "score_short": sig["short"],
-                    "confidence": sig["conf"],
-                    "meta": {
-                        "version": "0.1.0",
-                        "interval": interval,
-                        "symbol": symbol,
-                        "n": len(ohlcv),
-                        "impl": "http.server",
-                    },
-                }
+                resp = build_stream_forecast(data, FALLBACK_IMPL, model, deadline)
+                stages.lap("compute")
                 self._send_json(200, resp)
-            except Exception as e:  # noqa: BLE001
-                self._send_json(400, {"error": "bad_request", "message": str(e)})
+            except StreamNotFound as e:
+                self._send_json(409, {"error": "stream_not_found", "message": str(e.args[0])})
+        except UnknownModel as e:
+            self._send_json(400, {"error": "unknown_model", "message": str(e.args[0])})
+        except ModelUnavailable as e:
+            self._send_json(503, {"error": "model_unavailable", "message": str(e)})
+        except Saturated as e:
+            self._send_json(429, *_overloaded(e))
+        except DeadlineExceeded as e:
+            if e.client_gone:
+                self._dropped()  # nobody to answer
+            else:
+                self._send_json(504, {"error": "deadline_exceeded", "message": str(e)})
+        except Exception as e:  # noqa: BLE001
+            self._send_json(400, {"error": "bad_request", "message": str(e)})
+
+
+def run_fallback_server(
+    sock=None,
+    max_requests: int = 0,
+    threads: int = fallback.THREADS,
+    keepalive_s: float = fallback.KEEPALIVE_S,
+    max_connections: int = fallback.MAX_CONNECTIONS,
+):
+    # sock: a listening socket bound by the pre-fork supervisor (serve.py); max_requests > 0
+    # makes the server exit gracefully after that many requests so the supervisor recycles it
+    import signal
+    import threading
 
-    print(f"[Kronos] Starting built-in HTTP server on http://{HOST}:{PORT} (no FastAPI/uvicorn)")
-    httpd = HTTPServer((HOST, PORT), FallbackHandler)
+    settings = {
+        "threads": threads,
+        "keepalive_s": keepalive_s,
+        "max_connections": max_connections,
+        "max_requests": max_requests,
+    }
+    uds = sock is None and UDS_PATH
+    if uds:
+        sock = shmring.bind_unix(UDS_PATH)
+        print(f"[Kronos] Starting built-in HTTP server on unix:{UDS_PATH} (no FastAPI/uvicorn)")
+    if sock is None:
+        print(
+            f"[Kronos] Starting built-in HTTP server on http://{HOST}:{PORT} (no FastAPI/uvicorn, "
+            f"threads={threads}, keepalive={keepalive_s}s)"
+        )
+        httpd = fallback.FallbackServer((HOST, PORT), ServiceHandler, **settings)
+    else:
+        httpd = fallback.FallbackServer.from_socket(sock, ServiceHandler, **settings)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *_: httpd.stop())
+    preload_from_env()  # warms KRONOS_PRELOAD_MODELS in the background; /health answers meanwhile
+    start_ring()
     try:
         httpd.serve_forever()
     finally:
+        stop_ring()
         httpd.server_close()
+        if uds:
+            os.unlink(UDS_PATH)
+
 
 # Try to import FastAPI & pydantic; if unavailable, we'll fallback
 FASTAPI_AVAILABLE = False
 try:
-    from fastapi import FastAPI
+    from fastapi import FastAPI, HTTPException, Request, Response
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.exceptions import RequestValidationError
+    from fastapi.responses import JSONResponse
     from pydantic import BaseModel, Field
     FASTAPI_AVAILABLE = True
 except Exception:
@@ -105,13 +547,63 @@ except Exception:
 
 
 if FASTAPI_AVAILABLE:
-    app = FastAPI(title="Kronos Inference Service", version="0.1.0")
+    from contextlib import asynccontextmanager
+
+    @asynccontextmanager
+    async def lifespan(_app):
+        preload_from_env()  # background thread: the server accepts requests while models load
+        start_ring()
+        try:
+            yield
+        finally:
+            stop_ring()
+
+    app = FastAPI(title="Kronos Inference Service", version="0.1.0", lifespan=lifespan)
+
+    class StageMetrics:
+        # pure ASGI middleware (BaseHTTPMiddleware adds a task and a queue per request): gives each
+        # request a metrics.StageTimer for the endpoints to lap, records "encode" when the response
+        # starts and the request count/latency when it is done
+        def __init__(self, app):
+            self.app = app
+
+        async def __call__(self, scope, receive, send):
+            if scope["type"] != "http":
+                await self.app(scope, receive, send)
+                return
+            stages = metrics.StageTimer()
+            state = scope.setdefault("state", {})
+            state["stages"], state["arrived"] = stages, time.monotonic()
+            status = 500
+
+            async def send_timed(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    stages.encoded()
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_timed)
+            finally:
+                stages.finish(scope["path"], status)
+
+    app.add_middleware(StageMetrics)
+
+    @app.exception_handler(RequestValidationError)
+    async def validation_error(_request: Request, exc: RequestValidationError):
+        # the default handler echoes the offending input, and a NaN/inf input is not valid JSON
+        finite = {float: lambda v: v if math.isfinite(v) else str(v)}
+        return JSONResponse(status_code=422, content={"detail": jsonable_encoder(exc.errors(), custom_encoder=finite)})
 
     class ForecastRequest(BaseModel):
         symbol: str = Field(..., description="e.g. ETH-USDT-SWAP")
         interval: str = Field(..., description="e.g. 1H")
         # OHLCV rows: [timestamp(ms), open, high, low, close, volume]
         ohlcv: List[List[float]]
+        model: Optional[str] = Field(
+            None, description="registered model name; defaults to X-Kronos-Model, then the service default"
+        )
 
     class ForecastResponse(BaseModel):
         score_long: float
@@ -119,75 +611,215 @@ if FASTAPI_AVAILABLE:
         confidence: float
         meta: Optional[Dict[str, Any]] = None
 
-    @app.post("/forecast", response_model=ForecastResponse)
-    async def forecast(req: ForecastRequest):
-        sig = simple_signal(req.ohlcv)
-        return ForecastResponse(
-            score_long=sig["long"],
-            score_short=sig["short"],
-            confidence=sig["conf"],
-            meta={
-                "version": "0.1.0",
-                "interval": req.interval,
-                "symbol": req.symbol,
-                "n": len(req.ohlcv),
-                "impl": "fastapi",
-            },
+    class StreamForecastRequest(ForecastRequest):
+        # only the newly closed candles, unless reset=true seeds the stream with a full window
+        reset: bool = False
+        lookback: Optional[int] = Field(None, ge=1, le=512)
+
+    class RefForecastRequest(BaseModel):
+        # history is read from the service's candle store (candle_store.py) instead of the body
+        symbol: str = Field(..., description="e.g. ETH-USDT-SWAP")
+        interval: str = Field(..., description="e.g. 15m")
+        end_ts: float = Field(
+            ..., allow_inf_nan=False, description="window ends at the last candle at or before this time (ms)"
         )
+        lookback: int = Field(480, ge=1, le=512)
+        model: Optional[str] = None
 
-    def run_fallback_server():
-        from http.server import BaseHTTPRequestHandler, HTTPServer
-        import json as _json
-    
-        class FallbackHandler(BaseHTTPRequestHandler):
-            def _send_json(self, code: int, payload: Dict[str, Any]):
-                body = _json.dumps(payload).encode("utf-8")
-                self.send_response(code)
-                self.send_header("Content-Type", "application/json; charset=utf-8")
-                self.send_header("Content-Length", str(len(body)))
-                self.end_headers()
-                self.wfile.write(body)
-    
-            def do_GET(self):  # noqa: N802
-                if self.path == "/health":
-                    self._send_json(200, {"status": "ok", "impl": "http.server"})
-                else:
-                    self._send_json(404, {"error": "not_found"})
-    
-            def do_POST(self):  # noqa: N802
-                if self.path != "/forecast":
-                    self._send_json(404, {"error": "not_found"})
-                    return
-                try:
-                    length = int(self.headers.get("Content-Length", "0"))
-                    raw = self.rfile.read(max(0, length))
-                    data = _json.loads(raw.decode("utf-8")) if raw else {}
-                    ohlcv = data.get("ohlcv") or []
-                    symbol = data.get("symbol") or "UNKNOWN"
-                    interval = data.get("interval") or "UNKNOWN"
-                    sig = simple_signal(ohlcv)
-                    resp = {
-                        "score_long": sig["long"],
-                        "score_short": sig["short"],
-                        "confidence": sig["conf"],
-                        "meta": {
-                            "version": "0.1.0",
-                            "interval": interval,
-                            "symbol": symbol,
-                            "n": len(ohlcv),
-                            "impl": "http.server",
-                        },
-                    }
-                    self._send_json(200, resp)
-                except Exception as e:  # noqa: BLE001
-                    self._send_json(400, {"error": "bad_request", "message": str(e)})
-    
-        print(f"[Kronos] Starting built-in HTTP server on http://{HOST}:{PORT} (no FastAPI/uvicorn)")
-        httpd = HTTPServer((HOST, PORT), FallbackHandler)
+    class BatchForecastResponse(BaseModel):
+        results: List[ForecastResponse]
+
+    def _decode_batch(raw: bytes, stages: "metrics.StageTimer") -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # items plus the batch-level "model" default
+        data = wire.loads(raw)
+        stages.lap("decode")
+        items = data.get("items") if isinstance(data, dict) else None
+        if not isinstance(items, list):
+            raise ValueError("items is required and must be a list")
+        model = data.get("model")
+        if model is not None and not isinstance(model, str):
+            raise ValueError("model must be a string")
+        items = [wire.decode_json_item(it) for it in items]
+        stages.lap("validate")
+        return items, model
+
+    def _decode_json_or_422(decode):
+        try:
+            return decode()
+        except ValueError as e:
+            raise RequestValidationError([{"type": "value_error", "loc": ["body"], "msg": str(e), "input": None}])
+
+    def _stages(request: Request) -> "metrics.StageTimer":
+        return request.scope.get("state", {}).get("stages") or metrics.StageTimer()
+
+    def _deadline(request: Request) -> Deadline:
+        # budget from X-Kronos-Budget-Ms (or KRONOS_DEFAULT_BUDGET_MS), counted from the middleware
         try:
-            httpd.serve_forever()
+            return from_budget(request.headers.get(HEADER_BUDGET), request.scope.get("state", {}).get("arrived"))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail={"error": "bad_request", "message": str(e)})
+
+    def _unknown_model(e: UnknownModel) -> HTTPException:
+        return HTTPException(status_code=400, detail={"error": "unknown_model", "message": str(e.args[0])})
+
+    async def _client_gone(request: Request) -> None:
+        # the body has been read: the next ASGI message is http.disconnect (or the response ended)
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+
+    async def _await_fresh(
+        pending: Dict[int, Future], deadline: Deadline, request: Request
+    ) -> Dict[int, Dict[str, float]]:
+        # pending results, abandoned (cancelling the deadline, so queued work is shed) when the
+        # deadline passes or the client disconnects first
+        if not pending:
+            return {}
+        waiting = {i: asyncio.wrap_future(f) for i, f in pending.items()}
+        gone = asyncio.ensure_future(_client_gone(request))
+        left = set(waiting.values())
+        try:
+            while left:
+                timeout = None if math.isinf(deadline.expires) else max(0.0, deadline.remaining_s())
+                done, _ = await asyncio.wait(left | {gone}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                left -= done
+                if left and (gone in done or not done):
+                    error = DeadlineExceeded(client_gone=gone in done)
+                    deadline.cancel()
+                    raise error
         finally:
-            httpd.server_close()
+            gone.cancel()
+            for w in waiting.values():
+                # the shared futures are running and stay uncancelled; only these wrappers are dropped
+                w.cancel() if not w.done() else w.exception()
+        return {i: w.result() for i, w in waiting.items()}
+
+    def _deadline_exceeded(e: DeadlineExceeded) -> HTTPException:
+        # 499 (client closed request) is only recorded; nobody reads it
+        code = 499 if e.client_gone else 504
+        return HTTPException(status_code=code, detail={"error": "deadline_exceeded", "message": str(e)})
+
+    async def _build_batch_async(
+        items: List[Dict[str, Any]], impl: str, default_model: Optional[str], request: Request
+    ) -> Dict[str, Any]:
+        # build_batch without blocking the event loop while a pooled executor scores the misses
+        deadline = _deadline(request)
+        try:
+            specs, lookups, pending, followers, degraded = _submit_misses(items, default_model, deadline)
+            fresh = await _await_fresh(pending, deadline, request)
+        except DeadlineExceeded as e:
+            raise _deadline_exceeded(e)
+        except UnknownModel as e:
+            raise _unknown_model(e)
+        except ModelUnavailable as e:
+            raise HTTPException(status_code=503, detail={"error": "model_unavailable", "message": str(e)})
+        except Saturated as e:
+            detail, headers = _overloaded(e)
+            raise HTTPException(status_code=429, detail=detail, headers=headers)
+        return _batch_payload(items, specs, lookups, fresh, impl, followers, deadline, degraded)
+
+    @app.get("/health")
+    async def health():
+        return _health_payload(FASTAPI_IMPL)
+
+    @app.get("/metrics")
+    async def prometheus_metrics():
+        return Response(metrics.METRICS.render(), media_type=metrics.CONTENT_TYPE)
+
+    @app.post(
+        "/forecast",
+        response_model=ForecastResponse,
+        openapi_extra={
+            "requestBody": {
+                "required": True,
+                "content": {
+                    "application/json": {"schema": ForecastRequest.model_json_schema()},
+                    wire.OCTET_STREAM: {"schema": {"type": "string", "format": "binary"}},
+                },
+            }
+        },
+    )
+    async def forecast(request: Request):
+        # JSON bodies skip the pydantic model: the OHLCV grid is validated in bulk by wire.coerce_ohlcv
+        stages = _stages(request)
+        raw = await request.body()
+        stages.lap("read")
+        if wire.is_binary(request.headers.get("content-type")):
+            try:
+                data = wire.decode_request(raw, request.headers)
+            except (ValueError, OSError, EOFError) as e:
+                raise HTTPException(status_code=400, detail={"error": "bad_request", "message": str(e)})
+            stages.lap("decode")
+        else:
+            body = _decode_json_or_422(lambda: wire.loads(raw))
+            stages.lap("decode")
+            data = _decode_json_or_422(lambda: wire.decode_json_item(body))
+            stages.lap("validate")
+        out = await _build_batch_async([data], FASTAPI_IMPL, request.headers.get(wire.HEADER_MODEL), request)
+        stages.lap("compute")
+        return ForecastResponse(**out["results"][0])
+
+    @app.post(
+        "/forecast/batch",
+        response_model=BatchForecastResponse,
+        openapi_extra={
+            "requestBody": {
+                "required": True,
+                "content": {
+                    "application/json": {
+                        "schema": {
+                            "type": "object",
+                            "required": ["items"],
+                            "properties": {
+                                "items": {"type": "array", "items": ForecastRequest.model_json_schema()},
+                                "model": {"type": "string", "description": "default model for the items"},
+                            },
+                        }
+                    }
+                },
+            }
+        },
+    )
+    async def forecast_batch(request: Request):
+        stages = _stages(request)
+        raw = await request.body()
+        stages.lap("read")
+        items, model = _decode_json_or_422(lambda: _decode_batch(raw, stages))
+        metrics.METRICS.observe_batch(len(items))
+        out = await _build_batch_async(items, FASTAPI_IMPL, model or request.headers.get(wire.HEADER_MODEL), request)
+        stages.lap("compute")
+        return BatchForecastResponse(results=[ForecastResponse(**r) for r in out["results"]])
+
+    @app.post("/forecast/ref", response_model=ForecastResponse)
+    async def forecast_ref(req: RefForecastRequest, request: Request):
+        # pydantic read, parsed and validated the body before this runs: all of it counts as "validate"
+        stages = _stages(request)
+        try:
+            item = resolve_ref(req.model_dump())
+        except SeriesNotFound as e:
+            raise HTTPException(status_code=404, detail={"error": "history_not_found", "message": str(e.args[0])})
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail={"error": "bad_request", "message": str(e)})
+        stages.lap("validate")
+        out = await _build_batch_async([item], FASTAPI_IMPL, request.headers.get(wire.HEADER_MODEL), request)
+        stages.lap("compute")
+        return ForecastResponse(**_with_ref_meta(out["results"][0], item))
+
+    @app.post("/forecast/stream", response_model=ForecastResponse)
+    async def forecast_stream(req: StreamForecastRequest, request: Request):
+        stages = _stages(request)
+        stages.lap("validate")  # body read, parsed and validated by pydantic
+        try:
+            out = build_stream_forecast(
+                req.model_dump(), FASTAPI_IMPL, request.headers.get(wire.HEADER_MODEL), _deadline(request)
+            )
+        except StreamNotFound as e:
+            raise HTTPException(status_code=409, detail={"error": "stream_not_found", "message": str(e.args[0])})
+        except UnknownModel as e:
+            raise _unknown_model(e)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail={"error": "bad_request", "message": str(e)})
+        stages.lap("compute")
+        return ForecastResponse(**out)
 
     if __name__ == "__main__":
         # Allow launching with: python app.py
@@ -197,7 +829,7 @@ if FASTAPI_AVAILABLE:
             print("[Kronos] FastAPI available but uvicorn missing:", e)
             run_fallback_server()
         else:
-            uvicorn.run("app:app", host=HOST, port=PORT, workers=1, log_level="info")
+            uvicorn.run("app:app", host=HOST, port=PORT, uds=UDS_PATH or None, workers=1, log_level="info")
 
 if not FASTAPI_AVAILABLE and __name__ == "__main__":
     run_fallback_server()
\ No newline at end of file
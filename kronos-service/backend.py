@@ -0,0 +1,38 @@
+# Signal-math backend, picked once at import
+# - numpy: vectorized batch scoring, array-based request decoding and rolling kernels
+# - python: the pure-Python reference code; always available (edge boxes without numpy)
+# - KRONOS_SIGNAL_BACKEND=auto (default) takes the fastest importable backend in BACKENDS order;
+#   naming one forces it, and a forced numpy that cannot be imported falls back to python
+# Modules test NUMPY_AVAILABLE (re-exported by signal_engine), so forcing python behaves exactly
+# like a box without numpy.
+
+import os
+import sys
+
+BACKENDS = ("numpy", "python")  # fastest first
+REQUESTED = os.environ.get("KRONOS_SIGNAL_BACKEND", "auto").strip().lower() or "auto"
+
+if REQUESTED not in ("auto",) + BACKENDS:
+    print(f"[Kronos] unknown KRONOS_SIGNAL_BACKEND={REQUESTED!r}; using auto", file=sys.stderr)
+    REQUESTED = "auto"
+
+np = None
+if REQUESTED != "python":
+    try:
+        import numpy as np  # type: ignore
+    except Exception:  # numpy is optional; the reference implementation works without it
+        np = None
+        if REQUESTED == "numpy":
+            print("[Kronos] KRONOS_SIGNAL_BACKEND=numpy but numpy is not importable; using python", file=sys.stderr)
+
+NUMPY_AVAILABLE = np is not None
+BACKEND = "numpy" if NUMPY_AVAILABLE else "python"
+
+
+def info() -> dict:
+    """Backend summary for /health."""
+    return {
+        "active": BACKEND,
+        "requested": REQUESTED,
+        "numpy": getattr(np, "__version__", None),
+    }
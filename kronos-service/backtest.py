@@ -0,0 +1,237 @@
+# Offline simple_signal scoring over historical candle files
+# - Streams the top-level JSON array (data/*.json: [{"timestamp", "open", ..., "close", ...}, ...] or
+#   [[ts, o, h, l, c, v], ...]) instead of loading the whole document
+# - Scores every rolling window of `lookback` candles with streaming.StreamState: each candle
+#   updates the rolling sums in O(1) instead of re-slicing 200 closes
+# - Writes one line per candle timestamp: CSV (default) or JSON lines
+# - --workers N splits the history into shards scored in a process pool; each shard replays
+#   enough earlier candles to rebuild the exact rolling state, so the output is byte-identical
+#   to single-process scoring
+#
+# Usage: python backtest.py data/real_historical_data_2022_2024.json -o scores.csv [--lookback 480] [--workers N]
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from array import array
+import argparse
+import json
+import math
+import sys
+
+from streaming import DEFAULT_LOOKBACK, REANCHOR_EVERY, StreamState
+
+CHUNK_SIZE = 1 << 20
+_SKIP = " \t\r\n,"
+HEADERS = {"csv": "timestamp,score_long,score_short,confidence\n", "jsonl": ""}
+
+
+def iter_json_array(fp: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array, reading `fp` in chunks."""
+    decode = json.JSONDecoder().raw_decode
+    buf, pos, eof, opened = "", 0, False, False
+    while True:
+        while pos < len(buf) and buf[pos] in _SKIP:
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                raise ValueError("unexpected end of file inside the JSON array")
+            buf, pos = fp.read(chunk_size), 0
+            eof = not buf
+            continue
+        if not opened:
+            if buf[pos] != "[":
+                raise ValueError("expected a top-level JSON array")
+            opened = True
+            pos += 1
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            value, end = decode(buf, pos)
+        except json.JSONDecodeError:
+            value, end = None, -1
+            if eof:
+                raise
+        if end < 0 or (end == len(buf) and not eof):
+            # element cut by the chunk boundary (a number can decode early): read more and retry
+            chunk = fp.read(chunk_size)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+            continue
+        yield value
+        pos = end
+
+
+def candle_row(candle: Any) -> List[float]:
+    """[timestamp, open, high, low, close, volume] from a candle object or row."""
+    if isinstance(candle, dict):
+        return [
+            candle["timestamp"],
+            candle.get("open", 0.0),
+            candle.get("high", 0.0),
+            candle.get("low", 0.0),
+            candle["close"],
+            candle.get("volume", 0.0),
+        ]
+    if isinstance(candle, (list, tuple)) and len(candle) >= 5:
+        return list(candle)
+    raise ValueError(f"unrecognised candle: {candle!r}")
+
+
+def iter_candles(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[List[float]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for candle in iter_json_array(f, chunk_size):
+            yield candle_row(candle)
+
+
+def score_rows(
+    rows: Iterable[List[float]], lookback: int = DEFAULT_LOOKBACK
+) -> Iterator[Tuple[Any, Dict[str, float]]]:
+    """(timestamp, signal) per candle; the signal equals simple_signal on the trailing `lookback` rows.
+
+    Candles must be in time order. Like /forecast/stream, an older candle is skipped and a repeated
+    timestamp replaces the previous close.
+    """
+    # re-anchor after every REANCHOR_EVERY-th applied candle, counted from the start of the file,
+    # so that score_sharded can reproduce the same float state from any shard boundary
+    state = StreamState(lookback, reanchor_every=0)
+    applied = 0
+    for row in rows:
+        if state.apply((row,)):
+            applied += 1
+            if applied % REANCHOR_EVERY == 0:
+                state.reanchor()
+            yield row[0], state.signal()
+
+
+def _format_ts(ts: Any) -> str:
+    return str(int(ts)) if float(ts).is_integer() else repr(float(ts))
+
+
+def format_score(ts: Any, sig: Dict[str, float], fmt: str = "csv") -> str:
+    # floats use repr(), which round-trips exactly, so outputs can be compared byte for byte
+    if fmt == "csv":
+        return f"{_format_ts(ts)},{sig['long']!r},{sig['short']!r},{sig['conf']!r}\n"
+    if fmt == "jsonl":
+        return (
+            f'{{"timestamp":{_format_ts(ts)},"score_long":{sig["long"]!r},'
+            f'"score_short":{sig["short"]!r},"confidence":{sig["conf"]!r}}}\n'
+        )
+    raise ValueError(f"unknown output format {fmt!r}")
+
+
+def write_scores(scores: Iterable[Tuple[Any, Dict[str, float]]], out: TextIO, fmt: str = "csv") -> int:
+    if fmt not in HEADERS:
+        raise ValueError(f"unknown output format {fmt!r}")
+    out.write(HEADERS[fmt])
+    count = 0
+    for ts, sig in scores:
+        out.write(format_score(ts, sig, fmt))
+        count += 1
+    return count
+
+
+def load_events(rows: Iterable[List[float]]) -> Tuple["array[float]", "array[float]"]:
+    """Timestamps and closes of the candles score_rows would apply (older candles dropped)."""
+    ts, closes = array("d"), array("d")
+    last = None
+    for row in rows:
+        t = row[0]
+        if last is not None and t < last:
+            continue
+        ts.append(t)
+        closes.append(float(row[4]))
+        last = t
+    return ts, closes
+
+
+def plan_shards(ts: "array[float]", lookback: int, shards: int) -> List[Tuple[int, int, int]]:
+    """(warm_from, start, stop) per shard over the applied candles `ts`.
+
+    Scoring from `warm_from` matches single-process scoring from `start` on when the state is
+    re-anchored at the same positions and has seen `lookback` new candles before the last anchor
+    point at or before `start`: the re-anchor recomputes both rolling sums from the close window,
+    and the window length n has saturated. A repeated timestamp replaces a close rather than adding
+    one, so warm-up counts new candles, not positions.
+    """
+    total = len(ts)
+    size = max(1, math.ceil(total / max(1, shards)))
+    plan = []
+    for start in range(0, total, size):
+        anchor = start - start % REANCHOR_EVERY  # the state is re-anchored right after candle anchor-1
+        warm, pushed = anchor, 0
+        while warm > 0 and pushed < lookback:
+            warm -= 1
+            if warm == 0 or ts[warm] != ts[warm - 1]:
+                pushed += 1
+        plan.append((warm, start, min(total, start + size)))
+    return plan
+
+
+def _score_shard(task: Tuple["array[float]", "array[float]", int, int, int, str]) -> str:
+    ts, closes, warm_from, start, lookback, fmt = task
+    state = StreamState(lookback, reanchor_every=0)
+    lines = []
+    for k in range(len(ts)):
+        i = warm_from + k
+        state.apply(((ts[k], 0.0, 0.0, 0.0, closes[k]),))
+        if (i + 1) % REANCHOR_EVERY == 0:
+            state.reanchor()
+        if i >= start:
+            lines.append(format_score(ts[k], state.signal(), fmt))
+    return "".join(lines)
+
+
+def score_sharded(
+    rows: Iterable[List[float]],
+    out: TextIO,
+    lookback: int = DEFAULT_LOOKBACK,
+    fmt: str = "csv",
+    workers: int = 2,
+    shards: int = 0,
+) -> int:
+    """write_scores(score_rows(rows, lookback), out, fmt) across `workers` processes.
+
+    The candles are streamed into two float arrays (16 bytes per candle), split into `shards`
+    (default 4 per worker) and scored in order-preserving chunks.
+    """
+    if fmt not in HEADERS:
+        raise ValueError(f"unknown output format {fmt!r}")
+    ts, closes = load_events(rows)
+    tasks = [
+        (ts[warm:stop], closes[warm:stop], warm, start, lookback, fmt)
+        for warm, start, stop in plan_shards(ts, lookback, shards or workers * 4)
+    ]
+    out.write(HEADERS[fmt])
+    with ProcessPoolExecutor(max(1, workers)) as pool:
+        for text in pool.map(_score_shard, tasks):
+            out.write(text)
+    return len(ts)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Score every rolling window of a historical candle file")
+    parser.add_argument("input", help="JSON array of candles, e.g. data/real_historical_data_2022_2024.json")
+    parser.add_argument("-o", "--output", default="-", help="output file ('-' = stdout)")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    parser.add_argument(
+        "--lookback", type=int, default=DEFAULT_LOOKBACK, help="candles per window (service default 480)"
+    )
+    parser.add_argument("--workers", type=int, default=1, help="processes; >1 scores time shards in parallel")
+    parser.add_argument("--shards", type=int, default=0, help="shards for --workers > 1 (default 4 per worker)")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="\n")
+    try:
+        rows = iter_candles(args.input)
+        if args.workers > 1:
+            count = score_sharded(rows, out, args.lookback, args.format, args.workers, args.shards)
+        else:
+            count = write_scores(score_rows(rows, args.lookback), out, args.format)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"[Kronos] scored {count} windows from {args.input}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# Adaptive micro-batching of model calls
+# - Cache misses of concurrent requests for the same model are collected for up to
+#   KRONOS_BATCH_WAIT_MS or until KRONOS_BATCH_MAX series, then scored by one executor call:
+#   score_many stacks equal-length close vectors, so a burst of /forecast calls (every symbol's
+#   candle closing in the same second) costs one vectorized pass instead of one call each
+# - Adaptive: the wait only applies while requests arrive closer together than the window; a
+#   lone request under sparse traffic is dispatched at once and pays no added latency
+# - KRONOS_BATCH_WAIT_MS=0 (default) disables it; KRONOS_BATCH_WAIT_MS_<MODEL> overrides per model
+# - Realized batch sizes: batcher.stats() in /health, kronos_model_batch_size in /metrics
+# - Requests whose deadline (deadline.py) passed while queued are dropped at dispatch
+
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import os
+import threading
+import math
+import time
+
+from deadline import Deadline
+from executor import executor_for
+import metrics
+from models import score_with
+
+DEFAULT_WAIT_MS = float(os.environ.get("KRONOS_BATCH_WAIT_MS", "0"))
+DEFAULT_MAX_BATCH = int(os.environ.get("KRONOS_BATCH_MAX", "64"))
+
+
+class MicroBatcher:
+    def __init__(
+        self, model: str, execution: Optional[str] = None, max_wait_ms: float = DEFAULT_WAIT_MS,
+        max_batch: int = DEFAULT_MAX_BATCH,
+    ):
+        self.model = model
+        self.execution = execution
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._queue: Deque[Tuple[List[Any], Future, Optional[Deadline]]] = deque()
+        self._queued = 0  # series in _queue
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None  # started on first use, i.e. after fork()
+        self._last_arrival = 0.0
+        self._gap_s = float("inf")  # EWMA of the time between submissions
+        self.batches = 0
+        self.items = 0
+        self.largest = 0
+        self.shed = 0
+
+    def submit(self, series: List[Any], deadline: Optional[Deadline] = None) -> Future:
+        """Future of score_with(model, series), possibly scored together with other callers' series."""
+        fut: Future = Future()
+        fut.set_running_or_notify_cancel()
+        with self._cond:
+            now = time.monotonic()
+            if self._last_arrival:
+                gap = now - self._last_arrival
+                self._gap_s = gap if self._gap_s == float("inf") else 0.8 * self._gap_s + 0.2 * gap
+            self._last_arrival = now
+            self._queue.append((series, fut, deadline))
+            self._queued += len(series)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"kronos-batch-{self.model}", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return fut
+
+    def _take(self) -> List[Tuple[List[Any], Future, Optional[Deadline]]]:
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            if self._gap_s < self.max_wait_s:  # bursty: hold the batch open for more callers
+                deadline = time.monotonic() + self.max_wait_s
+                while self._queued < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            # whole requests only; one larger than max_batch still goes out on its own
+            taken, size = [], 0
+            while self._queue and (not taken or size + len(self._queue[0][0]) <= self.max_batch):
+                chunk = self._queue.popleft()
+                taken.append(chunk)
+                size += len(chunk[0])
+            self._queued -= size
+            return taken
+
+    def _run(self) -> None:
+        while True:
+            self._dispatch(self._take())
+
+    def _dispatch(self, chunks: List[Tuple[List[Any], Future, Optional[Deadline]]]) -> None:
+        live = []
+        for chunk in chunks:
+            deadline = chunk[2]
+            if deadline is not None and deadline.expired():
+                chunk[1].set_exception(deadline.error())
+            else:
+                live.append(chunk)
+        with self._cond:
+            self.shed += len(chunks) - len(live)
+        if not live:
+            return
+        series = [s for chunk, _, _ in live for s in chunk]
+        # the batch is dropped in the executor queue only once every caller's deadline has passed
+        deadlines = [d for _, _, d in live]
+        latest = None if None in deadlines else Deadline(max(d.expires for d in deadlines))
+        if latest is not None and math.isinf(latest.expires):
+            latest = None
+        with self._cond:
+            self.batches += 1
+            self.items += len(series)
+            self.largest = max(self.largest, len(series))
+        metrics.METRICS.observe_model_batch(len(series))
+        try:
+            scored = executor_for(self.model, self.execution).submit(score_with, self.model, series, deadline=latest)
+        except BaseException as e:  # noqa: BLE001  (executor.Saturated: every caller answers 429)
+            for _, fut, _ in live:
+                fut.set_exception(e)
+            return
+        scored.add_done_callback(lambda f: self._split(f, live))
+
+    @staticmethod
+    def _split(scored: Future, chunks: List[Tuple[List[Any], Future, Optional[Deadline]]]) -> None:
+        try:
+            sigs = scored.result()
+        except BaseException as e:  # noqa: BLE001
+            for _, fut, _ in chunks:
+                fut.set_exception(e)
+            return
+        pos = 0
+        for chunk, fut, _ in chunks:
+            fut.set_result(sigs[pos : pos + len(chunk)])
+            pos += len(chunk)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "max_wait_ms": self.max_wait_s * 1000.0,
+                "max_batch": self.max_batch,
+                "queued": self._queued,
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "largest": self.largest,
+                "shed": self.shed,
+            }
+
+
+_BATCHERS: Dict[str, Optional[MicroBatcher]] = {}
+_BATCHERS_LOCK = threading.Lock()
+
+
+def batcher_for(model: str, execution: Optional[str] = None) -> Optional[MicroBatcher]:
+    """Batcher for `model`, or None when its wait (KRONOS_BATCH_WAIT_MS[_<MODEL>]) is 0."""
+    with _BATCHERS_LOCK:
+        if model not in _BATCHERS:
+            env_wait = os.environ.get(f"KRONOS_BATCH_WAIT_MS_{model.upper().replace('-', '_')}")
+            wait_ms = float(env_wait) if env_wait is not None else DEFAULT_WAIT_MS
+            _BATCHERS[model] = MicroBatcher(model, execution, wait_ms) if wait_ms > 0 else None
+        return _BATCHERS[model]
+
+
+def score(model: str, execution: Optional[str], series: List[Any], deadline: Optional[Deadline] = None) -> Future:
+    """Future of the signals of `series` under `model`: micro-batched if enabled, else one executor call.
+
+    Raises executor.Saturated when the call is not batched and the model's pool is full.
+    """
+    batcher = batcher_for(model, execution)
+    if batcher is not None:
+        return batcher.submit(series, deadline)
+    metrics.METRICS.observe_model_batch(len(series))
+    return executor_for(model, execution).submit(score_with, model, series, deadline=deadline)
+
+
+def stats() -> Dict[str, Any]:
+    with _BATCHERS_LOCK:
+        batchers = [b for b in _BATCHERS.values() if b is not None]
+    return {b.model: b.stats() for b in batchers}
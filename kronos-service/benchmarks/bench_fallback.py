@@ -0,0 +1,65 @@
+# Fallback http.server throughput: serial HTTP/1.0 handler vs thread pool, with and without reuse
+# Usage: python benchmarks/bench_fallback.py [--concurrency 1,16,64] [--requests 2000] [--rows 480]
+#
+# "serial" reproduces the original server (KRONOS_FALLBACK_THREADS=0, KRONOS_KEEPALIVE_S=0):
+# one connection at a time, closed after every response. "close" and "keepalive" run the
+# default configuration; their callers open a new connection per request or reuse one, so
+# the last table is the connection-reuse gain. All run without FastAPI so app.py takes the
+# fallback path; the result cache is disabled so every request is scored.
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_validation import make_body  # noqa: E402
+from loadgen import run_load, start_server, stop_server  # noqa: E402
+
+SERVER_CODE = "import sys; sys.modules['fastapi'] = None; import app; app.run_fallback_server()"
+
+SERIAL = {"KRONOS_FALLBACK_THREADS": "0", "KRONOS_KEEPALIVE_S": "0"}
+THREADED = {"KRONOS_FALLBACK_THREADS": "32", "KRONOS_KEEPALIVE_S": "5"}
+MODES = {  # server settings, callers reuse connections
+    "serial": (SERIAL, False),
+    "close": (THREADED, False),
+    "keepalive": (THREADED, True),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", default="1,16,64")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=480)
+    parser.add_argument("--port", type=int, default=8031)
+    args = parser.parse_args()
+
+    body = make_body(args.rows)
+    results = {}
+    for mode, (env, keepalive) in MODES.items():
+        proc = start_server(SERVER_CODE, args.port, {**env, "KRONOS_CACHE_SIZE": "0"})
+        try:
+            for c in (int(x) for x in args.concurrency.split(",")):
+                results[(mode, c)] = run_load(
+                    "127.0.0.1", args.port, "/forecast", body,
+                    concurrency=c, requests=args.requests, keepalive=keepalive,
+                )
+        finally:
+            stop_server(proc)
+
+    print(f"rows={args.rows} requests={args.requests} body={len(body)}B")
+    print(f"{'mode':>9} {'conc':>5} {'rps':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for (mode, c), r in results.items():
+        print(f"{mode:>9} {c:>5} {r['rps']:>9.1f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['errors']:>7}")
+    print(f"{'conc':>5} {'reuse gain':>11} {'p50 close':>10} {'p50 reuse':>10}")
+    for c in (int(x) for x in args.concurrency.split(",")):
+        close, reuse = results[("close", c)], results[("keepalive", c)]
+        gain = reuse["rps"] / close["rps"] if close["rps"] else float("nan")
+        print(f"{c:>5} {gain:>10.2f}x {close['p50_ms']:>10.2f} {reuse['p50_ms']:>10.2f}")
+    print(json.dumps({f"{m}@{c}": r for (m, c), r in results.items()}))
+
+
+if __name__ == "__main__":
+    main()
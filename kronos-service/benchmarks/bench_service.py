@@ -0,0 +1,139 @@
+# End-to-end benchmark matrix for the service: server mode x endpoint x keep-alive x rows x concurrency
+# Usage: python benchmarks/bench_service.py [--modes fastapi,fallback] [--endpoints forecast,batch]
+#            [--rows 10,200,480,512] [--concurrency 1,16,64] [--keepalive on,off] [--requests 1000]
+#            [--source history|sample] [--batch 16] [--workers 0] [--cache] [--env K=V ...] [-o results.json]
+#
+# Payloads are distinct windows (--source history cuts them out of data/historical_data.json,
+# sample tiles sample.json), sent in rotation. The result cache is off unless --cache, so every
+# request is scored. --workers N runs the server through serve.py with N pre-forked workers.
+# Each row reports throughput, p50/p95/p99 latency and CPU per request: the server's (process
+# plus workers, from /proc) and the load generator's own, which shows when the client is the
+# bottleneck. Batch rows also report items/s. Client and server share the machine.
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loadgen import (  # noqa: E402
+    HISTORY_PATH,
+    batch_bodies,
+    forecast_bodies,
+    history_windows,
+    process_cpu_seconds,
+    run_load,
+    sample_windows,
+    start_server,
+    stop_server,
+)
+
+NO_FASTAPI = "import sys; sys.modules['fastapi'] = None; "
+SERVERS = {
+    "fastapi": "import os, uvicorn, app; uvicorn.run(app.app, host='127.0.0.1', port=int(os.environ['KRONOS_PORT']), "
+    "log_level='warning')",
+    "fallback": NO_FASTAPI + "import app; app.run_fallback_server()",
+}
+PREFORK = "import serve; serve.main(['--workers', '{workers}', '--host', '127.0.0.1'])"
+WINDOWS = 64  # distinct payloads per row count
+
+
+def server_code(mode: str, workers: int) -> str:
+    if workers <= 0:
+        return SERVERS[mode]
+    code = PREFORK.format(workers=workers)
+    return code if mode == "fastapi" else NO_FASTAPI + code
+
+
+def payloads(source: str, rows: int, endpoint: str, batch: int):
+    windows = history_windows(rows, WINDOWS) if source == "history" else sample_windows(rows, WINDOWS)
+    if endpoint == "batch":
+        return "/forecast/batch", batch_bodies(windows, batch), batch
+    return "/forecast", forecast_bodies(windows), 1
+
+
+def bench_one(pid: int, port: int, path: str, bodies, concurrency: int, requests: int, keepalive: bool):
+    run_load("127.0.0.1", port, path, bodies, concurrency=concurrency, requests=min(requests, 50))  # warm up
+    server_cpu = process_cpu_seconds(pid)
+    client_cpu = time.process_time()
+    result = run_load("127.0.0.1", port, path, bodies, concurrency=concurrency, requests=requests, keepalive=keepalive)
+    client_cpu = time.process_time() - client_cpu
+    done = max(1, result["requests"])
+    if server_cpu is not None:
+        server_cpu = process_cpu_seconds(pid) - server_cpu
+        result["server_cpu_ms"] = server_cpu * 1000.0 / done
+    else:
+        result["server_cpu_ms"] = float("nan")
+    result["client_cpu_ms"] = client_cpu * 1000.0 / done
+    return result
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Kronos service benchmark matrix")
+    parser.add_argument("--modes", default="fastapi,fallback")
+    parser.add_argument("--endpoints", default="forecast,batch")
+    parser.add_argument("--rows", default="10,200,480,512")
+    parser.add_argument("--concurrency", default="1,16,64")
+    parser.add_argument("--keepalive", default="on,off")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--source", choices=("history", "sample"), default="history")
+    parser.add_argument("--batch", type=int, default=16, help="items per /forecast/batch request")
+    parser.add_argument("--workers", type=int, default=0, help="pre-forked workers via serve.py (0 = one process)")
+    parser.add_argument("--cache", action="store_true", help="keep the result cache on")
+    parser.add_argument("--env", nargs="*", default=[], help="server settings, e.g. KRONOS_BATCH_WAIT_MS=2")
+    parser.add_argument("--port", type=int, default=8041)
+    parser.add_argument("-o", "--output", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.source == "history" and not os.path.exists(HISTORY_PATH):
+        parser.error(f"{HISTORY_PATH} not found; use --source sample")
+    modes = args.modes.split(",")
+    unknown = [m for m in modes if m not in SERVERS]
+    if unknown:
+        parser.error(f"unknown modes {unknown}; choose from {list(SERVERS)}")
+    if "fastapi" in modes:
+        try:
+            import fastapi  # noqa: F401
+            import uvicorn  # noqa: F401
+        except Exception:  # noqa: BLE001
+            print("[bench] fastapi/uvicorn not installed: skipping the fastapi mode", file=sys.stderr)
+            modes.remove("fastapi")
+
+    env = {} if args.cache else {"KRONOS_CACHE_SIZE": "0", "KRONOS_SHARED_CACHE_SLOTS": "0"}
+    env.update(kv.split("=", 1) for kv in args.env)
+    results = []
+    print(
+        f"{'mode':>8} {'endpoint':>8} {'ka':>3} {'rows':>5} {'conc':>5} {'rps':>9} {'items/s':>9} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'p99 ms':>8} {'srv cpu':>8} {'cli cpu':>8} {'err':>5}"
+    )
+    for mode in modes:
+        proc = start_server(server_code(mode, args.workers), args.port, env)
+        try:
+            for endpoint in args.endpoints.split(","):
+                for rows in (int(r) for r in args.rows.split(",")):
+                    path, bodies, items = payloads(args.source, rows, endpoint, args.batch)
+                    for keepalive in (k == "on" for k in args.keepalive.split(",")):
+                        for conc in (int(c) for c in args.concurrency.split(",")):
+                            r = bench_one(proc.pid, args.port, path, bodies, conc, args.requests, keepalive)
+                            r.update(mode=mode, endpoint=endpoint, keepalive=keepalive, rows=rows,
+                                     concurrency=conc, items_per_s=r["rps"] * items, workers=args.workers)
+                            results.append(r)
+                            print(
+                                f"{mode:>8} {endpoint:>8} {'on' if keepalive else 'off':>3} {rows:>5} {conc:>5} "
+                                f"{r['rps']:>9.1f} {r['items_per_s']:>9.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+                                f"{r['p99_ms']:>8.2f} {r['server_cpu_ms']:>8.3f} {r['client_cpu_ms']:>8.3f} "
+                                f"{r['errors']:>5}",
+                                flush=True,
+                            )
+        finally:
+            stop_server(proc)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# Co-located transports: HTTP over TCP vs HTTP over a Unix socket vs the shared-memory ring
+# Usage: python benchmarks/bench_transport.py [--requests 5000] [--rows 480] [--server fallback|fastapi] [--no-cache]
+#
+# One caller sends binary /forecast bodies back to back on a kept-alive connection (the ring
+# sends the same rows through shmring.RingClient). With the result cache on (default) every
+# call after the first is a cache hit, so the numbers are transport overhead; --no-cache scores
+# every call. The TCP server also serves the ring; the Unix socket one runs separately.
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loadgen import SERVICE_DIR, percentile, sample_windows, start_server, stop_server  # noqa: E402
+import shmring  # noqa: E402
+import wire  # noqa: E402
+
+SERVERS = {
+    "fallback": "import sys; sys.modules['fastapi'] = None; import app; app.run_fallback_server()",
+    "fastapi": "import runpy; runpy.run_path('app.py', run_name='__main__')",
+}
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str):
+        super().__init__("localhost", timeout=10)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.unix_path)
+
+
+def _start_unix_server(code: str, path: str, env) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-c", code],
+        cwd=SERVICE_DIR,
+        env={**os.environ, **env, "KRONOS_UDS": path},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            conn = UnixHTTPConnection(path)
+            conn.request("GET", "/health")
+            conn.getresponse().read()
+            conn.close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"server on {path} did not become healthy")
+
+
+def _time_calls(call, requests: int):
+    call()  # warm-up (and, with the cache on, the one scored call)
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        "rps": len(latencies) / sum(latencies),
+        "p50_us": percentile(latencies, 50) * 1e6,
+        "p99_us": percentile(latencies, 99) * 1e6,
+    }
+
+
+def _http_call(conn: http.client.HTTPConnection, body: bytes):
+    headers = {"Content-Type": wire.OCTET_STREAM, wire.HEADER_SYMBOL: "ETH-USDT-SWAP", wire.HEADER_INTERVAL: "15m"}
+
+    def call():
+        conn.request("POST", "/forecast", body=body, headers=headers)
+        resp = conn.getresponse()
+        json.loads(resp.read())
+        assert resp.status == 200, resp.status
+
+    return call
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rows", type=int, default=480)
+    parser.add_argument("--server", choices=sorted(SERVERS), default="fallback")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--port", type=int, default=8032)
+    args = parser.parse_args()
+
+    body = wire.encode_ohlcv(sample_windows(args.rows, 1)[0])
+    tmp = tempfile.mkdtemp(prefix="kronos-bench-")
+    ring_path, uds_path = os.path.join(tmp, "ring.sock"), os.path.join(tmp, "http.sock")
+    env = {"KRONOS_CACHE_SIZE": "0"} if args.no_cache else {}
+    results = {}
+
+    proc = start_server(SERVERS[args.server], args.port, {**env, "KRONOS_SHM_SOCKET": ring_path})
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", args.port, timeout=10)
+        results["tcp"] = _time_calls(_http_call(conn, body), args.requests)
+        conn.close()
+        client = shmring.RingClient(ring_path, max_rows=args.rows)
+
+        def ring_call():
+            assert client.forecast(body, "ETH-USDT-SWAP", "15m")["status"] == 200
+
+        results["shm ring"] = _time_calls(ring_call, args.requests)
+        client.close()
+    finally:
+        stop_server(proc)
+
+    proc = _start_unix_server(SERVERS[args.server], uds_path, env)
+    try:
+        conn = UnixHTTPConnection(uds_path)
+        results["unix"] = _time_calls(_http_call(conn, body), args.requests)
+        conn.close()
+    finally:
+        stop_server(proc)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"server={args.server} rows={args.rows} requests={args.requests} cache={'off' if args.no_cache else 'on'}")
+    print(f"{'transport':>9} {'rps':>9} {'p50 us':>8} {'p99 us':>8} {'vs tcp':>7}")
+    for name in ("tcp", "unix", "shm ring"):
+        r = results[name]
+        gain = r["rps"] / results["tcp"]["rps"]
+        print(f"{name:>9} {r['rps']:>9.1f} {r['p50_us']:>8.1f} {r['p99_us']:>8.1f} {gain:>6.2f}x")
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Per-request CPU of /forecast body handling: pydantic model vs bulk validation
+# Usage: python benchmarks/bench_validation.py [--rows 10,200,480,512] [--iterations 2000]
+#
+# "pydantic" is the previous hot path as FastAPI runs it: json.loads of the body, then
+# ForecastRequest validation of every nested float, then simple_signal on the lists.
+# "bulk" is the current one: wire.decode_json_request (shape check + close column only)
+# followed by score_series.
+
+import argparse
+import json
+import os
+import sys
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+import wire  # noqa: E402
+from signal_engine import NUMPY_AVAILABLE, score_series, simple_signal  # noqa: E402
+
+
+def make_body(rows: int) -> bytes:
+    with open(os.path.join(SERVICE_DIR, "sample.json"), "r", encoding="utf-8") as f:
+        sample = json.load(f)
+    base = sample["ohlcv"]
+    ohlcv = []
+    for i in range(rows):
+        ts, o, h, l, c, v = base[i % len(base)]
+        drift = (i // len(base)) * 3.5
+        ohlcv.append([ts + i * 3_600_000, o + drift, h + drift, l + drift, c + drift, v])
+    return json.dumps({"symbol": sample["symbol"], "interval": sample["interval"], "ohlcv": ohlcv}).encode("utf-8")
+
+
+def cpu_per_call(fn, body: bytes, iterations: int) -> float:
+    fn(body)  # warm up
+    start = time.process_time()
+    for _ in range(iterations):
+        fn(body)
+    return (time.process_time() - start) / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", default="10,200,480,512")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    try:
+        from pydantic import BaseModel
+    except Exception:  # noqa: BLE001
+        BaseModel = None
+
+    paths = {}
+    if BaseModel is not None:
+        from typing import List
+
+        class ForecastRequest(BaseModel):
+            symbol: str
+            interval: str
+            ohlcv: List[List[float]]
+
+        def pydantic_path(body: bytes):
+            req = ForecastRequest.model_validate(json.loads(body))
+            return simple_signal(req.ohlcv)
+
+        paths["pydantic"] = pydantic_path
+
+    def bulk_path(body: bytes):
+        data = wire.decode_json_request(body)
+        return score_series(data["ohlcv"])
+
+    paths["bulk"] = bulk_path
+
+    print(f"numpy={'yes' if NUMPY_AVAILABLE else 'no'} iterations={args.iterations}")
+    print(f"{'rows':>6} {'bytes':>8} " + " ".join(f"{name + ' us':>12}" for name in paths) + f" {'speedup':>8}")
+    for rows in (int(r) for r in args.rows.split(",")):
+        body = make_body(rows)
+        costs = {name: cpu_per_call(fn, body, args.iterations) * 1e6 for name, fn in paths.items()}
+        speedup = costs["pydantic"] / costs["bulk"] if "pydantic" in costs else float("nan")
+        print(f"{rows:>6} {len(body):>8} " + " ".join(f"{costs[n]:>12.1f}" for n in paths) + f" {speedup:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
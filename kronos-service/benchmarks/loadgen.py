@@ -0,0 +1,208 @@
+# Closed-loop HTTP load generator used by the benchmark scripts
+# - `concurrency` threads each send requests back to back until `requests` are done in total
+# - keep-alive reuses one connection per thread; otherwise every request opens a new one
+# - payloads: windows tiled from sample.json or cut out of data/historical_data.json
+# - server CPU is read from /proc for the server process and its workers (Linux)
+
+from typing import Dict, List, Mapping, Optional, Sequence, Union
+import http.client
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_PATH = os.path.join(os.path.dirname(SERVICE_DIR), "data", "historical_data.json")
+
+
+def sample_windows(rows: int, count: int) -> List[List[List[float]]]:
+    """`count` distinct windows of `rows` candles tiled from sample.json (each shifted in price)."""
+    with open(os.path.join(SERVICE_DIR, "sample.json"), "r", encoding="utf-8") as f:
+        base = json.load(f)["ohlcv"]
+    windows = []
+    for k in range(count):
+        window = []
+        for i in range(rows):
+            ts, o, h, l, c, v = base[i % len(base)]
+            drift = (i // len(base)) * 3.5 + k * 0.25
+            window.append([ts + i * 3_600_000, o + drift, h + drift, l + drift, c + drift, v])
+        windows.append(window)
+    return windows
+
+
+def history_windows(rows: int, count: int, path: str = HISTORY_PATH, seed: int = 7) -> List[List[List[float]]]:
+    """`count` windows of `rows` consecutive candles at random offsets of a historical_data.json file."""
+    with open(path, "r", encoding="utf-8") as f:
+        candles = json.load(f)
+    series = [[c["timestamp"], c["open"], c["high"], c["low"], c["close"], c["volume"]] for c in candles]
+    if len(series) < rows:
+        raise ValueError(f"{path} has {len(series)} candles, fewer than {rows}")
+    rng = random.Random(seed)
+    starts = [rng.randrange(len(series) - rows + 1) for _ in range(count)]
+    return [series[s : s + rows] for s in starts]
+
+
+def forecast_bodies(windows: Sequence[List[List[float]]], symbol: str = "ETH-USDT-SWAP", interval: str = "15m"):
+    """One /forecast JSON body per window."""
+    return [json.dumps({"symbol": symbol, "interval": interval, "ohlcv": w}).encode("utf-8") for w in windows]
+
+
+def batch_bodies(
+    windows: Sequence[List[List[float]]], batch: int, symbol: str = "ETH-USDT-SWAP", interval: str = "15m"
+) -> List[bytes]:
+    """/forecast/batch bodies of `batch` items each, cycling through `windows`."""
+    items = [{"symbol": symbol, "interval": interval, "ohlcv": w} for w in windows]
+    count = max(1, len(items) // batch)
+    return [
+        json.dumps({"items": [items[(k * batch + j) % len(items)] for j in range(batch)]}).encode("utf-8")
+        for k in range(count)
+    ]
+
+
+def process_cpu_seconds(pid: int) -> Optional[float]:
+    """user + system CPU of `pid` and its live descendants (pre-forked workers); None without /proc."""
+    tick = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+    stats: Dict[int, List[str]] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return None
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # fields after the parenthesised command name: state ppid ... utime(12) stime(13)
+                stats[int(entry)] = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+    if pid not in stats:
+        return None
+    tree, frontier = {pid}, [pid]
+    while frontier:
+        parent = frontier.pop()
+        for child, fields in stats.items():
+            if int(fields[1]) == parent and child not in tree:
+                tree.add(child)
+                frontier.append(child)
+    return sum(int(stats[p][11]) + int(stats[p][12]) for p in tree) / tick
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[idx]
+
+
+def run_load(
+    host: str,
+    port: int,
+    path: str,
+    body: Union[bytes, Sequence[bytes]],
+    headers: Optional[Mapping[str, str]] = None,
+    concurrency: int = 8,
+    requests: int = 2000,
+    keepalive: bool = True,
+    timeout_s: float = 10.0,
+) -> Dict[str, float]:
+    """Send `requests` POSTs with `concurrency` callers; returns throughput and latency stats (ms).
+
+    `body` may be a list of bodies, sent in rotation so that consecutive requests differ.
+    """
+    bodies = [body] if isinstance(body, bytes) else list(body)
+    hdrs = {"Content-Type": "application/json", **(headers or {})}
+    if not keepalive:
+        hdrs["Connection"] = "close"
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def caller():
+        conn = None
+        local: List[float] = []
+        local_errors = 0
+        while True:
+            n = next(counter)
+            if n >= requests:
+                break
+            start = time.perf_counter()
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection(host, port, timeout=timeout_s)
+                conn.request("POST", path, body=bodies[n % len(bodies)], headers=hdrs)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status != 200:
+                    local_errors += 1
+                if not keepalive or resp.will_close:
+                    conn.close()
+                    conn = None
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                if conn is not None:
+                    conn.close()
+                conn = None
+                continue
+            local.append((time.perf_counter() - start) * 1000.0)
+        if conn is not None:
+            conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=caller) for _ in range(concurrency)]
+    wall = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - wall
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / wall if wall > 0 else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def start_server(code: str, port: int, env: Optional[Mapping[str, str]] = None) -> subprocess.Popen:
+    """Run `code` (a Python snippet that serves on `port`) in a subprocess and wait for /health."""
+    proc_env = {**os.environ, "KRONOS_PORT": str(port), **(env or {})}
+    proc = subprocess.Popen(
+        [sys.executable, "-c", code],
+        cwd=SERVICE_DIR,
+        env=proc_env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1).read()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                break
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"server on port {port} did not become healthy")
+
+
+def stop_server(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
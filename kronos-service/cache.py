@@ -0,0 +1,184 @@
+# Forecast result caches
+# - ForecastCache: in-process LRU with TTL, bounded by entry count
+# - Keyed on the series fingerprint: (model@version, symbol, interval, n, last timestamp, hash of the close tail)
+# - SharedForecastCache: fixed-slot table in shared memory for pre-forked workers (serve.py)
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from array import array
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+
+from signal_engine import NUMPY_AVAILABLE, np
+
+TAIL = 200  # closes that determine simple_signal's output
+
+
+def fingerprint(
+    symbol: str, interval: str, ohlcv: Any, last_ts: Optional[float], model: str = "", tail: int = TAIL
+) -> Tuple[Any, ...]:
+    """Cache key for a series given as rows, a (rows, cols) array or a vector of closes.
+
+    `model` is the model id and `tail` the number of trailing closes the model reads.
+    """
+    n = len(ohlcv)
+    if NUMPY_AVAILABLE and isinstance(ohlcv, np.ndarray):
+        closes = ohlcv[-tail:] if ohlcv.ndim == 1 else ohlcv[-tail:, 4]
+        raw = np.ascontiguousarray(closes, dtype=np.float64).tobytes()
+    elif isinstance(ohlcv, array):
+        raw = ohlcv[-tail:].tobytes()
+    else:
+        raw = array("d", (float(row[4]) for row in ohlcv[-tail:])).tobytes()
+    digest = hashlib.blake2b(raw, digest_size=16).digest()
+    # float() so JSON ints and binary float64 timestamps produce the same key (and repr)
+    return (model, symbol, interval, n, None if last_ts is None else float(last_ts), digest)
+
+
+class ForecastCache:
+    def __init__(self, max_entries: int = 4096, ttl_s: float = 300.0):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_s = float(ttl_s)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_s > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "shared": False,
+            }
+
+
+_SLOT = struct.Struct("<16sd3d8s")  # key digest, expiry (wall clock), long, short, conf, checksum
+_BODY = _SLOT.size - 8
+
+
+class SharedForecastCache:
+    """Direct-mapped signal cache in an anonymous shared mapping, inherited across fork().
+
+    Each slot holds one entry; a colliding put overwrites it. Writes are a single slice
+    assignment without locks, and every slot carries a checksum of its contents, so a read that
+    races a writer sees a torn slot as a miss instead of returning mixed data. Only signal dicts
+    ({"long", "short", "conf"}) can be stored. Counters are per process.
+    """
+
+    enabled = True
+
+    def __init__(self, slots: int = 65536, ttl_s: float = 300.0):
+        self.slots = max(1, int(slots))
+        self.ttl_s = float(ttl_s)
+        self._mm = mmap.mmap(-1, self.slots * _SLOT.size)  # MAP_SHARED | MAP_ANONYMOUS
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _locate(self, key: Hashable) -> Tuple[bytes, int]:
+        digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).digest()
+        return digest, (int.from_bytes(digest[:8], "little") % self.slots) * _SLOT.size
+
+    def _read(self, offset: int) -> Optional[Tuple[bytes, float, float, float, float]]:
+        raw = self._mm[offset:offset + _SLOT.size]
+        digest, expires_at, long_, short, conf, check = _SLOT.unpack(raw)
+        if expires_at == 0.0 or hashlib.blake2b(raw[:_BODY], digest_size=8).digest() != check:
+            return None
+        return digest, expires_at, long_, short, conf
+
+    def get(self, key: Hashable) -> Optional[Dict[str, float]]:
+        digest, offset = self._locate(key)
+        entry = self._read(offset)
+        if entry is None or entry[0] != digest:
+            self.misses += 1
+            return None
+        if entry[1] <= time.time():
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {"long": entry[2], "short": entry[3], "conf": entry[4]}
+
+    def put(self, key: Hashable, value: Dict[str, float]) -> None:
+        digest, offset = self._locate(key)
+        now = time.time()
+        current = self._read(offset)
+        if current is not None and current[0] != digest and current[1] > now:
+            self.evictions += 1
+        body = _SLOT.pack(digest, now + self.ttl_s, value["long"], value["short"], value["conf"], b"")[:_BODY]
+        self._mm[offset:offset + _SLOT.size] = body + hashlib.blake2b(body, digest_size=8).digest()
+
+    def clear(self) -> None:
+        self._mm[:] = bytes(len(self._mm))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "slots": self.slots,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            "shared": True,
+        }
+
+
+CACHE = ForecastCache(
+    max_entries=int(os.environ.get("KRONOS_CACHE_SIZE", "4096")),
+    ttl_s=float(os.environ.get("KRONOS_CACHE_TTL_S", "300")),
+)
@@ -0,0 +1,330 @@
+# Memory-mapped columnar candle store
+# - One directory per series: <root>/<symbol>/<interval>/ with a little-endian int64 timestamp
+#   index (timestamp.i64, ascending, unique) and one contiguous float64 file per field
+#   (open.f64, high.f64, low.f64, close.f64, volume.f64), described by meta.json
+# - Readers mmap the files read-only, so every worker process shares one page-cache copy
+# - window(symbol, interval, end_ts, n) binary-searches the index and returns the last n closes
+#   at or before end_ts as a zero-copy view (NumPy) or a small array('d') copy
+# - The converter ingests data/*.json candle arrays and OKX cache/*.json responses, merging with
+#   what the store already holds; a series is rewritten into a fresh directory and swapped in,
+#   with a new generation id in meta.json that tells readers (and /forecast/ref cache keys) to
+#   re-open it
+#
+# Usage: python candle_store.py convert ../data/real_historical_data_2022_2024.json ../cache/*.json
+#        python candle_store.py ls
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from array import array
+from urllib.parse import parse_qs, urlparse
+import argparse
+import bisect
+import json
+import mmap
+import os
+import re
+import shutil
+import sys
+import threading
+import uuid
+
+from signal_engine import NUMPY_AVAILABLE, np
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ROOT = os.environ.get(
+    "KRONOS_STORE_DIR", os.path.join(os.path.dirname(SERVICE_DIR), "data", "candle-store")
+)
+FIELDS = ("open", "high", "low", "close", "volume")
+FORMAT_VERSION = 1
+_NAME = re.compile(r"^[A-Za-z0-9._-]+$")
+# OKX bar names by candle spacing, for files that do not say which interval they hold
+BAR_BY_MS = {
+    60_000: "1m", 180_000: "3m", 300_000: "5m", 900_000: "15m", 1_800_000: "30m", 3_600_000: "1H",
+    7_200_000: "2H", 14_400_000: "4H", 21_600_000: "6H", 43_200_000: "12H", 86_400_000: "1D",
+    604_800_000: "1W",
+}
+
+
+class SeriesNotFound(KeyError):
+    """Raised when the store holds no candles for a (symbol, interval), or none at or before end_ts."""
+
+
+def _check_name(value: str, what: str) -> str:
+    if not isinstance(value, str) or not _NAME.match(value):
+        raise ValueError(f"invalid {what} {value!r}")
+    return value
+
+
+def _generation(path: str) -> str:
+    """Generation id of the series directory `path`; raises FileNotFoundError when it has none."""
+    with open(os.path.join(path, "meta.json"), "rb") as f:
+        st = os.fstat(f.fileno())
+        meta = json.loads(f.read())
+    # series converted before generation ids existed: the file's identity, best effort
+    return meta.get("generation") or f"{st.st_ino}:{st.st_mtime_ns}"
+
+
+def _map(path: str) -> Optional[mmap.mmap]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class Series:
+    """Read-only mapping of one (symbol, interval) directory."""
+
+    def __init__(self, path: str, stamp: str = ""):
+        if sys.byteorder != "little":
+            raise RuntimeError("the candle store format is little-endian")
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"unsupported candle store version in {path}: {self.meta.get('version')}")
+        self.path = path
+        self.stamp = self.meta.get("generation") or stamp  # changes whenever the converter rewrites the series
+        self.rows = int(self.meta["rows"])
+        self._maps = {}
+        self.timestamps = self._view("timestamp.i64", "q")
+        self.columns = {field: self._view(f"{field}.f64", "d") for field in FIELDS}
+
+    def _view(self, name: str, fmt: str) -> memoryview:
+        mm = _map(os.path.join(self.path, name))
+        self._maps[name] = mm
+        view = memoryview(mm if mm is not None else b"").cast(fmt)
+        if len(view) != self.rows:
+            raise ValueError(f"{name} holds {len(view)} values, meta.json says {self.rows}")
+        return view
+
+    @property
+    def first_ts(self) -> Optional[int]:
+        return self.timestamps[0] if self.rows else None
+
+    @property
+    def last_ts(self) -> Optional[int]:
+        return self.timestamps[-1] if self.rows else None
+
+    def locate(self, end_ts: float) -> int:
+        """Index one past the last candle with timestamp <= end_ts."""
+        return bisect.bisect_right(self.timestamps, end_ts)
+
+    def column(self, field: str, start: int, stop: int) -> Any:
+        view = self.columns[field][start:stop]
+        if NUMPY_AVAILABLE:
+            return np.frombuffer(view, dtype="<f8")
+        out = array("d")
+        out.frombytes(view.cast("B"))
+        return out
+
+    def window(self, end_ts: float, n: int) -> Tuple[Any, int]:
+        """(closes, last_ts) of the last `n` candles at or before `end_ts`."""
+        stop = self.locate(end_ts)
+        if stop == 0:
+            raise SeriesNotFound(f"no candles at or before {end_ts} (series starts at {self.first_ts})")
+        start = max(0, stop - max(1, int(n)))
+        return self.column("close", start, stop), self.timestamps[stop - 1]
+
+    def close(self) -> None:
+        for view in [self.timestamps, *self.columns.values()]:
+            view.release()
+        for mm in self._maps.values():
+            if mm is not None:
+                mm.close()
+
+
+class CandleStore:
+    """Directory of Series, opened lazily and re-opened when the converter swaps a series in."""
+
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = root
+        self._open: Dict[Tuple[str, str], Series] = {}
+        self._lock = threading.Lock()
+
+    def _dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, _check_name(symbol, "symbol"), _check_name(interval, "interval"))
+
+    def series(self, symbol: str, interval: str) -> Series:
+        path = self._dir(symbol, interval)
+        try:
+            # read on every call: inodes are reused, so only the id the converter wrote is reliable
+            stamp = _generation(path)
+        except FileNotFoundError:
+            raise SeriesNotFound(f"no stored candles for {symbol} {interval}") from None
+        key = (symbol, interval)
+        with self._lock:
+            current = self._open.get(key)
+            if current is None or current.stamp != stamp:
+                # the previous Series stays mapped: views handed out earlier may still be in use
+                current = self._open[key] = Series(path, stamp)
+            return current
+
+    def window(self, symbol: str, interval: str, end_ts: float, n: int) -> Tuple[Any, int]:
+        return self.series(symbol, interval).window(end_ts, n)
+
+    def list(self) -> List[Dict[str, Any]]:
+        out = []
+        if not os.path.isdir(self.root):
+            return out
+        for symbol in sorted(os.listdir(self.root)):
+            sym_dir = os.path.join(self.root, symbol)
+            if not _NAME.match(symbol) or not os.path.isdir(sym_dir):
+                continue
+            for interval in sorted(os.listdir(sym_dir)):
+                if ".tmp-" in interval or ".old-" in interval:
+                    continue  # a conversion in progress
+                if not _NAME.match(interval) or not os.path.exists(os.path.join(sym_dir, interval, "meta.json")):
+                    continue
+                s = self.series(symbol, interval)
+                out.append(
+                    {
+                        "symbol": symbol,
+                        "interval": interval,
+                        "rows": s.rows,
+                        "first_ts": s.first_ts,
+                        "last_ts": s.last_ts,
+                    }
+                )
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"root": self.root, "open_series": len(self._open)}
+
+
+# --- conversion -------------------------------------------------------------------------------
+
+
+def infer_interval(timestamps: List[int]) -> str:
+    deltas = sorted(b - a for a, b in zip(timestamps, timestamps[1:]) if b > a)
+    if not deltas:
+        raise ValueError("cannot infer the interval from fewer than two candles; pass --interval")
+    step = deltas[len(deltas) // 2]
+    if step not in BAR_BY_MS:
+        raise ValueError(f"candle spacing of {step} ms is not a known bar; pass --interval")
+    return BAR_BY_MS[step]
+
+
+def _candle(c: Any) -> Tuple[int, Tuple[float, ...]]:
+    if isinstance(c, dict):
+        return int(c["timestamp"]), tuple(float(c.get(f, 0.0)) for f in FIELDS)
+    if isinstance(c, (list, tuple)) and len(c) >= 5:
+        # OKX raw rows are strings: [ts, o, h, l, c, vol, ...]
+        return int(float(c[0])), tuple(float(v) for v in (list(c[1:6]) + [0.0])[:5])
+    raise ValueError(f"unrecognised candle: {c!r}")
+
+
+def read_candle_file(
+    path: str, symbol: Optional[str] = None, interval: Optional[str] = None
+) -> Iterator[Tuple[str, str, Dict[int, Tuple[float, ...]]]]:
+    """Yield (symbol, interval, {timestamp: (open, high, low, close, volume)}) from one file.
+
+    Top-level arrays (data/*.json) are streamed; their symbol comes from `symbol` and their interval
+    from `interval` or the candle spacing. OKX cache entries ({"key": "/api/v5/market/candles?instId=..
+    &bar=..", "item": {"data": [...]}}) carry both in the request key; other cache entries are skipped.
+    """
+    from backtest import iter_json_array
+
+    with open(path, "r", encoding="utf-8") as f:
+        head = f.read(1 << 12).lstrip()
+        f.seek(0)
+        if head.startswith("["):
+            rows = dict(_candle(c) for c in iter_json_array(f))
+            yield symbol or "ETH-USDT-SWAP", interval or infer_interval(sorted(rows)), rows
+            return
+        doc = json.load(f)
+    key = urlparse(str(doc.get("key", "")))
+    if not key.path.endswith("/market/candles") and not key.path.endswith("/market/history-candles"):
+        return
+    query = parse_qs(key.query)
+    data = (doc.get("item") or {}).get("data") or []
+    if not isinstance(data, list) or not data:
+        return
+    yield (
+        symbol or query.get("instId", ["ETH-USDT-SWAP"])[0],
+        interval or query.get("bar", ["1m"])[0],
+        dict(_candle(c) for c in data),
+    )
+
+
+def _read_existing(path: str) -> Dict[int, Tuple[float, ...]]:
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        return {}
+    s = Series(path)
+    try:
+        cols = [s.columns[f] for f in FIELDS]
+        return {s.timestamps[i]: tuple(col[i] for col in cols) for i in range(s.rows)}
+    finally:
+        s.close()
+
+
+def write_series(root: str, symbol: str, interval: str, rows: Dict[int, Tuple[float, ...]]) -> int:
+    """Merge `rows` into the stored series (new values win) and swap the result in; returns rows."""
+    store = CandleStore(root)
+    final = store._dir(symbol, interval)
+    merged = _read_existing(final)
+    merged.update(rows)
+    stamps = sorted(merged)
+
+    tmp = f"{final}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    with open(os.path.join(tmp, "timestamp.i64"), "wb") as f:
+        f.write(array("q", stamps).tobytes())
+    for i, field in enumerate(FIELDS):
+        with open(os.path.join(tmp, f"{field}.f64"), "wb") as f:
+            f.write(array("d", (merged[t][i] for t in stamps)).tobytes())
+    meta = {
+        "version": FORMAT_VERSION,
+        "symbol": symbol,
+        "interval": interval,
+        "rows": len(stamps),
+        "first_ts": stamps[0] if stamps else None,
+        "last_ts": stamps[-1] if stamps else None,
+        "fields": list(FIELDS),
+        "byteorder": "little",
+        "generation": uuid.uuid4().hex,
+    }
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    # readers that already mapped the old files keep them until they re-open the series
+    old = f"{final}.old-{os.getpid()}"
+    if os.path.exists(final):
+        os.replace(final, old)
+    os.replace(tmp, final)
+    shutil.rmtree(old, ignore_errors=True)
+    return len(stamps)
+
+
+def convert(paths: List[str], root: str = DEFAULT_ROOT, symbol: Optional[str] = None, interval: Optional[str] = None):
+    """Ingest candle files into the store; returns {(symbol, interval): stored rows}."""
+    pending: Dict[Tuple[str, str], Dict[int, Tuple[float, ...]]] = {}
+    for path in paths:
+        for sym, ivl, rows in read_candle_file(path, symbol, interval):
+            pending.setdefault((_check_name(sym, "symbol"), _check_name(ivl, "interval")), {}).update(rows)
+    return {key: write_series(root, key[0], key[1], rows) for key, rows in pending.items()}
+
+
+STORE = CandleStore()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build and inspect the memory-mapped candle store")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="store directory (KRONOS_STORE_DIR)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    conv = sub.add_parser("convert", help="ingest data/*.json candle arrays and OKX cache/*.json responses")
+    conv.add_argument("inputs", nargs="+")
+    conv.add_argument("--symbol", help="symbol for files that do not name one (default ETH-USDT-SWAP)")
+    conv.add_argument("--interval", help="interval for files that do not name one (default: from candle spacing)")
+    sub.add_parser("ls", help="list stored series")
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        for (sym, ivl), rows in convert(args.inputs, args.root, args.symbol, args.interval).items():
+            print(f"[Kronos] {sym} {ivl}: {rows} candles in {args.root}")
+    else:
+        for s in CandleStore(args.root).list():
+            print(f"{s['symbol']}\t{s['interval']}\t{s['rows']}\t{s['first_ts']}\t{s['last_ts']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Single-flight coalescing of identical concurrent forecasts
+# - Requests for the same cache key (model, symbol, interval, n, last candle, close digest) that
+#   miss the cache while an identical one is being scored wait for that result instead of
+#   scoring again: a candle close that wakes every Node worker costs one model call
+# - Per process: pre-forked workers (serve.py) coalesce their own requests; once the leader's
+#   result is in the shared cache the other workers hit it
+# - KRONOS_COALESCE=0 disables it
+
+from concurrent.futures import Future
+from typing import Any, Dict, Hashable, Optional, Tuple
+import os
+import threading
+
+ENABLED = os.environ.get("KRONOS_COALESCE", "1").lower() not in ("0", "false", "no")
+
+
+def _running_future() -> Future:
+    fut: Future = Future()
+    fut.set_running_or_notify_cancel()
+    return fut
+
+
+class SingleFlight:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def join(self, key: Optional[Hashable]) -> Tuple[Future, bool]:
+        """(future, leader) for `key`: the leader calls done() and then completes the future.
+
+        The future is already marked running, so a follower that goes away (asyncio.wrap_future
+        cancels its source) cannot cancel the result other requests are waiting for.
+        """
+        if not self.enabled or key is None:
+            return _running_future(), True
+        with self._lock:
+            fut = self._calls.get(key)
+            if fut is not None:
+                self.followers += 1
+                return fut, False
+            fut = self._calls[key] = _running_future()
+            self.leaders += 1
+            return fut, True
+
+    def done(self, key: Hashable, fut: Future) -> None:
+        """Forget `key` so later requests score (or hit the cache) afresh."""
+        with self._lock:
+            if self._calls.get(key) is fut:
+                del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "followers": self.followers,
+            }
+
+
+FLIGHTS = SingleFlight(ENABLED)
@@ -0,0 +1,100 @@
+# Request deadlines
+# - KronosClient gives up after KRONOS_TIMEOUT_MS and scores locally, so it sends that budget in
+#   X-Kronos-Budget-Ms (relative, no clock sync needed); the deadline counts from the request's
+#   arrival (for the fallback server: when its connection was accepted, so time spent queued for a
+#   request thread counts). KRONOS_DEFAULT_BUDGET_MS applies to requests without the header.
+# - Queued work whose deadline has passed is shed instead of scored: in _submit_misses, when an
+#   executor pool picks it up, and when the micro-batcher dispatches
+# - A request whose client disconnects cancels its deadline, which sheds its queued work the same way
+# - Responses carry the remaining budget in meta.budget_ms
+
+from typing import Callable, Optional
+import math
+import os
+import time
+
+HEADER_BUDGET = "X-Kronos-Budget-Ms"
+DEFAULT_BUDGET_MS = float(os.environ.get("KRONOS_DEFAULT_BUDGET_MS", "0"))
+PROBE_INTERVAL_S = 0.05  # how often a waiting request checks that its client is still connected
+
+
+class DeadlineExceeded(RuntimeError):
+    """The request's budget ran out, or its client went away (client_gone), before it was scored."""
+
+    def __init__(self, client_gone: bool = False):
+        super().__init__("client closed the connection" if client_gone else "request deadline exceeded")
+        self.client_gone = client_gone
+
+
+class Deadline:
+    __slots__ = ("expires", "cancelled", "probe")
+
+    def __init__(self, expires: float = math.inf, cancelled: bool = False, probe: Optional[Callable[[], bool]] = None):
+        self.expires = expires  # time.monotonic() value; CLOCK_MONOTONIC is shared with forked pool processes
+        self.cancelled = cancelled
+        self.probe = probe  # returns False once the client has disconnected
+
+    def __reduce__(self):
+        # process-pool executors pickle the deadline; the probe stays behind
+        return Deadline, (self.expires, self.cancelled)
+
+    def remaining_s(self) -> float:
+        return self.expires - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.cancelled or time.monotonic() >= self.expires
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def error(self) -> DeadlineExceeded:
+        # cancelled with budget left: the client disconnected
+        return DeadlineExceeded(client_gone=self.cancelled and time.monotonic() < self.expires)
+
+    def check(self) -> None:
+        """Raise DeadlineExceeded (and cancel) if the budget is spent or the probe reports the client gone."""
+        if self.probe is not None and not self.cancelled and not self.probe():
+            self.cancel()
+            raise DeadlineExceeded(client_gone=True)
+        if self.expired():
+            error = self.error()
+            self.cancel()
+            raise error
+
+    def wait_s(self) -> Optional[float]:
+        """How long to block before the next check(): None = until done."""
+        remaining = max(0.0, self.remaining_s())
+        if self.probe is not None:
+            return min(remaining, PROBE_INTERVAL_S)
+        return None if math.isinf(remaining) else remaining
+
+    def budget_ms(self) -> Optional[float]:
+        """Remaining budget for meta.budget_ms, or None without a deadline."""
+        return None if math.isinf(self.expires) else round(max(0.0, self.remaining_s()) * 1000.0, 1)
+
+
+def from_budget(
+    value: Optional[str], arrived: Optional[float] = None, probe: Optional[Callable[[], bool]] = None
+) -> Deadline:
+    """Deadline for a request that arrived at `arrived` (monotonic) with budget header `value` (ms).
+
+    Raises ValueError for a malformed or non-positive budget.
+    """
+    arrived = time.monotonic() if arrived is None else arrived
+    if value is None:
+        budget_ms = DEFAULT_BUDGET_MS or math.inf
+    else:
+        try:
+            budget_ms = float(value)
+        except ValueError:
+            raise ValueError(f"{HEADER_BUDGET} must be a number of milliseconds") from None
+        if not budget_ms > 0:
+            raise ValueError(f"{HEADER_BUDGET} must be positive")
+    return Deadline(arrived + budget_ms / 1000.0, probe=probe)
+
+
+def run_unless_expired(deadline: Optional[Deadline], fn: Callable, *args):
+    """fn(*args), unless `deadline` expired while the call sat in a queue."""
+    if deadline is not None and deadline.expired():
+        raise deadline.error()
+    return fn(*args)
@@ -0,0 +1,200 @@
+# Graceful degradation ladder
+# - Each model has a ladder of cheaper tiers (KRONOS_DEGRADE_TIERS[_<MODEL>], default
+#   "{model}:50,simple_signal"): "<model>:<rows>" is the same model over a shorter lookback
+#   (models.py), any other name a registered model such as the simple_signal heuristic
+# - A ladder steps down one tier when the tier it routes to has KRONOS_DEGRADE_QUEUE calls
+#   queued or in flight, or when the p95 of its recent calls (queueing included) reaches
+#   KRONOS_DEGRADE_P95_MS; both 0 (default) disables degradation
+# - It steps back up one tier once the tier above has drained and the current one has held for
+#   KRONOS_DEGRADE_HOLD_S: the tier above is probed again, so sustained overload steps straight
+#   back down while a load spike recovers without intervention
+# - Degraded responses carry meta.degraded, meta.tier (1 = first step down) and meta.requested;
+#   transitions and routed counts are in /health under "degradation"
+
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import math
+import os
+import threading
+import time
+
+import batcher
+import executor
+from models import ModelSpec
+import models
+
+DEFAULT_TIERS = os.environ.get("KRONOS_DEGRADE_TIERS", "{model}:50,simple_signal")
+DEFAULT_QUEUE = int(os.environ.get("KRONOS_DEGRADE_QUEUE", "0"))
+DEFAULT_P95_MS = float(os.environ.get("KRONOS_DEGRADE_P95_MS", "0"))
+HOLD_S = float(os.environ.get("KRONOS_DEGRADE_HOLD_S", "5"))
+EVAL_INTERVAL_S = 0.1  # load is re-evaluated at most this often per model, not per request
+WINDOW_S = 10.0  # latency samples older than this are ignored
+MIN_SAMPLES = 20  # p95 needs at least this many samples at the current tier
+
+
+def _model_env(name: str, model: str) -> Optional[str]:
+    return os.environ.get(f"{name}_{model.upper().replace('-', '_')}")
+
+
+class _Latencies:
+    """Recent call latencies of one model: (finished monotonic, seconds)."""
+
+    def __init__(self, size: int = 512):
+        self._samples: Deque[Tuple[float, float]] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append((time.monotonic(), seconds))
+
+    def p95(self, since: float) -> Optional[float]:
+        since = max(since, time.monotonic() - WINDOW_S)
+        with self._lock:
+            recent = sorted(s for t, s in self._samples if t >= since)
+        if len(recent) < MIN_SAMPLES:
+            return None
+        return recent[min(len(recent) - 1, int(math.ceil(0.95 * len(recent))) - 1)]
+
+
+_LATENCIES: Dict[str, _Latencies] = {}  # filled only while some ladder is enabled
+_LATENCIES_LOCK = threading.Lock()
+
+
+def _latencies(model: str) -> _Latencies:
+    with _LATENCIES_LOCK:
+        lat = _LATENCIES.get(model)
+        if lat is None:
+            lat = _LATENCIES[model] = _Latencies()
+        return lat
+
+
+def _depth(model: str) -> int:
+    # calls queued or running for `model`: its executor's in-flight work (inline calls running on request
+    # threads included) plus series waiting in its batcher
+    execution = models.REGISTRY.resolve(model, shortened=True).execution
+    depth = executor.executor_for(model, execution).in_flight
+    mb = batcher.batcher_for(model, execution)
+    return depth + (mb.stats()["queued"] if mb is not None else 0)
+
+
+class Ladder:
+    def __init__(
+        self, model: str, tiers: List[str], max_queue: int = DEFAULT_QUEUE, p95_ms: float = DEFAULT_P95_MS,
+        hold_s: float = HOLD_S,
+    ):
+        self.model = model
+        self.tiers = [model] + [t for t in tiers if t != model]
+        self.max_queue = max(0, max_queue)
+        self.p95_s = max(0.0, p95_ms) / 1000.0
+        self.hold_s = max(0.0, hold_s)
+        self.level = 0
+        self._changed = time.monotonic()
+        self._next_eval = 0.0
+        self._lock = threading.Lock()
+        self.steps_down = 0
+        self.steps_up = 0
+        self.routed = [0] * len(self.tiers)  # items sent to each tier while enabled
+
+    @property
+    def enabled(self) -> bool:
+        return len(self.tiers) > 1 and (self.max_queue > 0 or self.p95_s > 0)
+
+    def _overloaded(self, level: int, since: float) -> bool:
+        name = self.tiers[level]
+        if self.max_queue and _depth(name) >= self.max_queue:
+            return True
+        if self.p95_s:
+            p95 = _latencies(name).p95(since)
+            return p95 is not None and p95 >= self.p95_s
+        return False
+
+    def _evaluate(self, now: float) -> None:
+        with self._lock:
+            if now < self._next_eval:
+                return
+            self._next_eval = now + EVAL_INTERVAL_S
+            if self.level + 1 < len(self.tiers) and self._overloaded(self.level, self._changed):
+                self.level += 1
+                self.steps_down += 1
+                self._changed = now
+            elif (
+                self.level
+                and now - self._changed >= self.hold_s
+                and (not self.max_queue or _depth(self.tiers[self.level - 1]) <= self.max_queue // 2)
+            ):
+                self.level -= 1
+                self.steps_up += 1
+                self._changed = now
+
+    def pick(self, count: int = 1) -> int:
+        """Tier level for the next `count` items (0 = the model itself)."""
+        now = time.monotonic()
+        if now >= self._next_eval:
+            self._evaluate(now)
+        with self._lock:
+            self.routed[self.level] += count
+            return self.level
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tiers": list(self.tiers),
+                "level": self.level,
+                "tier": self.tiers[self.level],
+                "max_queue": self.max_queue,
+                "p95_ms": round(self.p95_s * 1000.0, 3),
+                "steps_down": self.steps_down,
+                "steps_up": self.steps_up,
+                "routed": dict(zip(self.tiers, self.routed)),
+            }
+
+
+_LADDERS: Dict[str, Optional[Ladder]] = {}
+_LADDERS_LOCK = threading.Lock()
+
+
+def ladder_for(model: str) -> Optional[Ladder]:
+    """Ladder for `model`, or None when degradation is off for it (no thresholds or no cheaper tier)."""
+    with _LADDERS_LOCK:
+        if model not in _LADDERS:
+            tiers = _model_env("KRONOS_DEGRADE_TIERS", model) or DEFAULT_TIERS
+            queue = _model_env("KRONOS_DEGRADE_QUEUE", model)
+            p95_ms = _model_env("KRONOS_DEGRADE_P95_MS", model)
+            ladder = Ladder(
+                model,
+                [t.strip().format(model=model) for t in tiers.split(",") if t.strip()],
+                int(queue) if queue is not None else DEFAULT_QUEUE,
+                float(p95_ms) if p95_ms is not None else DEFAULT_P95_MS,
+            )
+            _LADDERS[model] = ladder if ladder.enabled else None
+        return _LADDERS[model]
+
+
+def _active() -> bool:
+    with _LADDERS_LOCK:
+        return any(ladder is not None for ladder in _LADDERS.values())
+
+
+def route(spec: ModelSpec, count: int = 1) -> Tuple[ModelSpec, int]:
+    """(spec to score with, tier level) for `count` items requesting `spec`.
+
+    Raises models.UnknownModel when a configured tier names a model that is not registered.
+    """
+    ladder = ladder_for(spec.name)
+    if ladder is None:
+        return spec, 0
+    level = ladder.pick(count)
+    return (models.REGISTRY.resolve(ladder.tiers[level], shortened=True) if level else spec), level
+
+
+def observe(model: str, started: float, fut: Future) -> None:
+    """Done-callback recording how long a scoring call for `model` took since `started` (monotonic)."""
+    if not fut.cancelled() and fut.exception() is None and _active():
+        _latencies(model).add(time.monotonic() - started)
+
+
+def stats() -> Dict[str, Any]:
+    with _LADDERS_LOCK:
+        ladders = [ladder for ladder in _LADDERS.values() if ladder is not None]
+    return {ladder.model: ladder.stats() for ladder in ladders}
@@ -0,0 +1,158 @@
+# Execution layer for model scoring
+# - inline: run on the calling thread (cheapest for the O(n) heuristic); calls running on request
+#   threads count as in flight, so degrade.py sees inline load too
+# - thread / process: run in a pool so the FastAPI event loop stays free
+# - pooled modes bound in-flight work (running + queued); beyond that submit() raises
+#   Saturated and the HTTP layer answers 429 with Retry-After
+# - work submitted with a deadline (deadline.py) is shed if it expired while queued
+
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import math
+import multiprocessing
+import os
+import threading
+import time
+
+from deadline import Deadline, DeadlineExceeded, run_unless_expired
+
+MODES = ("inline", "thread", "process")
+DEFAULT_MODE = os.environ.get("KRONOS_EXEC_MODE", "inline")
+DEFAULT_WORKERS = int(os.environ.get("KRONOS_EXEC_WORKERS", "0")) or (os.cpu_count() or 1)
+DEFAULT_QUEUE = int(os.environ.get("KRONOS_EXEC_QUEUE", "64"))
+
+
+class Saturated(RuntimeError):
+    """Raised by submit() when a pooled executor already holds its maximum in-flight work."""
+
+    def __init__(self, model: str, retry_after_s: int):
+        super().__init__(f"{model} executor saturated; retry after {retry_after_s}s")
+        self.retry_after_s = retry_after_s
+
+
+class ModelExecutor:
+    def __init__(
+        self, model: str, mode: str = "inline", workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_QUEUE
+    ):
+        if mode not in MODES:
+            raise ValueError(f"unknown execution mode {mode!r}; expected one of {MODES}")
+        self.model = model
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._pool = None  # created lazily so pre-forked workers each get their own
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.shed = 0
+        self._avg_s = 0.0  # EWMA of service time, used for Retry-After
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            if self.mode == "thread":
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix=f"kronos-{self.model}")
+            else:
+                ctx = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=ctx)
+        return self._pool
+
+    def retry_after_s(self) -> int:
+        # time for the current backlog to drain across all workers, at least one second
+        backlog = self.in_flight / self.workers
+        return max(1, int(math.ceil(backlog * (self._avg_s or 0.01))))
+
+    def submit(self, fn: Callable[..., Any], *args: Any, deadline: Optional[Deadline] = None) -> Future:
+        if self.mode == "inline":
+            with self._lock:
+                self.in_flight += 1
+            fut: Future = Future()
+            try:
+                fut.set_result(run_unless_expired(deadline, fn, *args))
+            except BaseException as e:  # noqa: BLE001
+                fut.set_exception(e)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+            return fut
+
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                raise Saturated(self.model, self.retry_after_s())
+            self.in_flight += 1
+            pool = self._ensure_pool()
+        started = time.perf_counter()
+        try:
+            if deadline is not None:
+                fut = pool.submit(run_unless_expired, deadline, fn, *args)
+            else:
+                fut = pool.submit(fn, *args)
+        except BaseException:
+            with self._lock:
+                self.in_flight -= 1
+            raise
+        fut.add_done_callback(lambda f: self._done(started, f))
+        return fut
+
+    def _done(self, started: float, fut: Future) -> None:
+        elapsed = time.perf_counter() - started
+        shed = not fut.cancelled() and isinstance(fut.exception(), DeadlineExceeded)
+        with self._lock:
+            self.in_flight -= 1
+            if shed:
+                self.shed += 1  # dropped at the head of the queue: not a service time sample
+                return
+            self.completed += 1
+            self._avg_s = elapsed if not self._avg_s else 0.9 * self._avg_s + 0.1 * elapsed
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.workers if self.mode != "inline" else 0,
+                "max_queue": self.max_queue if self.mode != "inline" else 0,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "shed": self.shed,
+                "avg_ms": round(self._avg_s * 1000.0, 3),
+            }
+
+
+_EXECUTORS: Dict[str, ModelExecutor] = {}
+_EXECUTORS_LOCK = threading.Lock()
+
+
+def executor_for(model: str, mode: Optional[str] = None) -> ModelExecutor:
+    """Executor for `model`; KRONOS_EXEC_MODE_<MODEL> overrides `mode`, which overrides KRONOS_EXEC_MODE."""
+    with _EXECUTORS_LOCK:
+        ex = _EXECUTORS.get(model)
+        if ex is None:
+            env_mode = os.environ.get(f"KRONOS_EXEC_MODE_{model.upper().replace('-', '_')}")
+            ex = ModelExecutor(model, env_mode or mode or DEFAULT_MODE)
+            _EXECUTORS[model] = ex
+        return ex
+
+
+def stats() -> Dict[str, Any]:
+    with _EXECUTORS_LOCK:
+        executors = list(_EXECUTORS.values())
+    return {ex.model: ex.stats() for ex in executors}
+
+
+def shutdown_all() -> None:
+    # pre-forked workers leave through os._exit, which skips the pools' atexit hooks
+    with _EXECUTORS_LOCK:
+        executors = list(_EXECUTORS.values())
+    for ex in executors:
+        ex.shutdown()
@@ -0,0 +1,325 @@
+# Built-in HTTP server for when FastAPI/uvicorn are not installed (app.run_fallback_server)
+# - HTTP/1.1 keep-alive; every response carries Content-Length, request bodies must too
+# - Connections are handed to a bounded thread pool (KRONOS_FALLBACK_THREADS; 0 serves one
+#   connection at a time). With the pool and keep-alive, a connection holds a thread only while
+#   a request is in progress: between requests it is parked on the keep-alive watcher's selector,
+#   which hands it back to the pool when the next request arrives and closes it after
+#   KRONOS_KEEPALIVE_S idle (0 = HTTP/1.0, close after every response)
+# - At most KRONOS_FALLBACK_MAX_CONNS connections are open at once (served, queued for a thread
+#   or parked; 0 = no cap); beyond that new connections get 503 and are closed
+# - FallbackHandler is the transport: app.py subclasses it with the service's routes
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, List, Optional, Set
+import itertools
+import json
+import os
+import select
+import selectors
+import socket
+import threading
+import time
+
+import metrics
+
+THREADS = int(os.environ.get("KRONOS_FALLBACK_THREADS", "32"))
+KEEPALIVE_S = float(os.environ.get("KRONOS_KEEPALIVE_S", "5"))
+MAX_CONNECTIONS = int(os.environ.get("KRONOS_FALLBACK_MAX_CONNS", "256"))
+
+_FULL_BODY = json.dumps({"error": "too_many_connections"}).encode("utf-8")
+CONNECTIONS_FULL = (
+    b"HTTP/1.1 503 Service Unavailable\r\nContent-Type: application/json; charset=utf-8\r\n"
+    b"Content-Length: %d\r\nRetry-After: 1\r\nConnection: close\r\n\r\n%s" % (len(_FULL_BODY), _FULL_BODY)
+)
+
+
+class FallbackHandler(BaseHTTPRequestHandler):
+    """Keep-alive, parking and response plumbing; subclasses add do_GET/do_POST.
+
+    Routes start a metrics.StageTimer in self._stages; _send/_send_json finish it.
+    """
+
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    parked = False  # idle between requests and held by the server's keep-alive watcher, not a thread
+
+    def setup(self):
+        # HTTP/1.1 keeps connections open between requests; a client stalling mid-request (or
+        # idle, when serial) is dropped after the keep-alive timeout
+        self.protocol_version = "HTTP/1.1" if self.server.keepalive_s > 0 else "HTTP/1.0"
+        self.timeout = self.server.keepalive_s or None
+        if self.request.family == socket.AF_UNIX:
+            self.disable_nagle_algorithm = False  # no TCP_NODELAY on a Unix socket
+        super().setup()
+        # the first request's budget counts from accept(), including the wait for a pool thread
+        self._accepted_at = self.server.accepted.pop(self.request, None)
+
+    def handle(self):
+        self.close_connection = True
+        self.handle_one_request()
+        self._serve_kept_alive()
+
+    def resume(self):
+        # a parked connection turned readable: its next request, or the client closing it
+        self.parked = False
+        self.handle_one_request()
+        self._serve_kept_alive()
+
+    def _serve_kept_alive(self):
+        # BaseHTTPRequestHandler.handle's loop, except that with a thread pool a connection whose
+        # next request has not arrived yet is parked (FallbackServer.release) rather than
+        # blocking this thread until it does
+        while not self.close_connection:
+            if self.server.parking and not self._request_pending():
+                self.parked = True
+                return
+            self.handle_one_request()
+
+    def _request_pending(self) -> bool:
+        # bytes of the next request already buffered in rfile or waiting on the socket
+        self.connection.settimeout(0.0)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return True  # handle_one_request reports it
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def finish(self):
+        if not self.parked:
+            super().finish()
+
+    def address_string(self):
+        return self.client_address[0] if self.client_address else "unix"  # Unix socket peers are unnamed
+
+    def _client_connected(self) -> bool:
+        # deadline probe: a readable socket with nothing to read has been closed by the client
+        try:
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            return not readable or self.connection.recv(1, socket.MSG_PEEK) != b""
+        except (OSError, ValueError):
+            return False
+
+    def _read_body(self) -> Optional[bytes]:
+        # the request body, or None after answering a body this server cannot frame
+        if self.headers.get("Transfer-Encoding"):
+            self.close_connection = True  # bodies are framed by Content-Length only
+            self._send_json(411, {"error": "length_required", "message": "send a Content-Length body"})
+            return None
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+            if length < 0:
+                raise ValueError(length)
+        except ValueError:
+            self.close_connection = True  # cannot find the end of this body on a kept-alive socket
+            self._send_json(400, {"error": "bad_request", "message": "invalid Content-Length"})
+            return None
+        return self.rfile.read(length)
+
+    def _send_json(self, code: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode("utf-8")
+        self._stages.encoded()
+        self._send(code, body, "application/json; charset=utf-8", headers)
+
+    def _send(self, code: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if self.server.stopping:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+        self._stages.finish(self.path, code)
+        self.server.count_request()
+
+    def _dropped(self):
+        # the client is gone: close without answering, but count the request (status 499)
+        self.close_connection = True
+        self._stages.finish(self.path, 499)
+        self.server.count_request()
+
+
+class FallbackServer(HTTPServer):
+    # max_requests > 0 makes serve_forever return gracefully after that many requests, so a
+    # pre-fork supervisor (serve.py) recycles the worker
+    request_queue_size = 128
+    stopping = False
+
+    def __init__(
+        self,
+        server_address,
+        handler_class,
+        threads: int = THREADS,
+        keepalive_s: float = KEEPALIVE_S,
+        max_connections: int = MAX_CONNECTIONS,
+        max_requests: int = 0,
+        bind_and_activate: bool = True,
+    ):
+        if server_address is None:  # adopt a listening socket through from_socket()
+            server_address, bind_and_activate = ("", 0), False
+        super().__init__(server_address, handler_class, bind_and_activate)
+        self.threads = threads
+        self.keepalive_s = keepalive_s
+        self.max_connections = max_connections
+        self.max_requests = max_requests
+        self.accepted: Dict[Any, float] = {}  # socket -> accept time, taken by the handler
+        self._served = itertools.count(1)
+        self._pool = ThreadPoolExecutor(threads, thread_name_prefix="kronos-http") if threads > 0 else None
+        self.parking = self._pool is not None and keepalive_s > 0
+        self._lock = threading.Lock()
+        self._open: Set[Any] = set()  # accepted connections not yet closed
+        self._to_park: List[Any] = []  # handlers for the watcher to pick up
+        self._closed = False
+        self.parked = 0
+        self.rejected = 0
+        if self.parking:
+            self._wake_r, self._wake_w = socket.socketpair()
+            self._wake_r.setblocking(False)
+            self._watcher = threading.Thread(target=self._watch, name="kronos-keepalive", daemon=True)
+            self._watcher.start()
+
+    @classmethod
+    def from_socket(cls, sock: socket.socket, handler_class, **kwargs) -> "FallbackServer":
+        """Serve on a socket that is already bound and listening (TCP or Unix)."""
+        server = cls(None, handler_class, **kwargs)
+        server.socket.close()
+        server.socket = sock
+        server.server_address = sock.getsockname()
+        return server
+
+    def verify_request(self, request, client_address):
+        with self._lock:
+            full = 0 < self.max_connections <= len(self._open)
+            if full:
+                self.rejected += 1
+            else:
+                self._open.add(request)
+        if full:
+            try:
+                request.sendall(CONNECTIONS_FULL)
+            except OSError:
+                pass
+            metrics.METRICS.observe_request("other", 503, 0.0)
+        return not full
+
+    def shutdown_request(self, request):
+        with self._lock:
+            self._open.discard(request)
+        super().shutdown_request(request)
+
+    def process_request(self, request, client_address):
+        self.accepted[request] = time.monotonic()
+        if self._pool is None:
+            super().process_request(request, client_address)
+            return
+        self._pool.submit(self._process_in_thread, request, client_address)
+
+    def _process_in_thread(self, request, client_address):
+        try:
+            handler = self.RequestHandlerClass(request, client_address, self)
+        except Exception:  # noqa: BLE001
+            self.handle_error(request, client_address)
+            self.shutdown_request(request)
+            return
+        self.release(handler)
+
+    def _resume(self, handler):
+        try:
+            handler.resume()
+        except Exception:  # noqa: BLE001
+            handler.parked = False
+            self.handle_error(handler.request, handler.client_address)
+        self.release(handler)
+
+    def release(self, handler):
+        # a pool thread is done with `handler`: park its idle kept-alive connection, or close it.
+        # Parking happens only here, after the thread let go, so the watcher never resumes a
+        # handler that is still running.
+        if handler.parked:
+            with self._lock:
+                if not (self._closed or self.stopping):
+                    self._to_park.append(handler)
+                    if len(self._to_park) == 1:
+                        self._wake_w.send(b"\0")  # the watcher takes the whole list per wake-up
+                    return
+            handler.parked = False
+        handler.finish()
+        self.shutdown_request(handler.request)
+
+    def _watch(self):
+        sel = selectors.DefaultSelector()
+        sel.register(self._wake_r, selectors.EVENT_READ)
+        sweep_s = min(1.0, self.keepalive_s / 4)
+        next_sweep = time.monotonic() + sweep_s
+        while True:
+            ready = sel.select(sweep_s)
+            now = time.monotonic()
+            with self._lock:
+                parking, self._to_park = self._to_park, []
+                done = self._closed or self.stopping
+            for handler in parking:
+                sel.register(handler.connection, selectors.EVENT_READ, (handler, now))
+            for key, _ in ready:
+                if key.data is None:
+                    try:
+                        self._wake_r.recv(4096)
+                    except BlockingIOError:
+                        pass
+                    continue
+                sel.unregister(key.fileobj)
+                handler = key.data[0]
+                handler._accepted_at = now  # its next request's budget counts from here
+                self._pool.submit(self._resume, handler)
+            if done or now >= next_sweep:
+                next_sweep = now + sweep_s
+                for key in list(sel.get_map().values()):
+                    if key.data is not None and (done or now - key.data[1] >= self.keepalive_s):
+                        sel.unregister(key.fileobj)
+                        key.data[0].parked = False
+                        key.data[0].finish()
+                        self.shutdown_request(key.data[0].request)
+            self.parked = len(sel.get_map()) - 1
+            if done:
+                sel.close()
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            open_connections = len(self._open)
+        return {
+            "threads": self.threads,
+            "keepalive_s": self.keepalive_s,
+            "max_connections": self.max_connections,
+            "open": open_connections,
+            "parked": self.parked,
+            "rejected": self.rejected,
+        }
+
+    def count_request(self):
+        if self.max_requests and next(self._served) == self.max_requests:
+            self.stop()
+
+    def _wake(self):
+        if self.parking:
+            self._wake_w.send(b"\0")
+
+    def stop(self):
+        self.stopping = True  # open keep-alive connections close after their next response
+        self._wake()  # and parked ones now
+        # shutdown() blocks until serve_forever returns, so it cannot run on the serving thread
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def server_close(self):
+        super().server_close()
+        with self._lock:
+            self._closed = True
+        if self.parking:
+            self._wake()
+            self._watcher.join()
+            self._wake_r.close()
+            self._wake_w.close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
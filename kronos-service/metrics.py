@@ -0,0 +1,191 @@
+# Prometheus text-format metrics for both servers (no client library needed)
+# - kronos_requests_total{path,status}, kronos_request_seconds{path}: whole requests
+# - kronos_stage_seconds{stage}: read (body), decode (JSON / binary parse), validate (OHLCV checks),
+#   compute (cache, coalescing and model), encode (response serialisation)
+# - kronos_batch_size: items per /forecast/batch request; kronos_model_batch_size: series per
+#   model call (after micro-batching across requests, batcher.py)
+# - kronos_cache_lookups_total{result}, kronos_cache_hit_ratio
+# - Latency buckets include 0.9 s and 1.2 s: the Node client gives up at KRONOS_TIMEOUT_MS (1200)
+#   and falls back to computeLocalForecast, so those buckets show near-timeouts
+# - Values live in a flat float64 table with one region per worker slot. serve.py maps the table
+#   in shared memory before fork() and gives each worker its own region (no cross-process
+#   locking); /metrics on any worker sums every region
+
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+import mmap
+import threading
+import time
+
+PATHS = ("/forecast", "/forecast/batch", "/forecast/ref", "/forecast/stream", "/health", "/metrics", "shm", "other")
+STATUSES = ("200", "400", "404", "409", "422", "429", "499", "500", "503", "504", "other")
+STAGES = ("read", "decode", "validate", "compute", "encode")
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.9, 1.2, 2.5)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Histogram:
+    # per label value: one (non-cumulative) count per bucket, one for +Inf, then the sum
+    def __init__(self, offset: int, labels: Sequence[str], buckets: Sequence[float]):
+        self.offset = offset
+        self.labels = {label: offset + i * (len(buckets) + 2) for i, label in enumerate(labels)}
+        self.buckets = buckets
+        self.size = len(labels) * (len(buckets) + 2)
+
+    def slot(self, label: str, value: float) -> Tuple[int, int]:
+        # (offset of the bucket `value` falls in, offset of the sum); le bounds are inclusive
+        base = self.labels[label]
+        return base + bisect_left(self.buckets, value), base + len(self.buckets) + 1
+
+    def render(self, name: str, label: str, values: List[float]) -> List[str]:
+        lines = []
+        for key, base in self.labels.items():
+            tag = f'{label}="{key}",' if label else ""
+            count = 0.0
+            for i, bound in enumerate(self.buckets + (float("inf"),)):
+                count += values[base + i]
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{{tag}le="{le}"}} {count:g}')
+            tags = f"{{{tag[:-1]}}}" if tag else ""
+            lines.append(f"{name}_sum{tags} {values[base + len(self.buckets) + 1]!r}")
+            lines.append(f"{name}_count{tags} {count:g}")
+        return lines
+
+
+_REQUESTS = 0
+_REQUEST_SECONDS = _Histogram(len(PATHS) * len(STATUSES), PATHS, LATENCY_BUCKETS)
+_STAGE_SECONDS = _Histogram(_REQUEST_SECONDS.offset + _REQUEST_SECONDS.size, STAGES, LATENCY_BUCKETS)
+_BATCH_SIZE = _Histogram(_STAGE_SECONDS.offset + _STAGE_SECONDS.size, ("",), BATCH_BUCKETS)
+_MODEL_BATCH = _Histogram(_BATCH_SIZE.offset + _BATCH_SIZE.size, ("",), BATCH_BUCKETS)
+_CACHE = _MODEL_BATCH.offset + _MODEL_BATCH.size  # hits, misses
+SIZE = _CACHE + 2  # float64 values per region
+_STATUS_INDEX = {int(code): i for i, code in enumerate(STATUSES[:-1])}
+
+
+def _path_label(path: str) -> str:
+    path = path.split("?", 1)[0]
+    return path if path in _REQUEST_SECONDS.labels else "other"
+
+
+class Metrics:
+    def __init__(self, regions: int = 1, shared: bool = False):
+        self.regions = max(1, regions)
+        nbytes = self.regions * SIZE * 8
+        self._buf = mmap.mmap(-1, nbytes) if shared else bytearray(nbytes)  # MAP_SHARED | MAP_ANONYMOUS
+        self._values = memoryview(self._buf).cast("d")
+        self._base = 0
+        self._lock = threading.Lock()
+
+    def attach(self, region: int) -> None:
+        """Write to `region` from now on (one per pre-forked worker slot)."""
+        if not 0 <= region < self.regions:
+            raise ValueError(f"metrics region {region} out of range")
+        self._base = region * SIZE
+
+    def _observe(self, hist: _Histogram, label: str, value: float) -> None:
+        bucket, total = hist.slot(label, value)
+        values, base = self._values, self._base
+        with self._lock:
+            values[base + bucket] += 1.0
+            values[base + total] += value
+
+    def observe_request(
+        self, path: str, status: int, seconds: float, stages: Sequence[Tuple[str, float]] = ()
+    ) -> None:
+        """Count one request and its latency, plus its (stage, seconds) laps, under one lock."""
+        path = _path_label(path)
+        code = _STATUS_INDEX.get(status, len(STATUSES) - 1)
+        slots = [_REQUEST_SECONDS.slot(path, seconds) + (seconds,)]
+        slots += [_STAGE_SECONDS.slot(stage, lap) + (lap,) for stage, lap in stages]
+        values, base = self._values, self._base
+        with self._lock:
+            values[base + _REQUESTS + PATHS.index(path) * len(STATUSES) + code] += 1.0
+            for bucket, total, value in slots:
+                values[base + bucket] += 1.0
+                values[base + total] += value
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        self._observe(_STAGE_SECONDS, stage, seconds)
+
+    def observe_batch(self, size: int) -> None:
+        self._observe(_BATCH_SIZE, "", float(size))
+
+    def observe_model_batch(self, size: int) -> None:
+        self._observe(_MODEL_BATCH, "", float(size))
+
+    def count_cache(self, hits: int, misses: int) -> None:
+        values, base = self._values, self._base
+        with self._lock:
+            values[base + _CACHE] += hits
+            values[base + _CACHE + 1] += misses
+
+    def totals(self) -> List[float]:
+        values = self._values
+        return [sum(values[r * SIZE + i] for r in range(self.regions)) for i in range(SIZE)]
+
+    def render(self) -> str:
+        values = self.totals()
+        out = [
+            "# HELP kronos_requests_total HTTP requests by path and status.",
+            "# TYPE kronos_requests_total counter",
+        ]
+        for p, path in enumerate(PATHS):
+            for s, status in enumerate(STATUSES):
+                count = values[_REQUESTS + p * len(STATUSES) + s]
+                if count:
+                    out.append(f'kronos_requests_total{{path="{path}",status="{status}"}} {count:g}')
+        out += ["# HELP kronos_request_seconds Request latency inside the service.",
+                "# TYPE kronos_request_seconds histogram"]
+        out += _REQUEST_SECONDS.render("kronos_request_seconds", "path", values)
+        out += ["# HELP kronos_stage_seconds Time per request stage.", "# TYPE kronos_stage_seconds histogram"]
+        out += _STAGE_SECONDS.render("kronos_stage_seconds", "stage", values)
+        out += ["# HELP kronos_batch_size Items per /forecast/batch request.", "# TYPE kronos_batch_size histogram"]
+        out += _BATCH_SIZE.render("kronos_batch_size", "", values)
+        out += ["# HELP kronos_model_batch_size Series per model call.", "# TYPE kronos_model_batch_size histogram"]
+        out += _MODEL_BATCH.render("kronos_model_batch_size", "", values)
+        hits, misses = values[_CACHE], values[_CACHE + 1]
+        out += [
+            "# HELP kronos_cache_lookups_total Forecast cache lookups by result.",
+            "# TYPE kronos_cache_lookups_total counter",
+            f'kronos_cache_lookups_total{{result="hit"}} {hits:g}',
+            f'kronos_cache_lookups_total{{result="miss"}} {misses:g}',
+            "# HELP kronos_cache_hit_ratio Cache hits over lookups since start.",
+            "# TYPE kronos_cache_hit_ratio gauge",
+            f"kronos_cache_hit_ratio {hits / (hits + misses) if hits + misses else 0.0!r}",
+        ]
+        return "\n".join(out) + "\n"
+
+    def stats(self) -> Dict[str, float]:
+        values = self.totals()
+        return {"cache_hits": values[_CACHE], "cache_misses": values[_CACHE + 1]}
+
+
+class StageTimer:
+    """Laps of one request; each lap() times the span since the previous one as `stage`.
+
+    Laps are kept on the timer and recorded together with the request by finish().
+    """
+
+    __slots__ = ("started", "last", "stage", "laps")
+
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.stage = ""
+        self.laps: List[Tuple[str, float]] = []
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.laps.append((stage, now - self.last))
+        self.last, self.stage = now, stage
+
+    def encoded(self) -> None:
+        # the response body is serialised: an "encode" lap, unless this is an early error response
+        if self.stage == "compute":
+            self.lap("encode")
+
+    def finish(self, path: str, status: int) -> None:
+        METRICS.observe_request(path, status, time.perf_counter() - self.started, self.laps)
+
+
+METRICS = Metrics()
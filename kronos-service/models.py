@@ -0,0 +1,199 @@
+# Model registry
+# - Models register by name with a version, a loader and a preferred execution mode (executor.py)
+# - Loaders run on first use, or ahead of time through preload(), so a worker only pays the
+#   import/load cost of the models it actually serves
+# - A loaded model is a callable scoring a list of series: score(series) -> [{"long", "short", "conf"}]
+# - status() never triggers or waits for a load, so /health stays fast while models warm up
+# - KRONOS_MODEL_PLUGINS names extra modules (comma-separated) that register models on import
+# - "<model>:<rows>" resolves to `model` fed only its trailing `rows` rows: a cheaper tier for the
+#   degradation ladder (degrade.py). Only the ladder and executor children resolve such names
+#   (resolve(..., shortened=True)); a request naming one gets UnknownModel, so the tiers that
+#   exist are the configured ones and clients cannot mint models, executors or batchers
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import importlib
+import os
+import threading
+import time
+
+DEFAULT_MODEL = os.environ.get("KRONOS_DEFAULT_MODEL", "simple_signal")
+
+Scorer = Callable[[List[Any]], List[Dict[str, float]]]
+
+
+class UnknownModel(KeyError):
+    """Raised when a request names a model that is not registered."""
+
+
+class ModelUnavailable(RuntimeError):
+    """Raised when a model's loader failed; the error is kept and reported by status()."""
+
+
+class ModelSpec:
+    def __init__(
+        self,
+        name: str,
+        version: str,
+        loader: Callable[[], Scorer],
+        execution: str = "inline",
+        lookback: int = 200,
+        description: str = "",
+    ):
+        self.name = name
+        self.version = version
+        self.loader = loader
+        self.execution = execution
+        self.lookback = lookback  # trailing closes the model reads; the result cache hashes this many
+        self.description = description
+        self.parent: Optional[str] = None  # the model a "<model>:<rows>" tier shortens
+        self.state = "registered"  # -> loading -> ready | failed
+        self.error: Optional[str] = None
+        self.load_ms: Optional[float] = None
+        self._scorer: Optional[Scorer] = None
+        self._lock = threading.Lock()
+
+    @property
+    def model_id(self) -> str:
+        return f"{self.name}@{self.version}"
+
+    def scorer(self) -> Scorer:
+        """The loaded scoring callable; the first caller loads it, concurrent callers wait."""
+        if self._scorer is not None:
+            return self._scorer
+        with self._lock:
+            if self._scorer is None:
+                if self.state == "failed":
+                    raise ModelUnavailable(f"model {self.model_id} failed to load: {self.error}")
+                self.state = "loading"
+                started = time.perf_counter()
+                try:
+                    scorer = self.loader()
+                except Exception as e:  # noqa: BLE001
+                    self.state, self.error = "failed", str(e)
+                    raise ModelUnavailable(f"model {self.model_id} failed to load: {e}") from e
+                self.load_ms = (time.perf_counter() - started) * 1000.0
+                self._scorer = scorer
+                self.state = "ready"
+        return self._scorer
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "state": self.state,
+            "execution": self.execution,
+            "load_ms": None if self.load_ms is None else round(self.load_ms, 3),
+            "error": self.error,
+        }
+
+
+class ModelRegistry:
+    def __init__(self, default: str = DEFAULT_MODEL):
+        self.default = default
+        self._specs: Dict[str, ModelSpec] = {}
+        self._lock = threading.Lock()
+
+    def register(
+        self,
+        name: str,
+        version: str,
+        loader: Callable[[], Scorer],
+        execution: str = "inline",
+        lookback: int = 200,
+        description: str = "",
+    ) -> ModelSpec:
+        spec = ModelSpec(name, version, loader, execution, lookback, description)
+        with self._lock:
+            if name in self._specs:
+                raise ValueError(f"model {name!r} is already registered")
+            self._specs[name] = spec
+        return spec
+
+    def resolve(self, name: Optional[str] = None, shortened: bool = False) -> ModelSpec:
+        """Spec for `name` (the default model when None); does not load it.
+
+        "<model>:<rows>" tiers resolve only with `shortened` (degradation ladders, executor children).
+        """
+        name = name or self.default
+        spec = self._specs.get(name)
+        if spec is None and shortened:
+            spec = self._shortened(name)
+        if spec is None or (spec.parent is not None and not shortened):
+            available = sorted(n for n, s in self._specs.items() if s.parent is None)
+            raise UnknownModel(f"unknown model {name!r}; available: {available}")
+        return spec
+
+    def _shortened(self, name: str) -> Optional[ModelSpec]:
+        # "<model>:<rows>": the registered `model` over its last `rows` rows
+        base, sep, rows = name.rpartition(":")
+        parent = self._specs.get(base) if sep and rows.isdigit() and int(rows) > 0 else None
+        if parent is None or parent.parent is not None:
+            return None
+        spec = ModelSpec(
+            name,
+            parent.version,
+            lambda: _tail_scorer(parent.scorer(), int(rows)),
+            parent.execution,
+            min(parent.lookback, int(rows)),
+            f"{parent.name} over the last {rows} rows",
+        )
+        spec.parent = parent.name
+        with self._lock:
+            return self._specs.setdefault(name, spec)
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def preload(self, names: Iterable[str], background: bool = True) -> Optional[threading.Thread]:
+        """Load `names` ("*" = every model) now, or on a daemon thread when `background` is set.
+
+        Load failures are recorded on the spec rather than raised.
+        """
+        names = list(names)
+        specs = list(self._specs.values()) if "*" in names else [self.resolve(n) for n in names]
+
+        def load_all():
+            for spec in specs:
+                try:
+                    spec.scorer()
+                except ModelUnavailable:
+                    pass
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name="kronos-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> Dict[str, Any]:
+        return {"default": self.default, "models": {name: spec.status() for name, spec in self._specs.items()}}
+
+
+def _tail_scorer(scorer: Scorer, rows: int) -> Scorer:
+    return lambda series: scorer([s[-rows:] for s in series])
+
+
+def score_with(name: str, series: List[Any]) -> List[Dict[str, float]]:
+    # module-level so a process-pool executor can pickle it; the child resolves the model by name
+    # (executors are keyed by names app.py already resolved, ladder tiers included)
+    return REGISTRY.resolve(name, shortened=True).scorer()(series)
+
+
+def preload_from_env(background: bool = True) -> Optional[threading.Thread]:
+    names = [n.strip() for n in os.environ.get("KRONOS_PRELOAD_MODELS", "").split(",") if n.strip()]
+    return REGISTRY.preload(names, background) if names else None
+
+
+def _load_simple_signal() -> Scorer:
+    from signal_engine import score_many
+
+    return score_many
+
+
+REGISTRY = ModelRegistry()
+REGISTRY.register(
+    "simple_signal", "0.1.0", _load_simple_signal, description="momentum heuristic over the last 200 closes"
+)
+
+for _plugin in filter(None, (m.strip() for m in os.environ.get("KRONOS_MODEL_PLUGINS", "").split(","))):
+    importlib.import_module(_plugin)
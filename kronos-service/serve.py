@@ -0,0 +1,266 @@
+# Kronos production server: pre-forked workers sharing the listening port
+# - The supervisor binds once and forks N workers that accept on the inherited socket, or with
+#   --reuse-port each worker binds its own SO_REUSEPORT socket and the kernel balances connections
+# - Workers recycle after --max-requests (with jitter so they do not all restart together);
+#   the supervisor replaces any worker that exits, SIGHUP rolls all workers, SIGTERM/SIGINT stop
+# - A worker that fails within KRONOS_FAST_EXIT_S of starting (bad model path, import error...) is
+#   replaced after an exponential backoff (KRONOS_RESPAWN_BACKOFF_S doubling up to
+#   KRONOS_RESPAWN_BACKOFF_MAX_S); after KRONOS_MAX_FAST_FAILURES in a row the supervisor stops
+#   with exit status 1 instead of forking in a loop
+# - Results are shared between workers through cache.SharedForecastCache; metrics.py counters
+#   live in a shared table with one region per worker slot, so /metrics covers every worker
+# - --uds PATH (KRONOS_UDS) listens on a Unix socket instead of host:port; the ring doorbell
+#   socket (KRONOS_SHM_SOCKET, shmring.py) is likewise bound here and shared by the workers
+#
+# Usage: python serve.py [--workers N] [--host H] [--port P | --uds PATH] [--reuse-port] [--max-requests N]
+
+from typing import Dict, Optional
+import argparse
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+import cache
+import executor
+import metrics
+import shmring
+
+DEFAULT_HOST = os.environ.get("KRONOS_HOST", "127.0.0.1")
+DEFAULT_PORT = int(os.environ.get("KRONOS_PORT", "8001"))
+DEFAULT_WORKERS = int(os.environ.get("KRONOS_WORKERS", "0")) or (os.cpu_count() or 1)
+DEFAULT_MAX_REQUESTS = int(os.environ.get("KRONOS_MAX_REQUESTS", "0"))
+DEFAULT_UDS = os.environ.get("KRONOS_UDS", "")
+GRACEFUL_TIMEOUT_S = 10
+FAST_EXIT_S = float(os.environ.get("KRONOS_FAST_EXIT_S", "5"))
+BACKOFF_S = float(os.environ.get("KRONOS_RESPAWN_BACKOFF_S", "0.5"))
+BACKOFF_MAX_S = float(os.environ.get("KRONOS_RESPAWN_BACKOFF_MAX_S", "30"))
+MAX_FAST_FAILURES = int(os.environ.get("KRONOS_MAX_FAST_FAILURES", "5"))
+
+
+def bind_socket(host: str, port: int, reuse_port: bool) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise RuntimeError("SO_REUSEPORT is not supported on this platform")
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, max_requests: int) -> None:
+    """Serve on `sock` until stopped or recycled; runs inside the forked child."""
+    import app as service  # imported in the parent already; cheap here
+
+    try:
+        import uvicorn  # type: ignore
+    except Exception:  # noqa: BLE001
+        uvicorn = None
+
+    try:
+        if service.FASTAPI_AVAILABLE and uvicorn is not None:
+            config = uvicorn.Config(
+                service.app,
+                log_level="info",
+                limit_max_requests=max_requests or None,
+                timeout_graceful_shutdown=GRACEFUL_TIMEOUT_S,
+            )
+            uvicorn.Server(config).run(sockets=[sock])
+        else:
+            service.run_fallback_server(sock=sock, max_requests=max_requests)
+    finally:
+        executor.shutdown_all()  # scoring pools are per worker, created after fork
+
+
+class Supervisor:
+    def __init__(
+        self, host: str, port: int, workers: int, reuse_port: bool, max_requests: int, uds: str = ""
+    ):
+        self.host = host
+        self.port = port
+        self.uds = uds
+        self.workers = max(1, workers)
+        self.reuse_port = reuse_port
+        self.max_requests = max_requests
+        self.sock: Optional[socket.socket] = None
+        self.children: Dict[int, int] = {}  # pid -> generation
+        self.slots: Dict[int, int] = {}  # pid -> metrics region (a replacement reuses a free one)
+        self.started: Dict[int, float] = {}  # pid -> fork time (monotonic)
+        self.generation = 0
+        self.stopping = False
+        self.fast_failures = 0  # workers in a row that failed within FAST_EXIT_S
+        self.respawn_at = 0.0  # no replacement is forked before this (monotonic)
+        self.failed = False  # gave up after MAX_FAST_FAILURES
+
+    def _worker_max_requests(self) -> int:
+        if not self.max_requests:
+            return 0
+        return self.max_requests + random.randint(0, max(1, self.max_requests // 10))
+
+    def spawn(self) -> None:
+        max_requests = self._worker_max_requests()
+        free = sorted(set(range(metrics.METRICS.regions)) - set(self.slots.values()))
+        # both generations run during a rolling restart; beyond that, slots are shared (a few
+        # increments may be lost to unsynchronised writers)
+        slot = free[0] if free else len(self.children) % metrics.METRICS.regions
+        pid = os.fork()
+        if pid:
+            self.children[pid] = self.generation
+            self.slots[pid] = slot
+            self.started[pid] = time.monotonic()
+            return
+        # child
+        code = 0
+        try:
+            for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, signal.SIG_DFL)
+            metrics.METRICS.attach(slot)
+            sock = bind_socket(self.host, self.port, True) if self.reuse_port else self.sock
+            run_worker(sock, max_requests)
+        except BaseException as e:  # noqa: BLE001
+            print(f"[Kronos] worker {os.getpid()} failed: {e}", file=sys.stderr)
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _current(self):
+        return [pid for pid, gen in self.children.items() if gen == self.generation]
+
+    def _missing(self) -> int:
+        return 0 if self.stopping else self.workers - len(self._current())
+
+    def _exited(self, pid: int, status: int) -> None:
+        # a worker of the live generation exited: back off before replacing it if it failed fast
+        uptime = time.monotonic() - self.started.pop(pid, 0.0)
+        if os.waitstatus_to_exitcode(status) == 0 or uptime >= FAST_EXIT_S:
+            self.fast_failures = 0
+            return
+        self.fast_failures += 1
+        if self.fast_failures >= MAX_FAST_FAILURES:
+            print(
+                f"[Kronos] {self.fast_failures} workers in a row failed within {FAST_EXIT_S}s of starting; stopping",
+                file=sys.stderr,
+            )
+            self.failed = True
+            self._on_stop()
+            return
+        delay = min(BACKOFF_MAX_S, BACKOFF_S * 2 ** (self.fast_failures - 1))
+        print(f"[Kronos] worker {pid} failed after {uptime:.1f}s; replacing it in {delay:.1f}s", file=sys.stderr)
+        self.respawn_at = time.monotonic() + delay
+
+    def _signal_children(self, sig: int, generation: Optional[int] = None) -> None:
+        for pid, gen in list(self.children.items()):
+            if generation is None or gen <= generation:
+                try:
+                    os.kill(pid, sig)
+                except ProcessLookupError:
+                    pass
+
+    def _on_stop(self, *_):
+        self.stopping = True
+        self._signal_children(signal.SIGTERM)
+
+    def _on_reload(self, *_):
+        # rolling restart: start a new generation, then gracefully stop the old one
+        old = self.generation
+        self.generation += 1
+        for _ in range(self.workers):
+            self.spawn()
+        self._signal_children(signal.SIGTERM, generation=old)
+
+    def run(self) -> int:
+        """Serve until stopped; returns the process exit status (1 after repeated fast worker failures)."""
+        if self.uds:
+            self.sock = shmring.bind_unix(self.uds)
+        elif not self.reuse_port:
+            self.sock = bind_socket(self.host, self.port, False)
+        where = f"unix:{self.uds}" if self.uds else f"http://{self.host}:{self.port}"
+        print(
+            f"[Kronos] Supervisor {os.getpid()} starting {self.workers} workers on "
+            f"{where} (reuse_port={self.reuse_port}, max_requests={self.max_requests})"
+        )
+        # preload the app (and numpy) once so forked workers share those pages; models listed in
+        # KRONOS_PRELOAD_MODELS are loaded here too, so every worker starts warm
+        import app
+        import models
+
+        models.preload_from_env(background=False)
+        if app.SHM_SOCKET:
+            app.RING_SOCKET = shmring.bind_unix(app.SHM_SOCKET)  # every worker serves ring callers on it
+
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        for _ in range(self.workers):
+            self.spawn()
+
+        deadline = None
+        while self.children or self._missing():
+            if self.stopping and deadline is None:
+                deadline = time.monotonic() + GRACEFUL_TIMEOUT_S
+            if deadline is not None and time.monotonic() > deadline:
+                self._signal_children(signal.SIGKILL)
+            if self._missing() and time.monotonic() >= self.respawn_at:
+                for _ in range(self._missing()):
+                    self.spawn()  # replaces recycled or crashed workers of the live generation
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG if deadline is not None or self._missing() else 0)
+            except ChildProcessError:
+                if not self._missing():
+                    break
+                pid, status = 0, 0  # nothing running: a replacement is waiting out its backoff
+            if pid == 0:
+                time.sleep(0.1)
+                continue
+            gen = self.children.pop(pid, None)
+            self.slots.pop(pid, None)
+            if not self.stopping and gen == self.generation:
+                self._exited(pid, status)
+            else:
+                self.started.pop(pid, None)
+
+        for sock in (self.sock, app.RING_SOCKET):
+            if sock is not None:
+                sock.close()
+        for path in (self.uds, app.SHM_SOCKET):
+            if path and os.path.exists(path):
+                os.unlink(path)
+        print("[Kronos] Supervisor stopped")
+        return 1 if self.failed else 0
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run the Kronos service with pre-forked workers")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--reuse-port", action="store_true", default=os.environ.get("KRONOS_REUSEPORT") == "1")
+    parser.add_argument("--uds", default=DEFAULT_UDS, help="listen on this Unix socket instead of host:port")
+    parser.add_argument("--max-requests", type=int, default=DEFAULT_MAX_REQUESTS)
+    parser.add_argument(
+        "--cache-slots",
+        type=int,
+        default=int(os.environ.get("KRONOS_SHARED_CACHE_SLOTS", "65536")),
+        help="slots in the cross-worker result cache; 0 keeps a per-worker LRU instead",
+    )
+    args = parser.parse_args(argv)
+    if args.uds and args.reuse_port:
+        parser.error("--uds and --reuse-port are mutually exclusive")
+
+    if args.cache_slots > 0 and cache.CACHE.enabled:
+        # created before fork() so every worker maps the same pages
+        cache.CACHE = cache.SharedForecastCache(args.cache_slots, cache.CACHE.ttl_s)
+
+    # two regions per worker: old and new generation overlap during a rolling restart (SIGHUP)
+    metrics.METRICS = metrics.Metrics(regions=2 * max(1, args.workers), shared=True)
+
+    sys.exit(Supervisor(args.host, args.port, args.workers, args.reuse_port, args.max_requests, args.uds).run())
+
+
+if __name__ == "__main__":
+    main()
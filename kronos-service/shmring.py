@@ -0,0 +1,343 @@
+# Shared-memory ring transport for co-located callers
+# - The caller creates a ring file in KRONOS_SHM_RING_DIR (default /dev/shm when present, else the
+#   temp dir) named kronos-ring-*, and maps it: a header and `slots`
+#   fixed-size slots, each a request header, a response area and room for `max_rows` OHLCV rows
+#   as packed little-endian float64 (the binary /forecast body format, wire.py)
+# - It connects once to the service's doorbell socket (KRONOS_SHM_SOCKET, a Unix socket) and
+#   sends the ring's path; the service maps the same file, after which the caller may unlink it.
+#   The service only opens regular files in the ring directory with the kronos-ring- prefix, not
+#   through a symlink, and owned by its own user; it serves at most KRONOS_SHM_MAX_CONNS
+#   connections (503 to the handshake beyond that)
+# - A call: write rows and the request header into a free slot and send its index (4 bytes);
+#   the service scores the slot through the /forecast path (cache, coalescing, batching,
+#   deadlines, degradation; metrics under path "shm"), writes status and scores into the slot
+#   and sends the index back. Up to `slots` calls may be outstanding per connection, answered
+#   in completion order
+# - Per call the socket carries 8 bytes: no request line, headers, JSON or body copies
+#
+# Ring layout (little-endian):
+#   header (64 bytes): magic "KRNR", version, slots, max_rows, columns (u32 each)
+#   slot i at 64 + i * slot_size, slot_size = 128 + max_rows * columns * 8 rounded up to 64:
+#     request  @0  (80 bytes): rows u32, budget_ms f32 (0 = none), 8 reserved, symbol 16s,
+#                              interval 16s, model 32s (NUL-padded UTF-8; empty model = default)
+#     response @80 (32 bytes): status u16 (HTTP codes), flags u16 (1 cached, 2 coalesced,
+#                              4 degraded), 4 reserved, score_long, score_short, confidence f64
+#     rows     @128
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+import functools
+import mmap
+import os
+import select
+import socket
+import stat
+import struct
+import tempfile
+import threading
+
+import wire
+
+MAGIC = b"KRNR"
+VERSION = 1
+RING_HEADER = struct.Struct("<4sIIII")
+RING_HEADER_SIZE = 64
+REQUEST = struct.Struct("<If8x16s16s32s")
+RESPONSE = struct.Struct("<HH4x3d")
+RESPONSE_OFFSET = REQUEST.size
+SLOT_HEADER_SIZE = 128
+DOORBELL = struct.Struct("<I")  # slot index; the handshake sends the path's length, then the path
+FLAG_CACHED, FLAG_COALESCED, FLAG_DEGRADED = 1, 2, 4
+RING_THREADS = int(os.environ.get("KRONOS_SHM_THREADS", "8"))
+RING_MAX_CONNECTIONS = int(os.environ.get("KRONOS_SHM_MAX_CONNS", "64"))
+RING_DIR = os.environ.get("KRONOS_SHM_RING_DIR") or ("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+RING_PREFIX = "kronos-ring-"
+
+Scores = Tuple[float, float, float]
+# handle(read) scores one call: read() returns (item, budget_ms) as Ring.read_request does, or
+# raises ValueError for a malformed slot; the result is (status, flags, scores)
+Handler = Callable[[Callable[[], Tuple[Dict[str, Any], float]]], Tuple[int, int, Scores]]
+
+
+def _text(raw: bytes) -> str:
+    return raw.rstrip(b"\0").decode("utf-8", "replace")
+
+
+def bind_unix(path: str) -> socket.socket:
+    """Listening Unix stream socket at `path`, replacing a stale socket file left by a previous run."""
+    if os.path.exists(path):
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            raise OSError(f"{path} exists and is not a socket")
+        os.unlink(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Ring:
+    def __init__(self, mm: mmap.mmap, slots: int, max_rows: int, columns: int):
+        self.mm = mm
+        self.slots = slots
+        self.max_rows = max_rows
+        self.columns = columns
+        self.slot_size = -(-(SLOT_HEADER_SIZE + max_rows * columns * 8) // 64) * 64
+
+    @classmethod
+    def create(cls, path: str, slots: int, max_rows: int = 512, columns: int = wire.DEFAULT_COLUMNS) -> "Ring":
+        ring_size = cls(None, slots, max_rows, columns).slot_size * slots + RING_HEADER_SIZE
+        with open(path, "w+b") as f:
+            f.truncate(ring_size)
+            mm = mmap.mmap(f.fileno(), ring_size)
+        RING_HEADER.pack_into(mm, 0, MAGIC, VERSION, slots, max_rows, columns)
+        return cls(mm, slots, max_rows, columns)
+
+    @classmethod
+    def open(cls, path: str) -> "Ring":
+        """Map a ring created by a caller; raises ValueError unless it is a well-formed ring file.
+
+        The file must be a regular file owned by this process's user, opened without following a
+        symlink (OSError otherwise).
+        """
+        fd = os.open(path, os.O_RDWR | getattr(os, "O_NOFOLLOW", 0))
+        try:
+            st = os.fstat(fd)
+            if not stat.S_ISREG(st.st_mode) or st.st_uid != os.geteuid():
+                raise ValueError(f"{path} is not a ring file owned by this user")
+            if st.st_size < RING_HEADER_SIZE:
+                raise ValueError(f"{path} is not a Kronos ring")
+            size = st.st_size
+            mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        magic, version, slots, max_rows, columns = RING_HEADER.unpack_from(mm, 0)
+        ring = cls(mm, slots, max_rows, columns)
+        if (magic, version) != (MAGIC, VERSION) or columns < 5 or size < RING_HEADER_SIZE + slots * ring.slot_size:
+            mm.close()
+            raise ValueError(f"{path} is not a version {VERSION} Kronos ring")
+        return ring
+
+    def _slot(self, index: int) -> int:
+        if not 0 <= index < self.slots:
+            raise IndexError(f"slot {index} out of range (ring has {self.slots})")
+        return RING_HEADER_SIZE + index * self.slot_size
+
+    def write_request(
+        self, index: int, body: bytes, symbol: str, interval: str, model: Optional[str] = None, budget_ms: float = 0
+    ) -> None:
+        rows, rest = divmod(len(body), self.columns * 8)
+        if rest or rows > self.max_rows:
+            raise ValueError(f"body must hold at most {self.max_rows} rows of {self.columns} float64")
+        base = self._slot(index)
+        self.mm[base + SLOT_HEADER_SIZE:base + SLOT_HEADER_SIZE + len(body)] = body
+        REQUEST.pack_into(
+            self.mm, base, rows, budget_ms, symbol.encode(), interval.encode(), (model or "").encode()
+        )
+
+    def read_request(self, index: int) -> Tuple[Dict[str, Any], float]:
+        """(the dict a binary /forecast body would decode to, budget in ms) for slot `index`."""
+        base = self._slot(index)
+        rows, budget_ms, symbol, interval, model = REQUEST.unpack_from(self.mm, base)
+        if rows > self.max_rows:
+            raise ValueError(f"slot {index} claims {rows} rows; the ring holds {self.max_rows}")
+        start = base + SLOT_HEADER_SIZE
+        ohlcv = wire.decode_ohlcv(self.mm[start:start + rows * self.columns * 8], self.columns)
+        item = {
+            "symbol": _text(symbol) or "UNKNOWN",
+            "interval": _text(interval) or "UNKNOWN",
+            "ohlcv": ohlcv,
+            "last_ts": float(ohlcv[-1][0]) if len(ohlcv) else None,
+            "model": _text(model) or None,
+        }
+        return item, budget_ms
+
+    def write_response(self, index: int, status: int, flags: int = 0, scores: Scores = (0.0, 0.0, 0.0)) -> None:
+        RESPONSE.pack_into(self.mm, self._slot(index) + RESPONSE_OFFSET, status, flags, *scores)
+
+    def read_response(self, index: int) -> Tuple[int, int, float, float, float]:
+        return RESPONSE.unpack_from(self.mm, self._slot(index) + RESPONSE_OFFSET)
+
+    def close(self) -> None:
+        self.mm.close()
+
+
+def _recv_exact(conn: socket.socket, size: int) -> bytes:
+    buf = b""
+    while len(buf) < size:
+        chunk = conn.recv(size - len(buf))
+        if not chunk:
+            return b""
+        buf += chunk
+    return buf
+
+
+class RingServer:
+    """Accepts ring connections on a listening Unix socket; `handle(read)` scores one slot."""
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        handle: Handler,
+        threads: int = RING_THREADS,
+        max_connections: int = RING_MAX_CONNECTIONS,
+        ring_dir: str = RING_DIR,
+    ):
+        self.sock = sock
+        self.handle = handle
+        self.max_connections = max_connections
+        self.ring_dir = os.path.realpath(ring_dir)
+        self._pool = ThreadPoolExecutor(max(1, threads), thread_name_prefix="kronos-ring")
+        self._closed = False
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.calls = 0
+        self.rejected = 0
+
+    def start(self) -> "RingServer":
+        threading.Thread(target=self._accept_loop, name="kronos-ring-accept", daemon=True).start()
+        return self
+
+    def _accept_loop(self) -> None:
+        # the listening socket may be shared by pre-forked workers: poll, and lose races quietly.
+        # This thread owns the socket and closes it (this process's copy) once the server is closed.
+        self.sock.setblocking(False)
+        try:
+            while not self._closed:
+                try:
+                    if not select.select([self.sock], [], [], 0.25)[0]:
+                        continue
+                    conn, _ = self.sock.accept()
+                except (BlockingIOError, InterruptedError):
+                    continue
+                conn.setblocking(True)
+                with self._lock:
+                    full = 0 < self.max_connections <= self.connections
+                    if full:
+                        self.rejected += 1
+                    else:
+                        self.connections += 1  # each connection holds a thread until the caller leaves
+                if full:
+                    self._refuse(conn)
+                    continue
+                threading.Thread(target=self._serve, args=(conn,), name="kronos-ring-conn", daemon=True).start()
+        finally:
+            self.sock.close()
+
+    @staticmethod
+    def _refuse(conn: socket.socket) -> None:
+        try:
+            conn.sendall(DOORBELL.pack(503))
+        except OSError:
+            pass
+        conn.close()
+
+    def _open_ring(self, raw: bytes) -> Ring:
+        # only kronos-ring-* files directly inside the ring directory: a caller cannot point the
+        # service at an arbitrary path (Ring.open adds the symlink and owner checks)
+        path = raw.decode()
+        if (
+            os.path.realpath(os.path.dirname(path)) != self.ring_dir
+            or not os.path.basename(path).startswith(RING_PREFIX)
+        ):
+            raise ValueError(f"{path} is not a ring file in {self.ring_dir}")
+        return Ring.open(path)
+
+    def _serve(self, conn: socket.socket) -> None:
+        try:
+            header = _recv_exact(conn, DOORBELL.size)
+            try:
+                ring = self._open_ring(_recv_exact(conn, DOORBELL.unpack(header)[0]) if header else b"")
+            except (OSError, ValueError):
+                conn.sendall(DOORBELL.pack(400))
+                return
+            conn.sendall(DOORBELL.pack(200))
+            send_lock = threading.Lock()
+            while not self._closed:
+                bell = _recv_exact(conn, DOORBELL.size)
+                if not bell:
+                    break
+                index = DOORBELL.unpack(bell)[0]
+                if index >= ring.slots or self._closed:
+                    break  # a caller that does not follow the protocol loses its connection
+                self._pool.submit(self._call, conn, send_lock, ring, index)
+        except (OSError, RuntimeError):  # RuntimeError: the pool was shut down by close()
+            pass
+        finally:
+            with self._lock:
+                self.connections -= 1
+            conn.close()  # in-flight calls finish and find the connection gone; the ring unmaps with them
+
+    def _call(self, conn: socket.socket, send_lock: threading.Lock, ring: Ring, index: int) -> None:
+        try:
+            ring.write_response(index, *self.handle(functools.partial(ring.read_request, index)))
+        except Exception:  # noqa: BLE001
+            ring.write_response(index, 500)  # the caller still gets its slot back
+        with self._lock:
+            self.calls += 1
+        try:
+            with send_lock:
+                conn.sendall(DOORBELL.pack(index))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"connections": self.connections, "calls": self.calls, "rejected": self.rejected}
+
+    def close(self) -> None:
+        # stops accepting; open connections are dropped at their next call (RingClient raises ConnectionError)
+        self._closed = True
+        self._pool.shutdown(wait=False)
+
+
+class RingClient:
+    """Blocking ring caller: one call at a time (calls from several threads take turns)."""
+
+    def __init__(
+        self, socket_path: str, max_rows: int = 512, columns: int = wire.DEFAULT_COLUMNS, ring_dir: str = RING_DIR
+    ):
+        fd, path = tempfile.mkstemp(prefix=RING_PREFIX, dir=ring_dir)
+        os.close(fd)
+        try:
+            self.ring = Ring.create(path, 1, max_rows, columns)
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(socket_path)
+            encoded = path.encode()
+            self.sock.sendall(DOORBELL.pack(len(encoded)) + encoded)
+            reply = _recv_exact(self.sock, DOORBELL.size)
+            if not reply or DOORBELL.unpack(reply)[0] != 200:
+                raise ConnectionError(f"service at {socket_path} refused the ring")
+        finally:
+            os.unlink(path)  # both sides have it mapped now (or the handshake failed)
+        self._lock = threading.Lock()
+
+    def forecast(
+        self,
+        ohlcv: Any,
+        symbol: str = "UNKNOWN",
+        interval: str = "UNKNOWN",
+        model: Optional[str] = None,
+        budget_ms: float = 0,
+    ) -> Dict[str, Any]:
+        """Score OHLCV rows (or their packed bytes); "status" is the HTTP code /forecast would answer."""
+        body = ohlcv if isinstance(ohlcv, (bytes, bytearray)) else wire.encode_ohlcv(ohlcv)
+        with self._lock:
+            self.ring.write_request(0, body, symbol, interval, model, budget_ms)
+            self.sock.sendall(DOORBELL.pack(0))
+            if not _recv_exact(self.sock, DOORBELL.size):
+                raise ConnectionError("service closed the ring connection")
+            status, flags, long_score, short_score, conf = self.ring.read_response(0)
+        return {
+            "status": status,
+            "score_long": long_score,
+            "score_short": short_score,
+            "confidence": conf,
+            "cached": bool(flags & FLAG_CACHED),
+            "coalesced": bool(flags & FLAG_COALESCED),
+            "degraded": bool(flags & FLAG_DEGRADED),
+        }
+
+    def close(self) -> None:
+        self.sock.close()
+        self.ring.close()
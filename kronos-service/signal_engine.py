@@ -0,0 +1,175 @@
+# Kronos signal engine
+# - simple_signal: pure-Python reference implementation (always available)
+# - simple_signal_np: NumPy implementation over a (batch, rows, 6) array, used when numpy is importable
+# - score_series / score_many: dispatch rows, arrays and pre-extracted close vectors to the above
+# - SignalParams: the heuristic's constants; sweep.py grid-searches them
+# - the numpy paths are taken when backend.py picked numpy (KRONOS_SIGNAL_BACKEND, default auto)
+
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+from array import array
+import math
+
+from backend import BACKEND, NUMPY_AVAILABLE, np  # noqa: F401  (re-exported for wire.py / cache.py)
+
+class SignalParams(NamedTuple):
+    close_window: int = 200  # closes looked at (and over which vol is averaged)
+    avg_window: int = 20  # moving average the last close is compared with
+    slope_scale: float = 3.0  # |slope| at which the trend part of the confidence saturates
+    conf_base: float = 0.4
+    conf_trend: float = 0.5
+    conf_sample: float = 0.1
+    sample_norm: float = 480.0  # window length at which the sample-size part saturates
+
+
+DEFAULT_PARAMS = SignalParams()
+
+
+def clamp01(x: float) -> float:
+    if not math.isfinite(x):
+        return 0.0
+    return max(0.0, min(1.0, x))
+
+
+def simple_signal(ohlcv: List[List[float]], params: SignalParams = DEFAULT_PARAMS) -> Dict[str, float]:
+    n = len(ohlcv)
+    if n < 10:
+        return {"long": 0.5, "short": 0.5, "conf": 0.4}
+
+    closes = [row[4] for row in ohlcv[-params.close_window :]]  # up to last 200 closes
+    return signal_from_closes(closes, n, params)
+
+
+def signal_from_closes(closes: Sequence[float], n: int, params: SignalParams = DEFAULT_PARAMS) -> Dict[str, float]:
+    """simple_signal on pre-extracted closes; `n` is the full window length."""
+    if n < 10:
+        return {"long": 0.5, "short": 0.5, "conf": 0.4}
+
+    closes = list(closes[-params.close_window :])
+    n2 = len(closes)
+    avg20 = sum(closes[-params.avg_window :]) / max(1, min(params.avg_window, n2))
+    last = closes[-1]
+
+    # momentum proxy: last close vs 20-avg; normalize by recent std-like proxy
+    diffs = [abs(closes[i] - closes[i - 1]) for i in range(1, n2)]
+    vol = sum(diffs) / max(1, len(diffs))
+    return signal_from_stats(n, last, avg20, vol, params)
+
+
+def signal_from_stats(
+    n: int, last: float, avg20: float, vol: float, params: SignalParams = DEFAULT_PARAMS
+) -> Dict[str, float]:
+    """Final scoring step of simple_signal, shared with the streaming state."""
+    vol = vol or 1.0
+    slope = (last - avg20) / vol
+    # map slope to [0,1] via sigmoid-like
+    long_score = 1.0 / (1.0 + math.exp(-slope))  # (0,1)
+    short_score = 1.0 - long_score
+
+    # confidence: grows with sample size and trend magnitude
+    p = params
+    trend = clamp01(abs(slope) / p.slope_scale)
+    conf = min(0.9, p.conf_base + p.conf_trend * trend + p.conf_sample * clamp01(n / p.sample_norm))
+
+    return {"long": clamp01(long_score), "short": clamp01(short_score), "conf": clamp01(conf)}
+
+
+def _clamp01_np(x: "np.ndarray") -> "np.ndarray":
+    return np.where(np.isfinite(x), np.clip(x, 0.0, 1.0), 0.0)
+
+
+def simple_signal_np(batch: "np.ndarray") -> Dict[str, "np.ndarray"]:
+    """Vectorized simple_signal over a (batch, rows, 6) float64 array.
+
+    Every series in the batch has the same number of rows; returns arrays of shape (batch,)
+    under the same keys as simple_signal. Sums use NumPy's pairwise summation, so results
+    match the reference to floating-point rounding rather than bit for bit.
+    """
+    arr = np.asarray(batch, dtype=np.float64)
+    if arr.ndim != 3 or arr.shape[2] < 5:
+        raise ValueError(f"expected (batch, rows, 6) array, got shape {arr.shape}")
+    return signal_from_closes_np(arr[:, :, 4])
+
+
+def signal_from_closes_np(closes: "np.ndarray", params: SignalParams = DEFAULT_PARAMS) -> Dict[str, "np.ndarray"]:
+    """simple_signal_np on a (batch, rows) array of closes."""
+    b, n = closes.shape
+    if n < 10:
+        return {
+            "long": np.full(b, 0.5),
+            "short": np.full(b, 0.5),
+            "conf": np.full(b, 0.4),
+        }
+
+    p = params
+    closes = closes[:, -p.close_window :]  # up to last 200 closes
+    n2 = closes.shape[1]
+    avg20 = closes[:, -p.avg_window :].sum(axis=1) / max(1, min(p.avg_window, n2))
+    last = closes[:, -1]
+
+    vol = np.abs(np.diff(closes, axis=1)).sum(axis=1) / max(1, n2 - 1)
+    vol = np.where(vol == 0.0, 1.0, vol)
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        slope = (last - avg20) / vol
+        long_score = 1.0 / (1.0 + np.exp(-slope))
+    short_score = 1.0 - long_score
+
+    trend = _clamp01_np(np.abs(slope) / p.slope_scale)
+    conf = np.minimum(0.9, p.conf_base + p.conf_trend * trend + p.conf_sample * clamp01(n / p.sample_norm))
+
+    return {"long": _clamp01_np(long_score), "short": _clamp01_np(short_score), "conf": _clamp01_np(conf)}
+
+
+def _closes_of(ohlcv: Any) -> Optional[Any]:
+    # close vectors produced by wire.coerce_ohlcv / wire.decode_ohlcv, or None for plain rows
+    if isinstance(ohlcv, array):
+        return ohlcv
+    if NUMPY_AVAILABLE and isinstance(ohlcv, np.ndarray):
+        return ohlcv if ohlcv.ndim == 1 else ohlcv[:, 4]
+    return None
+
+
+def score_series(ohlcv: Any) -> Dict[str, float]:
+    """Score one series given as rows, a (rows, cols) array, or a 1-D vector of closes.
+
+    A single series is cheaper through the scalar code than through NumPy's per-call overhead,
+    so arrays are reduced to their last close_window closes and scored by signal_from_closes.
+    """
+    closes = _closes_of(ohlcv)
+    if closes is None:
+        return simple_signal(ohlcv)
+    tail = closes[-DEFAULT_PARAMS.close_window :]
+    return signal_from_closes(tail.tolist(), len(closes))
+
+
+def score_many(series: List[Any]) -> List[Dict[str, float]]:
+    """Score many OHLCV series at once, in input order.
+
+    With the numpy backend, close vectors of equal length (as decoded by wire.py) are stacked and
+    scored together by signal_from_closes_np. Plain row lists go through score_series one by one:
+    converting nested lists into an array costs more than the scalar scoring it would replace
+    (14 ms vs 2.8 ms for 64 x 480 rows).
+    """
+    if not NUMPY_AVAILABLE or len(series) == 1:
+        return [score_series(s) for s in series]
+
+    out: List[Any] = [None] * len(series)
+    groups: Dict[int, List[int]] = {}
+    for idx, s in enumerate(series):
+        groups.setdefault(len(s), []).append(idx)
+
+    for idxs in groups.values():
+        closes = [_closes_of(series[i]) for i in idxs]
+        stacked = None
+        if len(idxs) > 1 and all(c is not None for c in closes):
+            try:
+                stacked = np.asarray(closes, dtype=np.float64)
+            except (ValueError, TypeError):
+                stacked = None
+        if stacked is None or stacked.ndim != 2:
+            for i in idxs:
+                out[i] = score_series(series[i])
+            continue
+        sig = signal_from_closes_np(stacked)
+        for j, i in enumerate(idxs):
+            out[i] = {"long": float(sig["long"][j]), "short": float(sig["short"][j]), "conf": float(sig["conf"][j])}
+    return out
@@ -0,0 +1,129 @@
+# Incremental signal state per (symbol, interval)
+# - Clients seed a stream with a full window, then send only newly closed candles
+# - Rolling sums give the same scores as simple_signal over the equivalent full window
+
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import threading
+
+from signal_engine import DEFAULT_PARAMS, signal_from_stats
+
+CLOSE_WINDOW = DEFAULT_PARAMS.close_window  # closes simple_signal looks at
+AVG_WINDOW = DEFAULT_PARAMS.avg_window
+DEFAULT_LOOKBACK = 480
+REANCHOR_EVERY = 256  # recompute sums exactly every N updates to bound float drift
+
+
+class StreamNotFound(KeyError):
+    """Raised when an incremental update arrives for a stream the service does not hold."""
+
+
+class StreamState:
+    def __init__(self, lookback: int = DEFAULT_LOOKBACK, reanchor_every: int = REANCHOR_EVERY):
+        # reanchor_every=0 leaves re-anchoring to the caller (backtest.py anchors at fixed positions)
+        self.lookback = max(1, int(lookback))
+        self.reanchor_every = reanchor_every
+        self.closes: Deque[float] = deque(maxlen=min(CLOSE_WINDOW, self.lookback))
+        self.n = 0  # rows in the equivalent full window (capped at lookback)
+        self.last_ts: Optional[float] = None
+        self.sum_avg = 0.0  # sum of the last AVG_WINDOW closes
+        self.sum_diff = 0.0  # sum of |close[i] - close[i-1]| inside the close window
+        self._since_anchor = 0
+
+    def apply(self, rows: List[List[float]]) -> int:
+        """Apply candles in time order; returns how many rows changed the state.
+
+        Rows older than the last seen timestamp are ignored, a row with the same timestamp
+        replaces the last close (a still-forming candle), newer rows are appended.
+        """
+        applied = 0
+        for row in rows:
+            ts, close = row[0], float(row[4])
+            if self.last_ts is not None and ts < self.last_ts:
+                continue
+            if self.last_ts is not None and ts == self.last_ts and self.closes:
+                self._replace_last(close)
+            else:
+                self._push(close)
+                self.last_ts = ts
+            applied += 1
+            self._since_anchor += 1
+            if self.reanchor_every and self._since_anchor >= self.reanchor_every:
+                self.reanchor()
+        return applied
+
+    def _push(self, close: float) -> None:
+        closes = self.closes
+        if len(closes) == closes.maxlen and len(closes) >= 2:
+            self.sum_diff -= abs(closes[1] - closes[0])
+        if len(closes) >= AVG_WINDOW:
+            self.sum_avg -= closes[-AVG_WINDOW]
+        elif len(closes) == closes.maxlen:
+            self.sum_avg -= closes[0]  # lookback shorter than the average window
+        if closes:
+            self.sum_diff += abs(close - closes[-1])
+        closes.append(close)
+        self.sum_avg += close
+        self.n = min(self.n + 1, self.lookback)
+
+    def _replace_last(self, close: float) -> None:
+        closes = self.closes
+        old = closes[-1]
+        closes[-1] = close
+        self.sum_avg += close - old
+        if len(closes) >= 2:
+            prev = closes[-2]
+            self.sum_diff += abs(close - prev) - abs(old - prev)
+
+    def reanchor(self) -> None:
+        closes = list(self.closes)
+        self.sum_avg = sum(closes[-AVG_WINDOW:])
+        self.sum_diff = sum(abs(closes[i] - closes[i - 1]) for i in range(1, len(closes)))
+        self._since_anchor = 0
+
+    def signal(self) -> Dict[str, float]:
+        if self.n < 10:
+            return {"long": 0.5, "short": 0.5, "conf": 0.4}
+        n2 = len(self.closes)
+        avg20 = self.sum_avg / max(1, min(AVG_WINDOW, n2))
+        vol = self.sum_diff / max(1, n2 - 1)
+        return signal_from_stats(self.n, self.closes[-1], avg20, vol)
+
+
+class StreamRegistry:
+    """Bounded map of (symbol, interval) -> StreamState, least recently used evicted first."""
+
+    def __init__(self, max_streams: int = 4096):
+        self.max_streams = max_streams
+        self._streams: "OrderedDict[Tuple[str, str], StreamState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update(
+        self,
+        symbol: str,
+        interval: str,
+        rows: List[List[float]],
+        reset: bool = False,
+        lookback: Optional[int] = None,
+    ) -> Tuple[Dict[str, float], Dict[str, Any]]:
+        key = (symbol, interval)
+        with self._lock:
+            state = self._streams.get(key)
+            if state is None and not reset:
+                raise StreamNotFound(f"no stream state for {symbol} {interval}; resend with reset=true")
+            if reset or state is None:
+                state = StreamState(lookback or DEFAULT_LOOKBACK)
+                self._streams[key] = state
+                while len(self._streams) > self.max_streams:
+                    self._streams.popitem(last=False)
+            self._streams.move_to_end(key)
+            applied = state.apply(rows)
+            sig = state.signal()
+            info = {"n": state.n, "applied": applied, "last_ts": state.last_ts}
+        return sig, info
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+
+STREAMS = StreamRegistry()
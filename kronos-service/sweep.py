@@ -0,0 +1,206 @@
+# Parameter sweep for the simple_signal heuristic
+# - Loads one candle history and scores every rolling window under each combination of
+#   SignalParams and client thresholds (KRONOS_LONG_THRESHOLD / KRONOS_SHORT_THRESHOLD /
+#   KRONOS_MIN_CONFIDENCE)
+# - Work is shared across combinations: the per-window mean/vol (rolling.signal_stats, one pass of
+#   anchored running sums) once per (close_window, avg_window), the confidence once per set of
+#   confidence parameters; thresholds only re-mask the same arrays
+# - A combination is scored by the forward return over --horizon candles of the trades its
+#   thresholds take, gated like SmartSignalAnalyzer: long when score_long >= long_threshold and
+#   score_long > score_short, short symmetrically, both only when confidence >= min_confidence
+# - Needs numpy
+#
+# Usage: python sweep.py ../data/real_historical_data_2022_2024.json --grid avg_window=10,20,40 \
+#          slope_scale=1:4:0.5 long_threshold=0.55:0.75:0.05 min_confidence=0.5:0.7:0.05 --top 20
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import argparse
+import csv
+import itertools
+import os
+import sys
+
+from backtest import iter_candles
+from rolling import signal_stats
+from signal_engine import DEFAULT_PARAMS, NUMPY_AVAILABLE, SignalParams, np
+from streaming import DEFAULT_LOOKBACK
+
+THRESHOLDS = {
+    "long_threshold": float(os.environ.get("KRONOS_LONG_THRESHOLD", "0.62")),
+    "short_threshold": float(os.environ.get("KRONOS_SHORT_THRESHOLD", "0.62")),
+    "min_confidence": float(os.environ.get("KRONOS_MIN_CONFIDENCE", "0.55")),
+}
+INT_PARAMS = ("close_window", "avg_window")
+METRICS = ("trades", "hit_rate", "mean_return", "total_return")
+MIN_ROWS = 10  # windows shorter than this score neutral
+
+
+def load_closes(rows: Iterable[List[float]]) -> "np.ndarray":
+    """Closes in time order; like /forecast/stream, late candles are dropped and a repeated
+    timestamp replaces the previous close."""
+    closes: List[float] = []
+    last = None
+    for row in rows:
+        ts = row[0]
+        if last is not None and ts < last:
+            continue
+        if ts == last:
+            closes[-1] = float(row[4])
+        else:
+            closes.append(float(row[4]))
+        last = ts
+    return np.asarray(closes, dtype=np.float64)
+
+
+def _scores(closes: "np.ndarray", n: "np.ndarray", avg: "np.ndarray", vol: "np.ndarray"):
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        slope = (closes - avg) / np.where(vol == 0.0, 1.0, vol)
+        long_score = np.clip(1.0 / (1.0 + np.exp(-slope)), 0.0, 1.0)
+    warm = n < MIN_ROWS
+    long_score[warm] = 0.5
+    return slope, long_score, 1.0 - long_score, warm
+
+
+def _conf(abs_slope, n, warm, params: SignalParams) -> "np.ndarray":
+    trend = np.clip(abs_slope / params.slope_scale, 0.0, 1.0)
+    sample = np.clip(n / params.sample_norm, 0.0, 1.0)
+    conf = np.minimum(0.9, params.conf_base + params.conf_trend * trend + params.conf_sample * sample)
+    conf = np.clip(np.nan_to_num(conf, nan=0.0), 0.0, 1.0)
+    conf[warm] = 0.4
+    return conf
+
+
+def signals(
+    closes: "np.ndarray", params: SignalParams = DEFAULT_PARAMS, lookback: int = DEFAULT_LOOKBACK
+) -> Dict[str, "np.ndarray"]:
+    """simple_signal(rows[max(0, i - lookback + 1):i + 1], params) for every candle i, as arrays."""
+    n, avg, vol = signal_stats(closes, lookback, params.close_window, params.avg_window)
+    slope, long_score, short_score, warm = _scores(closes, n, avg, vol)
+    return {"long": long_score, "short": short_score, "conf": _conf(np.abs(slope), n, warm, params)}
+
+
+def parse_values(name: str, spec: str) -> List[Any]:
+    """'a,b,c' or an inclusive range 'start:stop:step'."""
+    cast = int if name in INT_PARAMS else float
+    if ":" in spec:
+        start, stop, step = (float(x) for x in spec.split(":"))
+        if step <= 0:
+            raise ValueError(f"{name}: step must be positive")
+        count = int(round((stop - start) / step)) + 1
+        values = [round(start + i * step, 10) for i in range(max(0, count))]
+    else:
+        values = [float(x) for x in spec.split(",") if x.strip()]
+    if not values:
+        raise ValueError(f"{name}: no values in {spec!r}")
+    return [cast(v) for v in values]
+
+
+def parse_grid(specs: Iterable[str]) -> Dict[str, List[Any]]:
+    grid: Dict[str, List[Any]] = {name: [getattr(DEFAULT_PARAMS, name)] for name in SignalParams._fields}
+    grid.update({name: [value] for name, value in THRESHOLDS.items()})
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in grid:
+            raise ValueError(f"unknown parameter {name!r}; expected one of {sorted(grid)}")
+        grid[name] = parse_values(name, values)
+    for name in INT_PARAMS:
+        if min(grid[name]) < 1:
+            raise ValueError(f"{name} must be >= 1")
+    return grid
+
+
+def combinations(grid: Dict[str, List[Any]]) -> int:
+    total = 1
+    for values in grid.values():
+        total *= len(values)
+    return total
+
+
+def _side(mask: "np.ndarray", fwd: "np.ndarray", wins: "np.ndarray") -> Tuple[int, int, float]:
+    return int(np.count_nonzero(mask)), int(np.count_nonzero(mask & wins)), float(fwd @ mask)
+
+
+def sweep(
+    closes: "np.ndarray", grid: Dict[str, List[Any]], lookback: int = DEFAULT_LOOKBACK, horizon: int = 4
+) -> Iterator[Dict[str, Any]]:
+    """One result row (parameters + METRICS) per grid combination."""
+    if horizon < 1:
+        raise ValueError("horizon must be >= 1")
+    fwd = np.zeros_like(closes)
+    fwd[:-horizon] = closes[horizon:] / closes[:-horizon] - 1.0
+    valid = np.zeros(len(closes), dtype=bool)
+    valid[:-horizon] = True
+    up, down = fwd > 0.0, fwd < 0.0
+    conf_axes = [grid[name] for name in ("slope_scale", "conf_base", "conf_trend", "conf_sample", "sample_norm")]
+
+    for close_window, avg_window in itertools.product(grid["close_window"], grid["avg_window"]):
+        n, avg, vol = signal_stats(closes, lookback, close_window, avg_window)
+        slope, long_score, short_score, warm = _scores(closes, n, avg, vol)
+        abs_slope = np.abs(slope)
+        going_long = valid & (long_score > short_score)
+        going_short = valid & (short_score > long_score)
+        longs = [going_long & (long_score >= t) for t in grid["long_threshold"]]
+        shorts = [going_short & (short_score >= t) for t in grid["short_threshold"]]
+
+        for scale, base, trend, sample, norm in itertools.product(*conf_axes):
+            params = SignalParams(close_window, avg_window, scale, base, trend, sample, norm)
+            conf = _conf(abs_slope, n, warm, params)
+            for min_conf in grid["min_confidence"]:
+                confident = conf >= min_conf
+                # each side's trades depend only on its own threshold: (trades, hits, return) per threshold
+                long_side = zip(grid["long_threshold"], [_side(m & confident, fwd, up) for m in longs])
+                short_side = zip(grid["short_threshold"], [_side(m & confident, fwd, down) for m in shorts])
+                for (long_t, lng), (short_t, sht) in itertools.product(long_side, list(short_side)):
+                    trades, hits, total = lng[0] + sht[0], lng[1] + sht[1], lng[2] - sht[2]
+                    row: Dict[str, Any] = params._asdict()
+                    row.update(long_threshold=long_t, short_threshold=short_t, min_confidence=min_conf)
+                    row.update(
+                        trades=trades,
+                        hit_rate=hits / trades if trades else 0.0,
+                        mean_return=total / trades if trades else 0.0,
+                        total_return=total,
+                    )
+                    yield row
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Grid-search simple_signal parameters and client thresholds")
+    parser.add_argument("input", help="JSON array of candles, e.g. data/real_historical_data_2022_2024.json")
+    parser.add_argument(
+        "--grid",
+        nargs="*",
+        default=[],
+        metavar="NAME=VALUES",
+        help=f"values as a,b,c or start:stop:step; names: {', '.join(SignalParams._fields + tuple(THRESHOLDS))}",
+    )
+    parser.add_argument("--lookback", type=int, default=DEFAULT_LOOKBACK, help="candles per window (default 480)")
+    parser.add_argument("--horizon", type=int, default=4, help="candles ahead used to score a trade")
+    parser.add_argument("--min-trades", type=int, default=30, help="ignore combinations with fewer trades")
+    parser.add_argument("--sort", choices=METRICS, default="mean_return")
+    parser.add_argument("--top", type=int, default=20, help="rows to print (0 = all)")
+    parser.add_argument("-o", "--output", help="write every combination as CSV")
+    args = parser.parse_args(argv)
+    if not NUMPY_AVAILABLE:
+        parser.error("sweep.py needs numpy (installed, and KRONOS_SIGNAL_BACKEND not set to python)")
+    try:
+        grid = parse_grid(args.grid)
+    except ValueError as e:
+        parser.error(str(e))
+
+    closes = load_closes(iter_candles(args.input))
+    print(f"[Kronos] {combinations(grid)} combinations over {len(closes)} candles", file=sys.stderr)
+    rows = list(sweep(closes, grid, args.lookback, args.horizon))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    ranked = sorted((r for r in rows if r["trades"] >= args.min_trades), key=lambda r: r[args.sort], reverse=True)
+    writer = csv.DictWriter(sys.stdout, fieldnames=list(rows[0]), lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(ranked[: args.top or None])
+
+
+if __name__ == "__main__":
+    main()
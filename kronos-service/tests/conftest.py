@@ -0,0 +1,109 @@
+import http.client
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+# make the service modules (app.py, signal_engine.py, ...) importable from the tests
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(SERVICE_DIR)
+if SERVICE_DIR not in sys.path:
+    sys.path.insert(0, SERVICE_DIR)
+
+# minute candles for the model, batching and coalescing tests
+ROWS = [[1_700_000_000_000 + i * 60_000, 1.0, 2.0, 0.5, 100.0 + (i % 9), 10.0] for i in range(300)]
+
+
+@pytest.fixture()
+def service_models(monkeypatch):
+    """Swap in an empty ModelRegistry for the service; the test registers its models on it.
+
+    install(default=..., cache_size=0, flights=False) also replaces the result cache (0 = off)
+    and, with flights, the single-flight table, so tests do not share state through them.
+    """
+    import app
+    import models
+    from coalesce import SingleFlight
+
+    def install(default: str = models.DEFAULT_MODEL, cache_size: int = 0, flights: bool = False):
+        registry = models.ModelRegistry(default=default)
+        monkeypatch.setattr(app, "REGISTRY", registry)
+        monkeypatch.setattr(models, "REGISTRY", registry)  # score_with resolves names here
+        monkeypatch.setattr(app.cache, "CACHE", app.cache.ForecastCache(cache_size, 60))
+        if flights:
+            monkeypatch.setattr(app, "FLIGHTS", SingleFlight())
+        return registry
+
+    return install
+
+
+@pytest.fixture()
+def fallback_server():
+    """Start fallback.FallbackServer on a free port: serve(max_requests, handler=..., **settings) -> (port, thread).
+
+    max_requests > 0 stops the server after that many requests; the rest are stopped after the test.
+    """
+    import app
+    import fallback
+
+    servers = []
+
+    def serve(max_requests: int, handler=None, **kwargs):
+        handler = handler or app.ServiceHandler
+        httpd = fallback.FallbackServer(("127.0.0.1", 0), handler, max_requests=max_requests, **kwargs)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        servers.append(httpd)
+        return httpd.server_address[1], thread
+
+    yield serve
+    for httpd in servers:
+        httpd.shutdown()  # returns at once if max_requests already stopped it
+        httpd.server_close()
+
+
+@pytest.fixture(params=["fastapi", "fallback"])
+def service_post(request, fallback_server):
+    """post(path, body, headers=None) -> (status, payload) against either server, for parity tests.
+
+    A dict body is sent as JSON, bytes as they are (set the Content-Type in headers).
+
+    FastAPI's {"detail": {...}} error bodies are unwrapped to the fallback's {"error": ..., "message": ...};
+    post.server names the server under test.
+    """
+    import app
+
+    if request.param == "fastapi":
+        if not app.FASTAPI_AVAILABLE:
+            pytest.skip("fastapi not installed")
+        from fastapi.testclient import TestClient
+
+        client = TestClient(app.app)
+
+        def post(path, body, headers=None):
+            if isinstance(body, bytes):
+                resp = client.post(path, content=body, headers=headers)
+            else:
+                resp = client.post(path, json=body, headers=headers)
+            payload = resp.json()
+            return resp.status_code, payload["detail"] if isinstance(payload.get("detail"), dict) else payload
+
+        post.server = request.param
+        return post
+    port, _ = fallback_server(0, threads=2)
+
+    def post(path, body, headers=None):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        try:
+            if not isinstance(body, bytes):
+                body, headers = json.dumps(body), {"Content-Type": "application/json", **(headers or {})}
+            conn.request("POST", path, body=body, headers=headers or {})
+            resp = conn.getresponse()
+            return resp.status, json.loads(resp.read())
+        finally:
+            conn.close()
+
+    post.server = request.param
+    return post
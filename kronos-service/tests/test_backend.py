@@ -0,0 +1,25 @@
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import SERVICE_DIR
+
+PROBE = "import app, backend, json; print(json.dumps([backend.BACKEND, app.FALLBACK_IMPL, app.FASTAPI_IMPL]))"
+
+
+@pytest.mark.parametrize("requested", ["python", "auto", "bogus"])
+def test_backend_is_picked_once_at_import(requested):
+    env = dict(os.environ, KRONOS_SIGNAL_BACKEND=requested)
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=SERVICE_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    active, fallback_impl, fastapi_impl = json.loads(out.stdout.splitlines()[-1])
+    numpy_installed = importlib.util.find_spec("numpy") is not None
+    expected = "numpy" if numpy_installed and requested != "python" else "python"
+    assert active == expected
+    assert (fallback_impl, fastapi_impl) == (f"http.server+{expected}", f"fastapi+{expected}")
+    assert ("unknown KRONOS_SIGNAL_BACKEND" in out.stderr) == (requested == "bogus")
@@ -0,0 +1,59 @@
+import io
+import json
+import os
+
+import pytest
+
+import backtest
+from conftest import REPO_DIR
+from signal_engine import simple_signal
+
+HISTORY_FILE = os.path.join(REPO_DIR, "data", "historical_data.json")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_iter_json_array_matches_json_load(chunk_size):
+    doc = [{"timestamp": 1, "close": 1.5e3, "note": "a, ]b"}, [1, 2.25, 3, 4, -5e-3, 6], 123456789, [], {}]
+    text = json.dumps(doc, indent=2)
+    assert list(backtest.iter_json_array(io.StringIO(text), chunk_size)) == doc
+    assert list(backtest.iter_json_array(io.StringIO(" [ ] "), chunk_size)) == []
+    with pytest.raises(ValueError):
+        list(backtest.iter_json_array(io.StringIO('[{"a": 1}, {"b"'), chunk_size))
+
+
+def test_scores_match_simple_signal_on_history():
+    if not os.path.exists(HISTORY_FILE):
+        pytest.skip("historical candle file not available")
+    with open(HISTORY_FILE, "r", encoding="utf-8") as f:
+        candles = json.load(f)[:1500]
+    rows = [backtest.candle_row(c) for c in candles]
+    scores = list(backtest.score_rows(rows, lookback=480))
+    assert [ts for ts, _ in scores] == [r[0] for r in rows]
+    for end in range(1, len(rows) + 1, 37):
+        expected = simple_signal(rows[max(0, end - 480):end])
+        assert scores[end - 1][1] == pytest.approx(expected, rel=1e-9, abs=1e-12)
+
+
+def test_cli_writes_one_line_per_candle(tmp_path):
+    rows = [[1_700_000_000_000 + i * 900_000, 1, 1, 1, 100.0 + (i % 11), 1] for i in range(300)]
+    src = tmp_path / "candles.json"
+    src.write_text(json.dumps([{"timestamp": r[0], "close": r[4]} for r in rows]))
+    out = tmp_path / "scores.jsonl"
+    backtest.main([str(src), "-o", str(out), "--format", "jsonl", "--lookback", "50"])
+    lines = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [line["timestamp"] for line in lines] == [r[0] for r in rows]
+    assert lines[-1]["confidence"] == pytest.approx(simple_signal(rows[-50:])["conf"], rel=1e-9)
+
+
+@pytest.mark.parametrize("lookback,shards", [(480, 5), (480, 97), (50, 13), (15, 300)])
+def test_sharded_output_is_byte_identical(lookback, shards):
+    if not os.path.exists(HISTORY_FILE):
+        pytest.skip("historical candle file not available")
+    rows = list(backtest.iter_candles(HISTORY_FILE))[:6000]
+    # a still-forming candle revised in place and a late candle that must be skipped
+    rows.insert(3000, [rows[2999][0], 0, 0, 0, rows[2999][4] + 5.0, 0])
+    rows.insert(4000, [rows[100][0], 0, 0, 0, 1.0, 0])
+    single, sharded = io.StringIO(), io.StringIO()
+    count = backtest.write_scores(backtest.score_rows(rows, lookback), single)
+    assert backtest.score_sharded(rows, sharded, lookback, workers=2, shards=shards) == count
+    assert sharded.getvalue() == single.getvalue()
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+import app
+import batcher
+from batcher import MicroBatcher
+from conftest import ROWS
+from executor import Saturated
+
+
+@pytest.fixture()
+def counted(service_models):
+    """A model that records the size of every call it gets."""
+    calls = []
+
+    def scorer(series):
+        calls.append(len(series))
+        if any(len(s) == 13 for s in series):
+            raise ZeroDivisionError("bad series")
+        return [{"long": 0.6, "short": 0.4, "conf": len(s) / 1000.0} for s in series]
+
+    service_models().register("counted", "1.0.0", lambda: scorer)
+    return calls
+
+
+def _burst(run, sizes):
+    results, threads = [None] * len(sizes), []
+    start = threading.Barrier(len(sizes))
+
+    def call(k):
+        start.wait()
+        results[k] = run(k, sizes[k])
+
+    for k in range(len(sizes)):
+        threads.append(threading.Thread(target=call, args=(k,)))
+        threads[-1].start()
+    for t in threads:
+        t.join(5)
+    return results
+
+
+def test_burst_is_scored_in_one_call_and_split_back(counted):
+    mb = MicroBatcher("counted", max_wait_ms=100, max_batch=64)
+    mb.submit([ROWS[:5]]).result(5)  # first arrival has no gap yet: dispatched at once
+    sizes = [10 + k for k in range(12) if k != 3]
+    results = _burst(lambda k, n: mb.submit([ROWS[:n], ROWS[: n + 100]]).result(5), sizes)
+    assert sum(counted[1:]) == 2 * len(sizes) and len(counted) <= 3  # a burst, not one call per caller
+    for n, sigs in zip(sizes, results):
+        assert [s["conf"] for s in sigs] == [n / 1000.0, (n + 100) / 1000.0]
+    stats = mb.stats()
+    assert stats["items"] == 1 + 2 * len(sizes) and stats["largest"] == max(counted) and stats["queued"] == 0
+
+
+def test_sparse_requests_do_not_wait_and_batches_are_capped(counted):
+    mb = MicroBatcher("counted", max_wait_ms=300, max_batch=4)
+    for _ in range(2):
+        started = time.monotonic()
+        mb.submit([ROWS[:20]]).result(5)
+        time.sleep(0.35)
+        assert time.monotonic() - started < 0.6
+    assert counted == [1, 1]
+    _burst(lambda k, n: mb.submit([ROWS[:n]]).result(5), [20 + k for k in range(10)])
+    assert max(counted) <= 4 and sum(counted) == 12
+
+
+def test_failures_reach_every_caller_in_the_batch(counted, monkeypatch):
+    mb = MicroBatcher("counted", max_wait_ms=100, max_batch=64)
+    mb.submit([ROWS[:20]]).result(5)
+    futures = _burst(lambda k, n: mb.submit([ROWS[:n]]), [13, 14, 15])
+    errors = [f.exception(5) for f in futures]
+    assert sum(isinstance(e, ZeroDivisionError) for e in errors) >= 1
+    assert all(e is None or isinstance(e, ZeroDivisionError) for e in errors)
+
+    def full(*_, **__):
+        raise Saturated("counted", 1)
+
+    monkeypatch.setattr(batcher.executor_for("counted"), "submit", full)
+    with pytest.raises(Saturated):
+        mb.submit([ROWS[:20]]).result(5)
+
+
+def test_requests_go_through_the_batcher(counted, monkeypatch):
+    monkeypatch.setattr(batcher, "DEFAULT_WAIT_MS", 50.0)
+    monkeypatch.setattr(batcher, "_BATCHERS", {})
+    item = {"symbol": "ETH-USDT-SWAP", "interval": "1m", "model": "counted"}
+    app.build_batch([dict(item, ohlcv=ROWS[:30])], "test")
+    out = _burst(lambda k, n: app.build_batch([dict(item, ohlcv=ROWS[:n])], "test"), [40 + k for k in range(8)])
+    assert [r["results"][0]["confidence"] for r in out] == [(40 + k) / 1000.0 for k in range(8)]
+    assert len(counted) < 9
+    assert batcher.stats()["counted"]["items"] == 9
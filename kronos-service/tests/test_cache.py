@@ -0,0 +1,70 @@
+import pytest
+
+import cache as cache_mod
+from cache import ForecastCache, fingerprint
+
+ROWS = [[1_700_000_000_000 + i * 60_000, 1.0, 2.0, 0.5, 100.0 + i, 10.0] for i in range(300)]
+
+
+def test_fingerprint_matches_across_representations():
+    if not cache_mod.NUMPY_AVAILABLE:
+        pytest.skip("numpy backend not active")
+    np = cache_mod.np
+    arr = np.asarray(ROWS, dtype=np.float64)
+    last_ts = ROWS[-1][0]
+    key = fingerprint("ETH-USDT-SWAP", "1m", ROWS, last_ts)
+    assert fingerprint("ETH-USDT-SWAP", "1m", arr, last_ts) == key
+    assert fingerprint("ETH-USDT-SWAP", "1m", arr[:, 4].copy(), last_ts) == key
+    changed = [list(r) for r in ROWS]
+    changed[-1][4] += 0.01
+    assert fingerprint("ETH-USDT-SWAP", "1m", changed, last_ts) != key
+
+
+def test_lru_eviction_and_counters():
+    c = ForecastCache(max_entries=2, ttl_s=60)
+    c.put("a", 1)
+    c.put("b", 2)
+    assert c.get("a") == 1  # a becomes most recently used
+    c.put("c", 3)
+    assert c.get("b") is None
+    assert (c.get("a"), c.get("c")) == (1, 3)
+    stats = c.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (3, 1, 1, 2)
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_mod.time, "monotonic", lambda: now[0])
+    c = ForecastCache(max_entries=10, ttl_s=5)
+    c.put("k", "v")
+    now[0] += 4.9
+    assert c.get("k") == "v"
+    now[0] += 0.2
+    assert c.get("k") is None
+    assert c.stats()["expirations"] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    c = ForecastCache(max_entries=0)
+    c.put("k", "v")
+    assert c.get("k") is None and c.stats()["misses"] == 0
+
+
+@pytest.mark.skipif(not hasattr(cache_mod.os, "fork"), reason="needs fork()")
+def test_shared_cache_is_visible_across_fork():
+    c = cache_mod.SharedForecastCache(slots=64, ttl_s=60)
+    key = fingerprint("ETH-USDT-SWAP", "1m", ROWS, ROWS[-1][0])
+    pid = cache_mod.os.fork()
+    if pid == 0:
+        c.put(key, {"long": 0.7, "short": 0.3, "conf": 0.6})
+        cache_mod.os._exit(0)
+    cache_mod.os.waitpid(pid, 0)
+    assert c.get(key) == {"long": 0.7, "short": 0.3, "conf": 0.6}
+    assert c.get(("other",)) is None
+
+
+def test_shared_cache_rejects_torn_slot():
+    c = cache_mod.SharedForecastCache(slots=1, ttl_s=60)
+    c.put("k", {"long": 0.7, "short": 0.3, "conf": 0.6})
+    c._mm[20] ^= 0xFF  # corrupt the payload without fixing the checksum
+    assert c.get("k") is None
@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+import candle_store
+from candle_store import CandleStore, SeriesNotFound
+
+STEP = 900_000
+CANDLES = [
+    {"timestamp": 1_700_000_000_000 + i * STEP, "open": 1.0, "high": 2.0, "low": 0.5, "close": 100.0 + i, "volume": 3.0}
+    for i in range(600)
+]
+
+
+def _closes(values):
+    return [float(v) for v in values]
+
+
+def test_convert_and_read_windows(tmp_path):
+    src = tmp_path / "history.json"
+    src.write_text(json.dumps(CANDLES, indent=2))
+    assert candle_store.convert([str(src)], str(tmp_path / "store")) == {("ETH-USDT-SWAP", "15m"): 600}
+
+    store = CandleStore(str(tmp_path / "store"))
+    closes, last_ts = store.window("ETH-USDT-SWAP", "15m", CANDLES[299]["timestamp"], 200)
+    assert last_ts == CANDLES[299]["timestamp"]
+    assert _closes(closes) == [c["close"] for c in CANDLES[100:300]]
+    # between two candles: ends at the earlier one; a short history returns what exists
+    closes, last_ts = store.window("ETH-USDT-SWAP", "15m", CANDLES[9]["timestamp"] + STEP // 2, 480)
+    assert (last_ts, len(closes)) == (CANDLES[9]["timestamp"], 10)
+    with pytest.raises(SeriesNotFound):
+        store.window("ETH-USDT-SWAP", "15m", CANDLES[0]["timestamp"] - 1, 10)
+    with pytest.raises(SeriesNotFound):
+        store.window("BTC-USDT-SWAP", "15m", CANDLES[-1]["timestamp"], 10)
+    with pytest.raises(ValueError):
+        store.window("../etc", "15m", 0, 10)
+
+
+def test_okx_cache_entries_merge_into_existing_series(tmp_path):
+    root = str(tmp_path / "store")
+    src = tmp_path / "history.json"
+    src.write_text(json.dumps(CANDLES[:500]))
+    candle_store.convert([str(src)], root)
+    store = CandleStore(root)
+    assert store.series("ETH-USDT-SWAP", "15m").rows == 500
+
+    newer = [dict(c, close=c["close"] + 0.5) for c in CANDLES[450:]]
+    okx = tmp_path / "okx.json"
+    okx.write_text(
+        json.dumps({"key": "/api/v5/market/candles?instId=ETH-USDT-SWAP&bar=15m&limit=150", "item": {"data": newer}})
+    )
+    ticker = tmp_path / "ticker.json"
+    ticker.write_text(json.dumps({"key": "/api/v5/market/ticker?instId=ETH-USDT-SWAP", "item": {"data": {}}}))
+    assert candle_store.convert([str(okx), str(ticker)], root) == {("ETH-USDT-SWAP", "15m"): 600}
+
+    series = store.series("ETH-USDT-SWAP", "15m")  # re-opened after the swap
+    assert (series.rows, series.last_ts) == (600, CANDLES[-1]["timestamp"])
+    closes, _ = series.window(CANDLES[-1]["timestamp"], 160)
+    assert _closes(closes) == [c["close"] for c in CANDLES[440:450]] + [c["close"] for c in newer]
+    assert [s["interval"] for s in store.list()] == ["15m"]
+
+
+def test_forecast_by_reference_matches_rows(tmp_path, monkeypatch):
+    import app
+    from signal_engine import simple_signal
+
+    src = tmp_path / "history.json"
+    src.write_text(json.dumps(CANDLES))
+    candle_store.convert([str(src)], str(tmp_path / "store"))
+    monkeypatch.setattr(candle_store, "STORE", CandleStore(str(tmp_path / "store")))
+
+    ref = {"symbol": "ETH-USDT-SWAP", "interval": "15m", "end_ts": CANDLES[399]["timestamp"] + 1, "lookback": 300}
+    item = app.resolve_ref(ref)
+    rows = [[c["timestamp"], c["open"], c["high"], c["low"], c["close"], c["volume"]] for c in CANDLES[100:400]]
+    first = app.build_batch([item], "test")["results"][0]
+    assert (first["meta"]["cached"], first["meta"]["n"]) == (False, 300)
+    assert (first["score_long"], first["confidence"]) == pytest.approx(
+        (simple_signal(rows)["long"], simple_signal(rows)["conf"]), rel=1e-12
+    )
+    # the same reference is served from the cache, keyed on the resolved window
+    again = app.resolve_ref(dict(ref, end_ts=CANDLES[399]["timestamp"]))
+    assert app.build_batch([again], "test")["results"][0]["meta"]["cached"] is True
+    assert app._with_ref_meta(first, item)["meta"]["ref"] == {"last_ts": CANDLES[399]["timestamp"]}
+    with pytest.raises(SeriesNotFound):
+        app.resolve_ref(dict(ref, symbol="BTC-USDT-SWAP"))
+
+
+def test_reader_that_skipped_rewrites_sees_the_latest(tmp_path):
+    # inodes are reused across rewrites, so the store compares meta.json's generation id instead
+    root = str(tmp_path / "store")
+    store = CandleStore(root)
+    ts = CANDLES[0]["timestamp"]
+    stamps = set()
+    for k in range(6):
+        candle_store.write_series(root, "ETH-USDT-SWAP", "15m", {ts: (1.0, 2.0, 0.5, 200.0 + k, 3.0)})
+        if k % 2:
+            continue  # this reader misses every other generation
+        series = store.series("ETH-USDT-SWAP", "15m")
+        assert _closes(store.window("ETH-USDT-SWAP", "15m", ts, 1)[0]) == [200.0 + k]
+        stamps.add(series.stamp)
+    assert len(stamps) == 3
+
+
+@pytest.mark.parametrize("end_ts", [float("nan"), float("inf"), float("-inf")])
+def test_ref_endpoint_rejects_non_finite_end_ts_on_both_servers(tmp_path, monkeypatch, service_post, end_ts):
+    src = tmp_path / "history.json"
+    src.write_text(json.dumps(CANDLES))
+    candle_store.convert([str(src)], str(tmp_path / "store"))
+    monkeypatch.setattr(candle_store, "STORE", CandleStore(str(tmp_path / "store")))
+    ref = {"symbol": "ETH-USDT-SWAP", "interval": "15m", "end_ts": CANDLES[399]["timestamp"], "lookback": 300}
+    status, payload = service_post("/forecast/ref", ref)
+    assert (status, payload["meta"]["ref"]["last_ts"]) == (200, CANDLES[399]["timestamp"])
+    rejected = 422 if service_post.server == "fastapi" else 400
+    assert service_post("/forecast/ref", dict(ref, end_ts=end_ts))[0] == rejected
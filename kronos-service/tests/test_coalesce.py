@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+
+import app
+from conftest import ROWS
+
+ITEM = {"symbol": "ETH-USDT-SWAP", "interval": "1m", "ohlcv": ROWS, "last_ts": ROWS[-1][0], "model": "gated"}
+
+
+@pytest.fixture()
+def gated(service_models):
+    """A model that blocks until released and counts the series it scores."""
+    gate, calls = threading.Event(), []
+
+    def scorer(series):
+        calls.append(len(series))
+        if not gate.wait(5):
+            raise TimeoutError("gate never opened")
+        if ROWS[:10] in series:
+            raise ZeroDivisionError("bad series")
+        return [{"long": 0.7, "short": 0.3, "conf": 0.6}] * len(series)
+
+    service_models(cache_size=16, flights=True).register("gated", "1.0.0", lambda: scorer)
+    return gate, calls, app.FLIGHTS
+
+
+def _concurrently(items, callers):
+    results, errors = [None] * callers, [None] * callers
+
+    def call(k):
+        try:
+            results[k] = app.build_batch([items], "test")["results"][0]
+        except Exception as e:  # noqa: BLE001
+            errors[k] = e
+
+    threads = [threading.Thread(target=call, args=(k,)) for k in range(callers)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+def _wait_for(flights, followers):
+    deadline = time.monotonic() + 5
+    while flights.stats()["followers"] < followers:
+        assert time.monotonic() < deadline, "callers never joined the flight"
+        time.sleep(0.005)
+
+
+def test_identical_concurrent_requests_score_once(gated):
+    gate, calls, flights = gated
+    threads, results, errors = _concurrently(ITEM, 8)
+    _wait_for(flights, 7)
+    gate.set()
+    for t in threads:
+        t.join(5)
+    assert errors == [None] * 8 and calls == [1]
+    assert {r["confidence"] for r in results} == {0.6}
+    assert sum(bool(r["meta"].get("coalesced")) for r in results) == 7
+    assert flights.stats()["in_flight"] == 0
+    # the leader cached the result before releasing the flight
+    assert app.build_batch([ITEM], "test")["results"][0]["meta"]["cached"]
+    # duplicates inside one batch are scored once as well
+    fresh = dict(ITEM, last_ts=ITEM["last_ts"] + 60_000)
+    batch = app.build_batch([fresh, fresh], "test")["results"]
+    assert calls == [1, 1] and batch[1]["meta"]["coalesced"]
+
+
+def test_followers_share_the_leaders_failure(gated):
+    gate, calls, flights = gated
+    broken = dict(ITEM, ohlcv=ROWS[:10], last_ts=ROWS[9][0])
+    threads, results, errors = _concurrently(broken, 3)
+    _wait_for(flights, 2)
+    gate.set()
+    for t in threads:
+        t.join(5)
+    assert calls == [1] and all(isinstance(e, ZeroDivisionError) for e in errors)
+    assert flights.stats()["in_flight"] == 0
@@ -0,0 +1,187 @@
+import http.client
+import itertools
+import json
+import math
+import os
+import pickle
+import socket
+import threading
+import time
+
+import pytest
+
+import app
+import degrade
+import executor
+import models
+from coalesce import SingleFlight
+from conftest import SERVICE_DIR
+from deadline import HEADER_BUDGET, Deadline, DeadlineExceeded, from_budget, run_unless_expired
+
+with open(os.path.join(SERVICE_DIR, "sample.json"), "rb") as f:
+    SAMPLE = json.loads(f.read())
+_names = itertools.count()
+
+
+@pytest.fixture()
+def slow(service_models):
+    """A thread-pool model with one worker that blocks until released; records what it scores."""
+    gate, calls = threading.Event(), []
+    name = f"slow{next(_names)}"
+
+    def scorer(series):
+        calls.append(len(series[0]))
+        gate.wait(5)
+        return [{"long": 0.7, "short": 0.3, "conf": 0.6}] * len(series)
+
+    service_models(default=name).register(name, "1.0.0", lambda: scorer, execution="thread")
+    run = executor.executor_for(name, "thread")
+    run.workers = 1
+    yield name, gate, calls, run
+    gate.set()
+    run.shutdown()
+
+
+def _item(rows=20):
+    ohlcv = [[1_700_000_000_000 + i * 60_000, 1.0, 2.0, 0.5, 100.0 + (i % 9), 10.0] for i in range(rows)]
+    return dict(SAMPLE, ohlcv=ohlcv)
+
+
+def test_budget_parsing_and_pickling():
+    now = time.monotonic()
+    assert from_budget("250", now).expires == pytest.approx(now + 0.25)
+    assert math.isinf(from_budget(None, now).expires) and from_budget(None, now).budget_ms() is None
+    for bad in ("soon", "0", "-5"):
+        with pytest.raises(ValueError):
+            from_budget(bad, now)
+    probed = Deadline(now + 1, probe=lambda: True)
+    copy = pickle.loads(pickle.dumps(probed))
+    assert copy.expires == probed.expires and copy.probe is None
+    with pytest.raises(DeadlineExceeded) as info:
+        run_unless_expired(Deadline(now - 1), pytest.fail)
+    assert not info.value.client_gone
+    probed.cancel()
+    with pytest.raises(DeadlineExceeded) as info:
+        run_unless_expired(probed, pytest.fail)
+    assert info.value.client_gone
+
+
+def test_expired_work_is_shed_from_the_executor_queue(slow):
+    name, gate, calls, run = slow
+    busy = run.submit(models.score_with, name, [[0] * 7])
+    queued = run.submit(models.score_with, name, [[0] * 9], deadline=Deadline(time.monotonic() + 0.05))
+    time.sleep(0.1)
+    gate.set()
+    busy.result(5)
+    with pytest.raises(DeadlineExceeded):
+        queued.result(5)
+    assert calls == [7] and run.stats()["shed"] == 1
+
+
+def test_build_batch_gives_up_at_the_deadline_and_reports_the_budget(slow):
+    name, gate, calls, run = slow
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        app.build_batch([_item()], "test", deadline=Deadline(started + 0.1))
+    assert time.monotonic() - started < 1.0
+    gate.set()
+    out = app.build_batch([_item(30)], "test", deadline=from_budget("1000"))["results"][0]
+    assert 0 < out["meta"]["budget_ms"] <= 1000
+
+
+def _until(predicate):
+    deadline = time.monotonic() + 5
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_follower_outlives_a_leader_whose_client_left(slow, monkeypatch):
+    name, gate, calls, run = slow
+    flights, observed = SingleFlight(), []
+    monkeypatch.setattr(app, "FLIGHTS", flights)
+    monkeypatch.setattr(degrade, "observe", lambda model, started, fut: observed.append(fut.exception() is None))
+    busy = run.submit(models.score_with, name, [[0] * 7])
+    connected, outcome = threading.Event(), {}
+    connected.set()
+
+    def call(who, deadline):
+        try:
+            outcome[who] = app.build_batch([_item()], "test", deadline=deadline)["results"][0]
+        except Exception as e:  # noqa: BLE001
+            outcome[who] = e
+
+    leader = threading.Thread(target=call, args=("leader", Deadline(probe=connected.is_set)))
+    leader.start()
+    _until(lambda: flights.stats()["leaders"] == 1)
+    follower = threading.Thread(target=call, args=("follower", Deadline(time.monotonic() + 5)))
+    follower.start()
+    _until(lambda: flights.stats()["followers"] == 1)
+    connected.clear()  # the leader's client hangs up while its work is queued behind `busy`
+    leader.join(5)
+    assert isinstance(outcome["leader"], DeadlineExceeded) and outcome["leader"].client_gone
+    gate.set()
+    busy.result(5)
+    follower.join(5)
+    out = outcome["follower"]
+    assert not isinstance(out, Exception), out
+    assert out["score_long"] == 0.7 and out["meta"]["coalesced"]
+    assert calls == [7, 20]  # the leader's queued call was shed, the follower's own submission scored
+    assert observed == [False, True]  # both calls reach the degradation ladder's latency window
+
+
+def test_fallback_server_sheds_work_for_a_closed_connection(slow):
+    name, gate, calls, run = slow
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(16)
+    thread = threading.Thread(target=app.run_fallback_server, kwargs={"sock": sock, "max_requests": 3}, daemon=True)
+    thread.start()
+    port = sock.getsockname()[1]
+    body = json.dumps(_item())
+
+    # 504 once the budget is spent; its work keeps the only worker busy
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("POST", "/forecast", body=body, headers={"Content-Type": "application/json", HEADER_BUDGET: "100"})
+    resp = conn.getresponse()
+    assert (resp.status, json.loads(resp.read())["error"]) == (504, "deadline_exceeded")
+
+    # a caller that hangs up while queued: its work never runs
+    gone = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    gone.request("POST", "/forecast", body=json.dumps(_item(25)), headers={"Content-Type": "application/json"})
+    time.sleep(0.1)
+    gone.sock.shutdown(socket.SHUT_RDWR)
+    gone.close()
+    deadline = time.monotonic() + 5
+    while run.stats()["in_flight"] > 2 or not calls:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    time.sleep(0.2)  # the probe notices within PROBE_INTERVAL_S
+    gate.set()
+    deadline = time.monotonic() + 5
+    while run.stats()["in_flight"]:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert calls == [20] and run.stats()["shed"] == 1  # the running request finished, the abandoned one was shed
+
+    conn.request("POST", "/forecast", body=body, headers={"Content-Type": "application/json", HEADER_BUDGET: "800"})
+    resp = conn.getresponse()
+    assert resp.status == 200 and 0 < json.loads(resp.read())["meta"]["budget_ms"] <= 800
+    conn.close()
+    thread.join(timeout=10)
+    sock.close()
+
+
+@pytest.mark.skipif(not app.FASTAPI_AVAILABLE, reason="fastapi not installed")
+def test_fastapi_deadlines(slow):
+    from fastapi.testclient import TestClient
+
+    name, gate, calls, run = slow
+    client = TestClient(app.app)
+    resp = client.post("/forecast", json=_item(), headers={HEADER_BUDGET: "100"})
+    assert (resp.status_code, resp.json()["detail"]["error"]) == (504, "deadline_exceeded")
+    assert client.post("/forecast", json=_item(), headers={HEADER_BUDGET: "soon"}).status_code == 400
+    gate.set()
+    resp = client.post("/forecast", json=_item(30), headers={HEADER_BUDGET: "900"})
+    assert resp.status_code == 200 and 0 < resp.json()["meta"]["budget_ms"] <= 900
+    assert "budget_ms" not in client.post("/forecast", json=_item(35)).json()["meta"]
@@ -0,0 +1,142 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+import app
+import degrade
+import executor
+import models
+from conftest import ROWS
+from degrade import Ladder
+from models import UnknownModel
+
+_names = itertools.count()
+
+
+@pytest.fixture()
+def heavy(service_models, monkeypatch):
+    """A one-worker thread-pool model that blocks on series over 50 rows until released, plus simple_signal."""
+    gate, calls = threading.Event(), []
+    name = f"heavy{next(_names)}"
+
+    def scorer(series):
+        calls.append([len(s) for s in series])
+        if max(map(len, series)) > 50:
+            gate.wait(5)
+        return [{"long": 0.9, "short": 0.1, "conf": 0.8}] * len(series)
+
+    registry = service_models(default=name)
+    registry.register(name, "2.0.0", lambda: scorer, execution="thread")
+    registry.register("simple_signal", "0.1.0", models._load_simple_signal)
+    monkeypatch.setattr(degrade, "_LADDERS", {})
+    monkeypatch.setattr(degrade, "_LATENCIES", {})
+    monkeypatch.setattr(degrade, "EVAL_INTERVAL_S", 0.0)
+    run = executor.executor_for(name, "thread")
+    run.workers = 1
+    yield name, gate, calls, run
+    gate.set()
+    run.shutdown()
+
+
+def _item(rows=120):
+    return {"symbol": "ETH-USDT-SWAP", "interval": "1m", "ohlcv": ROWS[:rows]}
+
+
+def test_shortened_lookback_tier(heavy):
+    name, gate, calls, run = heavy
+    with pytest.raises(UnknownModel):
+        app.build_batch([dict(_item(), model=f"{name}:7")], "test")  # requests cannot mint tiers
+    assert models.REGISTRY.names() == [name, "simple_signal"]
+    spec = models.REGISTRY.resolve(f"{name}:50", shortened=True)
+    assert (spec.version, spec.execution, spec.lookback, spec.parent) == ("2.0.0", "thread", 50, name)
+    assert models.score_with(f"{name}:50", [ROWS[:120], ROWS[:30]]) and calls[-1] == [50, 30]
+    with pytest.raises(UnknownModel):
+        models.REGISTRY.resolve(f"{name}:50")  # registered for the ladder, still not a request model
+    for bad in (f"{name}:x", f"{name}:0", "missing:50", f"{name}:50:10"):
+        with pytest.raises(UnknownModel):
+            models.REGISTRY.resolve(bad, shortened=True)
+
+
+def test_queue_depth_steps_down_and_recovers(heavy):
+    name, gate, calls, run = heavy
+    degrade._LADDERS[name] = Ladder(name, [f"{name}:50", "simple_signal"], max_queue=2, hold_s=0.2)
+    busy = [run.submit(models.score_with, name, [ROWS[:100]]) for _ in range(2)]
+    meta = app.build_batch([_item(110)], "test")["results"][0]["meta"]
+    assert meta["degraded"] and (meta["tier"], meta["requested"], meta["model"]) == (1, name, f"{name}:50")
+
+    # the shortened tier runs on its own executor; once that is backed up too, the heuristic takes over
+    tier = executor.executor_for(f"{name}:50", "thread")
+    more = [tier.submit(models.score_with, name, [ROWS[:100]]) for _ in range(2)]
+    meta = app.build_batch([_item(120)], "test")["results"][0]["meta"]
+    assert (meta["tier"], meta["model"], meta["version"]) == (2, "simple_signal", "0.1.0")
+
+    gate.set()
+    for f in busy + more:
+        f.result(5)
+    time.sleep(0.25)
+    assert app.build_batch([_item(130)], "test")["results"][0]["meta"]["tier"] == 1  # one step per hold
+    time.sleep(0.25)
+    meta = app.build_batch([_item(140)], "test")["results"][0]["meta"]
+    assert "degraded" not in meta and meta["model"] == name
+    stats = degrade.stats()[name]
+    assert (stats["steps_down"], stats["steps_up"], stats["level"]) == (2, 2, 0)
+    tier.shutdown()
+
+
+def test_queue_depth_counts_inline_calls(heavy):
+    name, gate, calls, run = heavy
+    inline = f"{name}-inline"
+
+    def scorer(series):
+        gate.wait(5)
+        return [{"long": 0.6, "short": 0.4, "conf": 0.5}] * len(series)
+
+    models.REGISTRY.register(inline, "1.0.0", lambda: scorer)
+    degrade._LADDERS[inline] = Ladder(inline, ["simple_signal"], max_queue=2, hold_s=60)
+    threads = [
+        threading.Thread(target=app.build_batch, args=([dict(_item(100 + k), model=inline)], "test"))
+        for k in range(2)
+    ]
+    for t in threads:
+        t.start()
+    deadline = time.monotonic() + 5
+    while executor.executor_for(inline).in_flight < 2:  # both requests are inside the scorer
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+    meta = app.build_batch([dict(_item(110), model=inline)], "test")["results"][0]["meta"]
+    assert (meta["degraded"], meta["model"]) == (True, "simple_signal")
+    gate.set()
+    for t in threads:
+        t.join(5)
+    assert executor.executor_for(inline).in_flight == 0
+
+
+def test_p95_latency_steps_down(heavy, monkeypatch):
+    name, gate, calls, run = heavy
+    monkeypatch.setattr(degrade, "MIN_SAMPLES", 3)
+    degrade._LADDERS[name] = Ladder(name, ["simple_signal"], p95_ms=30, hold_s=60)
+    threading.Timer(0.05, gate.set).start()
+    for rows in (100, 101, 102):
+        assert app.build_batch([_item(rows)], "test")["results"][0]["meta"]["model"] == name
+    meta = app.build_batch([_item(103)], "test")["results"][0]["meta"]
+    assert (meta["degraded"], meta["model"]) == (True, "simple_signal")
+    assert degrade.stats()[name]["routed"] == {name: 3, "simple_signal": 1}
+
+
+def test_batch_routes_each_model_once(heavy):
+    name, gate, calls, run = heavy
+    gate.set()
+    degrade._LADDERS[name] = Ladder(name, ["simple_signal"], max_queue=100, hold_s=60)
+    items = [_item(rows) for rows in (100, 101, 102, 103)] + [dict(_item(), model="simple_signal")]
+    assert [r["meta"]["model"] for r in app.build_batch(items, "test")["results"]] == [name] * 4 + ["simple_signal"]
+    assert degrade.stats()[name]["routed"] == {name: 4, "simple_signal": 0}  # counted per item, not per item squared
+
+
+def test_disabled_without_thresholds(heavy):
+    name, gate, calls, run = heavy
+    gate.set()
+    assert degrade.ladder_for(name) is None
+    assert "degraded" not in app.build_batch([_item()], "test")["results"][0]["meta"]
+    assert degrade.stats() == {} and degrade._LATENCIES == {}
@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+
+from executor import ModelExecutor, Saturated
+from signal_engine import score_many
+
+ROWS = [[1_700_000_000_000 + i * 60_000, 1.0, 2.0, 0.5, 100.0 + (i % 7), 10.0] for i in range(240)]
+
+
+def test_inline_runs_on_the_calling_thread():
+    ex = ModelExecutor("m", "inline")
+    fut = ex.submit(threading.get_ident)
+    assert fut.done() and fut.result() == threading.get_ident()
+    with pytest.raises(ZeroDivisionError):
+        ex.submit(lambda: 1 / 0).result()
+
+
+def test_thread_pool_rejects_beyond_capacity():
+    ex = ModelExecutor("m", "thread", workers=1, max_queue=1)
+    gate = threading.Event()
+    running = [ex.submit(gate.wait, 5), ex.submit(gate.wait, 5)]  # one running, one queued
+    with pytest.raises(Saturated) as info:
+        ex.submit(gate.wait, 5)
+    assert info.value.retry_after_s >= 1
+    gate.set()
+    assert all(f.result(timeout=5) for f in running)
+    assert ex.submit(len, ROWS).result(timeout=5) == len(ROWS)
+    ex.shutdown()  # waits for the done callbacks, which run on the pool thread
+    stats = ex.stats()
+    assert (stats["rejected"], stats["completed"], stats["in_flight"]) == (1, 3, 0)
+
+
+def test_process_pool_matches_inline():
+    ex = ModelExecutor("m", "process", workers=2, max_queue=4)
+    try:
+        series = [ROWS, ROWS[:50], ROWS[:5]]
+        assert ex.submit(score_many, series).result(timeout=30) == score_many(series)
+    finally:
+        ex.shutdown()
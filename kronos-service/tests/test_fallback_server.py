@@ -0,0 +1,130 @@
+import http.client
+import json
+import os
+import socket
+import time
+
+import pytest
+
+import app
+import fallback
+import metrics
+from conftest import SERVICE_DIR
+
+with open(os.path.join(SERVICE_DIR, "sample.json"), "rb") as f:
+    BODY = f.read()
+
+
+class EchoHandler(fallback.FallbackHandler):
+    def do_POST(self):
+        self._stages = metrics.StageTimer()
+        body = self._read_body()
+        if body is not None:
+            self._send(200, body, "application/octet-stream")
+
+
+def test_transport_without_service_routes(fallback_server):
+    port, thread = fallback_server(max_requests=3, handler=EchoHandler, threads=1, keepalive_s=1)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    for body in (b"one", b"two"):
+        conn.request("POST", "/echo", body=body)
+        resp = conn.getresponse()
+        assert (resp.status, resp.read()) == (200, body)
+    conn.request("POST", "/echo", body=b"x", headers={"Content-Length": "-1"})
+    resp = conn.getresponse()
+    assert resp.status == 400  # and the connection is closed: the body cannot be framed
+    conn.close()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+
+
+def test_keepalive_serves_several_requests_on_one_connection(fallback_server):
+    port, thread = fallback_server(max_requests=4)
+    with open(os.path.join(SERVICE_DIR, "sample.json"), "rb") as f:
+        body = f.read()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    peer = None
+    for path in ("/forecast", "/forecast", "/nope"):
+        conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        payload = json.loads(resp.read())
+        assert resp.version == 11
+        assert (resp.status, "error" in payload) == ((404, True) if path == "/nope" else (200, False))
+        local = conn.sock.getsockname()
+        assert peer in (None, local)  # same TCP connection every time
+        peer = local
+    conn.request("GET", "/health")
+    assert conn.getresponse().status == 200
+    conn.close()
+    thread.join(timeout=10)  # max_requests reached: the server recycles itself
+    assert not thread.is_alive()
+
+
+def _post(conn, body=BODY):
+    conn.request("POST", "/forecast", body=body, headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    return resp.status, resp.read()
+
+
+def test_idle_keepalive_connections_do_not_hold_threads(fallback_server):
+    port, thread = fallback_server(max_requests=5, threads=1)
+    first = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    second = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    assert _post(first)[0] == 200
+    local = first.sock.getsockname()
+    started = time.monotonic()
+    assert _post(second)[0] == 200  # the only thread is not stuck waiting on the idle first connection
+    assert time.monotonic() - started < 1.0
+    assert _post(first)[0] == 200 and first.sock.getsockname() == local
+    second.request("GET", "/health")
+    connections = json.loads(second.getresponse().read())["connections"]
+    assert (connections["open"], connections["parked"]) == (2, 1)
+    assert _post(second)[0] == 200
+    for conn in (first, second):
+        conn.close()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+
+
+def test_connection_cap_idle_timeout_and_framing(fallback_server):
+    port, thread = fallback_server(max_requests=4, threads=2, keepalive_s=0.3, max_connections=2)
+    held = [http.client.HTTPConnection("127.0.0.1", port, timeout=5) for _ in range(2)]
+    for conn in held:
+        assert _post(conn)[0] == 200
+    extra = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        status, payload = _post(extra)
+        assert (status, json.loads(payload)["error"]) == (503, "too_many_connections")
+    except (ConnectionResetError, BrokenPipeError):
+        pass  # the refusal can race the request body; either way the connection is turned away
+    extra.close()
+
+    time.sleep(0.6)  # past keepalive_s: the server closes idle connections
+    for conn in held:
+        assert conn.sock.recv(1) == b""
+        conn.close()
+
+    raw = socket.create_connection(("127.0.0.1", port), timeout=5)
+    raw.sendall(b"POST /forecast HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\n0\r\n\r\n")
+    assert raw.makefile("rb").read().startswith(b"HTTP/1.1 411")  # answered, then closed: no framing to resume
+    raw.close()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    assert _post(conn)[0] == 200
+    conn.close()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+
+
+@pytest.mark.skipif(not app.FASTAPI_AVAILABLE, reason="fastapi not installed")
+def test_health_matches_fastapi(fallback_server):
+    from fastapi.testclient import TestClient
+
+    port, thread = fallback_server(max_requests=1)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", "/health")
+    fallback = json.loads(conn.getresponse().read())
+    conn.close()
+    thread.join(timeout=10)
+    fastapi = TestClient(app.app).get("/health").json()
+    assert set(fallback) - set(fastapi) == {"connections"} and set(fastapi) <= set(fallback)
+    assert (fallback["impl"], fastapi["impl"]) == (app.FALLBACK_IMPL, app.FASTAPI_IMPL)
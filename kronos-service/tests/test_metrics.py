@@ -0,0 +1,110 @@
+import http.client
+import json
+import os
+import re
+import socket
+import threading
+
+import pytest
+
+import app
+import metrics
+from conftest import SERVICE_DIR
+from metrics import Metrics
+
+with open(os.path.join(SERVICE_DIR, "sample.json"), "rb") as f:
+    SAMPLE = f.read()
+
+
+def _value(text, series):
+    match = re.search(rf"^{re.escape(series)} (\S+)$", text, re.M)
+    return float(match.group(1)) if match else None
+
+
+@pytest.fixture()
+def fresh_metrics(monkeypatch):
+    table = Metrics()
+    monkeypatch.setattr(metrics, "METRICS", table)
+    monkeypatch.setattr(app.cache, "CACHE", app.cache.ForecastCache(16, 60))
+    return table
+
+
+def test_histograms_are_cumulative_and_regions_sum():
+    table = Metrics(regions=2, shared=True)
+    table.observe_stage("compute", 0.003)
+    table.observe_stage("compute", 5.0)
+    table.observe_batch(3)
+    pid = os.fork()
+    if pid == 0:  # a pre-forked worker writes its own region of the shared table
+        table.attach(1)
+        table.observe_request("/forecast", 200, 0.95)
+        table.count_cache(1, 0)
+        os._exit(0)
+    os.waitpid(pid, 0)
+    text = table.render()
+    assert _value(text, 'kronos_stage_seconds_bucket{stage="compute",le="0.0025"}') == 0
+    assert _value(text, 'kronos_stage_seconds_bucket{stage="compute",le="0.005"}') == 1
+    assert _value(text, 'kronos_stage_seconds_bucket{stage="compute",le="+Inf"}') == 2
+    assert _value(text, 'kronos_stage_seconds_sum{stage="compute"}') == pytest.approx(5.003)
+    assert _value(text, 'kronos_batch_size_bucket{le="4"}') == 1
+    assert _value(text, 'kronos_requests_total{path="/forecast",status="200"}') == 1
+    assert _value(text, 'kronos_request_seconds_bucket{path="/forecast",le="0.9"}') == 0
+    assert _value(text, 'kronos_request_seconds_bucket{path="/forecast",le="1.2"}') == 1
+    assert _value(text, "kronos_cache_hit_ratio") == 1.0
+    table.observe_request("/nope?x=1", 418, 0.001)
+    assert _value(table.render(), 'kronos_requests_total{path="other",status="other"}') == 1
+    with pytest.raises(ValueError):
+        table.attach(2)
+
+
+def _check(text):
+    assert _value(text, 'kronos_requests_total{path="/forecast",status="200"}') == 2
+    assert _value(text, 'kronos_requests_total{path="/forecast/batch",status="200"}') == 1
+    for stage in ("read", "decode", "validate", "compute", "encode"):
+        assert _value(text, f'kronos_stage_seconds_count{{stage="{stage}"}}') >= 3, stage
+    assert _value(text, 'kronos_batch_size_bucket{le="2"}') == 1
+    # the second /forecast and both batch items repeat the first series
+    assert _value(text, 'kronos_cache_lookups_total{result="hit"}') == 3
+    assert _value(text, 'kronos_cache_lookups_total{result="miss"}') == 1
+
+
+def test_fallback_server_metrics(fresh_metrics):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(16)
+    thread = threading.Thread(target=app.run_fallback_server, kwargs={"sock": sock, "max_requests": 5}, daemon=True)
+    thread.start()
+    conn = http.client.HTTPConnection("127.0.0.1", sock.getsockname()[1], timeout=5)
+    batch = json.dumps({"items": [json.loads(SAMPLE)] * 2})
+    for path, body in (("/forecast", SAMPLE), ("/forecast", SAMPLE), ("/forecast/batch", batch)):
+        conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        assert (resp.status, resp.read()[:1]) == (200, b"{")
+    conn.request("GET", "/health")
+    conn.getresponse().read()
+    conn.request("GET", "/metrics")
+    resp = conn.getresponse()
+    text = resp.read().decode()
+    assert resp.status == 200 and resp.getheader("Content-Type").startswith("text/plain; version=0.0.4")
+    _check(text)
+    assert _value(text, 'kronos_requests_total{path="/health",status="200"}') == 1
+    conn.close()
+    thread.join(timeout=10)
+    sock.close()
+
+
+@pytest.mark.skipif(not app.FASTAPI_AVAILABLE, reason="fastapi not installed")
+def test_fastapi_metrics(fresh_metrics):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(app.app)
+    headers = {"Content-Type": "application/json"}
+    assert client.post("/forecast", content=SAMPLE, headers=headers).status_code == 200
+    assert client.post("/forecast", content=SAMPLE, headers=headers).status_code == 200
+    batch = json.dumps({"items": [json.loads(SAMPLE)] * 2})
+    assert client.post("/forecast/batch", content=batch, headers=headers).status_code == 200
+    assert client.post("/forecast", content=b"{}", headers=headers).status_code == 422
+    resp = client.get("/metrics")
+    assert resp.status_code == 200 and resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    _check(resp.text)
+    assert _value(resp.text, 'kronos_requests_total{path="/forecast",status="422"}') == 1
@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+import app
+from conftest import ROWS
+from models import ModelRegistry, ModelUnavailable, UnknownModel
+
+
+def test_models_load_lazily_once():
+    calls = []
+    registry = ModelRegistry(default="flat")
+
+    def load():
+        calls.append(1)
+        return lambda series: [{"long": 0.5, "short": 0.5, "conf": 0.1} for _ in series]
+
+    registry.register("flat", "2.0.0", load)
+    spec = registry.resolve()
+    assert (spec.state, calls) == ("registered", [])
+    assert registry.status()["models"]["flat"]["state"] == "registered"  # status does not load
+    assert spec.scorer()([ROWS]) == [{"long": 0.5, "short": 0.5, "conf": 0.1}]
+    spec.scorer()
+    assert (spec.state, calls) == ("ready", [1])
+    with pytest.raises(UnknownModel):
+        registry.resolve("missing")
+
+
+def test_background_preload_and_failures():
+    gate = threading.Event()
+    registry = ModelRegistry(default="slow")
+    registry.register("slow", "1", lambda: gate.wait(5) and (lambda series: []))
+    registry.register("broken", "1", lambda: 1 / 0)
+    thread = registry.preload(["*"])
+    assert registry.resolve("slow").state == "loading"  # readable while the loader runs
+    gate.set()
+    thread.join(5)
+    status = registry.status()["models"]
+    assert status["slow"]["state"] == "ready"
+    assert status["broken"]["state"] == "failed" and "division" in status["broken"]["error"]
+    with pytest.raises(ModelUnavailable):
+        registry.resolve("broken").scorer()
+
+
+def test_requests_select_model_and_record_it(service_models):
+    registry = service_models(cache_size=16)
+    registry.register("simple_signal", "0.1.0", lambda: __import__("signal_engine").score_many)
+    registry.register(
+        "flat", "2.0.0", lambda: lambda series: [{"long": 0.5, "short": 0.5, "conf": 0.1}] * len(series)
+    )
+
+    item = {"symbol": "ETH-USDT-SWAP", "interval": "1m", "ohlcv": ROWS, "last_ts": ROWS[-1][0]}
+    default = app.build_batch([item], "test")["results"][0]
+    flat = app.build_batch([item], "test", default_model="flat")["results"][0]
+    assert (default["meta"]["model"], default["meta"]["version"]) == ("simple_signal", "0.1.0")
+    assert (flat["meta"]["model"], flat["meta"]["version"], flat["confidence"]) == ("flat", "2.0.0", 0.1)
+    assert not flat["meta"]["cached"]  # the cache key includes the model
+    both = app.build_batch([dict(item, model="flat"), item], "test")["results"]
+    assert [r["meta"]["model"] for r in both] == ["flat", "simple_signal"]
+    assert all(r["meta"]["cached"] for r in both)
+    with pytest.raises(UnknownModel):
+        app.build_batch([dict(item, model="nope")], "test")
@@ -0,0 +1,72 @@
+import math
+import random
+
+import pytest
+
+import rolling
+from signal_engine import signal_from_closes, signal_from_stats
+
+
+def _series(count, seed=7):
+    rnd = random.Random(seed)
+    price, out = 3000.0, []
+    for _ in range(count):
+        price = max(1.0, price + rnd.gauss(0.0, 4.0))
+        out.append(price)
+    return out
+
+
+def _abs_diff_sum(window):
+    return math.fsum(abs(window[i] - window[i - 1]) for i in range(1, len(window)))
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if not rolling.NUMPY_AVAILABLE:
+            pytest.skip("numpy backend not active")
+    else:
+        monkeypatch.setattr(rolling, "NUMPY_AVAILABLE", False)
+    return request.param
+
+
+@pytest.mark.parametrize("window,anchor_every", [(1, 256), (20, 256), (199, 7), (1000, 256)])
+def test_rolling_sums_match_exact_window_sums(backend, window, anchor_every):
+    values = _series(3000)
+    sums = rolling.rolling_sum(values, window, anchor_every)
+    diffs = rolling.rolling_abs_diff_sum(values, window, anchor_every)
+    for i in range(0, len(values), 17):
+        lo = max(0, i - window + 1)
+        assert sums[i] == pytest.approx(math.fsum(values[lo : i + 1]), rel=1e-13)
+        assert diffs[i] == pytest.approx(_abs_diff_sum(values[lo : i + 1]), rel=1e-12, abs=1e-9)
+
+
+def test_anchoring_bounds_drift_on_long_series():
+    if not rolling.NUMPY_AVAILABLE:
+        pytest.skip("numpy backend not active")
+    np = rolling.np
+    values = np.asarray(_series(200_000, seed=3)) + 1e6
+    sums = rolling.rolling_sum(values, 20)
+    # plain prefix-sum differences over the same series, for comparison
+    prefix = np.concatenate(([0.0], np.cumsum(values)))
+    plain = prefix[20:] - prefix[:-20]
+    exact = np.array([math.fsum(values[i - 19 : i + 1]) for i in range(19, len(values), 101)])
+    anchored_err = np.max(np.abs(sums[19::101] - exact) / exact)
+    plain_err = np.max(np.abs(plain[::101] - exact) / exact)
+    assert anchored_err < 1e-14 < plain_err
+
+
+def test_signal_stats_match_the_live_scorer(backend):
+    closes = _series(900)
+    for lookback, close_window, avg_window in [(480, 200, 20), (30, 200, 20), (120, 50, 80)]:
+        n, avg, vol = rolling.signal_stats(closes, lookback, close_window, avg_window)
+        for i in range(0, len(closes), 23):
+            window = closes[max(0, i - lookback + 1) : i + 1][-close_window:]
+            k = min(avg_window, len(window))
+            assert n[i] == min(i + 1, lookback)
+            assert avg[i] == pytest.approx(sum(window[-k:]) / k, rel=1e-12)
+            assert vol[i] == pytest.approx(_abs_diff_sum(window) / max(1, len(window) - 1))
+    # the live scorer computes the same statistics for the last window
+    n, avg, vol = rolling.signal_stats(closes, 480, 200, 20)
+    expected = signal_from_stats(int(n[-1]), closes[-1], avg[-1], vol[-1])
+    assert signal_from_closes(closes[-480:], 480) == pytest.approx(expected, rel=1e-12)
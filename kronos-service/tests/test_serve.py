@@ -0,0 +1,25 @@
+import signal
+import time
+
+import serve
+
+
+def test_supervisor_backs_off_and_gives_up_on_workers_failing_at_startup(monkeypatch):
+    def broken_worker(sock, max_requests):
+        raise RuntimeError("model path does not exist")
+
+    forks = []
+    spawn = serve.Supervisor.spawn
+    monkeypatch.setattr(serve, "run_worker", broken_worker)
+    monkeypatch.setattr(serve, "BACKOFF_S", 0.05)
+    monkeypatch.setattr(serve, "MAX_FAST_FAILURES", 4)
+    monkeypatch.setattr(serve.Supervisor, "spawn", lambda self: forks.append(time.monotonic()) or spawn(self))
+    handlers = {sig: signal.getsignal(sig) for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP)}
+    try:
+        code = serve.Supervisor("127.0.0.1", 0, workers=1, reuse_port=False, max_requests=0).run()
+    finally:
+        for sig, handler in handlers.items():
+            signal.signal(sig, handler)
+    assert code == 1 and len(forks) == 4  # the fourth fast failure in a row stops the supervisor
+    gaps = [later - earlier for earlier, later in zip(forks, forks[1:])]
+    assert [gap >= 0.05 * 2**k for k, gap in enumerate(gaps)] == [True] * 3  # 0.05s, 0.1s, 0.2s
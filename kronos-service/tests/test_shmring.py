@@ -0,0 +1,135 @@
+import http.client
+import json
+import os
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+import app
+import cache
+import metrics
+import shmring
+from shmring import Ring, RingClient, RingServer
+
+ROWS = [[1_700_000_000_000 + i * 60_000, 1.0, 2.0, 0.5, 100.0 + (i % 7), 10.0] for i in range(120)]
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost", timeout=5)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+@pytest.fixture()
+def ring_server(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE", cache.ForecastCache(128, 60))
+    rings = tmp_path / "rings"
+    rings.mkdir()
+    monkeypatch.setattr(shmring, "RING_DIR", str(rings))
+    path = str(tmp_path / "ring.sock")
+    server = RingServer(shmring.bind_unix(path), app._ring_forecast, threads=2, max_connections=2, ring_dir=str(rings))
+    server.start()
+    yield path, server
+    server.close()
+
+
+def _client(path, **kwargs):
+    return RingClient(path, max_rows=256, ring_dir=shmring.RING_DIR, **kwargs)
+
+
+def test_fallback_server_on_unix_socket(tmp_path):
+    path = str(tmp_path / "http.sock")
+    sock = shmring.bind_unix(path)
+    thread = threading.Thread(target=app.run_fallback_server, kwargs={"sock": sock, "max_requests": 3}, daemon=True)
+    thread.start()
+    conn = UnixHTTPConnection(path)
+    for _ in range(2):  # kept alive across requests like a TCP connection
+        conn.request("POST", "/forecast", body=json.dumps({"symbol": "ETH", "interval": "1m", "ohlcv": ROWS}))
+        resp = conn.getresponse()
+        assert resp.status == 200 and "score_long" in json.loads(resp.read())
+    conn.request("GET", "/health")
+    assert json.loads(conn.getresponse().read())["status"] == "ok"
+    conn.close()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+    sock.close()
+
+
+def test_ring_round_trip_matches_http_path(ring_server):
+    path, server = ring_server
+    client = _client(path)
+    expected = app.build_batch([{"symbol": "ETH", "interval": "1m", "ohlcv": ROWS[:100]}], "test")["results"][0]
+    out = client.forecast(ROWS, "ETH-USDT-SWAP", "1m")
+    assert out["status"] == 200 and not out["cached"]
+    assert (out["score_long"], out["score_short"], out["confidence"]) != (0.0, 0.0, 0.0)
+    again = client.forecast(ROWS, "ETH-USDT-SWAP", "1m", budget_ms=500)
+    assert again["cached"] and again["score_long"] == out["score_long"]
+    assert client.forecast(ROWS[:100])["score_long"] == pytest.approx(expected["score_long"])
+
+    assert client.forecast(ROWS, model="missing")["status"] == 400
+    assert client.forecast(ROWS, budget_ms=-1)["status"] == 400
+    with pytest.raises(ValueError):
+        client.forecast(ROWS * 3)  # more rows than the ring was created for
+    assert server.stats() == {"connections": 1, "calls": 5, "rejected": 0}
+    assert 'kronos_requests_total{path="shm",status="400"}' in metrics.METRICS.render()
+    client.close()
+
+
+def test_ring_rejects_files_that_are_not_rings(ring_server, tmp_path):
+    path, _ = ring_server
+    rings = tmp_path / "rings"
+    junk = rings / "kronos-ring-junk"
+    junk.write_bytes(b"\0" * 4096)
+    Ring.create(str(tmp_path / "kronos-ring-outside"), slots=1, max_rows=8).close()  # well formed, wrong place
+    Ring.create(str(rings / "other-ring"), slots=1, max_rows=8).close()  # right place, wrong name
+    os.symlink(tmp_path / "kronos-ring-outside", rings / "kronos-ring-link")
+    targets = [junk, rings / "kronos-ring-missing", tmp_path / "kronos-ring-outside", rings / "other-ring"]
+    targets += [rings / "kronos-ring-link", rings / ".." / "kronos-ring-outside", "/etc/passwd"]
+    if os.geteuid() == 0:  # only root can hand a file to another user
+        Ring.create(str(rings / "kronos-ring-foreign"), slots=1, max_rows=8).close()
+        os.chown(rings / "kronos-ring-foreign", 12345, -1)
+        targets.append(rings / "kronos-ring-foreign")
+    for target in map(str, targets):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(5)
+            conn.connect(path)
+            conn.sendall(struct.pack("<I", len(target)) + target.encode())
+            assert struct.unpack("<I", conn.recv(4))[0] == 400
+    ring = Ring.create(str(tmp_path / "ok"), slots=2, max_rows=8)
+    assert Ring.open(str(tmp_path / "ok")).slots == 2 and os.path.getsize(tmp_path / "ok") % 64 == 0
+    ring.close()
+
+
+@pytest.mark.parametrize("cell", [(-1, 4), (-1, 0)])
+def test_ring_rejects_non_finite_rows(ring_server, cell):
+    path, _ = ring_server
+    client = _client(path)
+    rows = [list(r) for r in ROWS]
+    rows[cell[0]][cell[1]] = float("nan")
+    assert client.forecast(rows)["status"] == 400
+    assert cache.CACHE.stats()["size"] == 0
+    client.close()
+
+
+def test_ring_server_caps_connections(ring_server):
+    path, server = ring_server
+    clients = [_client(path) for _ in range(2)]
+    with pytest.raises(ConnectionError):
+        _client(path)  # max_connections=2: refused at the handshake, before any thread is started
+    assert server.stats()["rejected"] == 1 and clients[0].forecast(ROWS)["status"] == 200
+    clients.pop().close()
+    deadline = time.monotonic() + 5
+    while server.stats()["connections"] > 1:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    clients.append(_client(path))
+    for client in clients:
+        client.close()
@@ -0,0 +1,63 @@
+import json
+import os
+
+import pytest
+
+from conftest import REPO_DIR, SERVICE_DIR
+import signal_engine
+from signal_engine import NUMPY_AVAILABLE, SignalParams, np, score_many, score_series, simple_signal, simple_signal_np
+
+if not NUMPY_AVAILABLE:
+    pytest.skip("numpy backend not active", allow_module_level=True)
+
+HISTORY_FILE = os.path.join(REPO_DIR, "data", "real_historical_data_2022_2024.json")
+WINDOW_LENGTHS = [5, 10, 11, 20, 21, 199, 200, 201, 480, 512]
+
+
+def _assert_parity(batch):
+    ref = [simple_signal(series) for series in batch]
+    got = simple_signal_np(np.asarray(batch, dtype=np.float64))
+    for key in ("long", "short", "conf"):
+        assert got[key].shape == (len(batch),)
+        assert got[key] == pytest.approx([r[key] for r in ref], rel=1e-9, abs=1e-12)
+
+
+@pytest.fixture(scope="module")
+def history_rows():
+    if not os.path.exists(HISTORY_FILE):
+        pytest.skip("historical candle file not available")
+    with open(HISTORY_FILE, "r", encoding="utf-8") as f:
+        candles = json.load(f)
+    return [[c["timestamp"], c["open"], c["high"], c["low"], c["close"], c["volume"]] for c in candles]
+
+
+def test_parity_on_sample():
+    with open(os.path.join(SERVICE_DIR, "sample.json"), "r", encoding="utf-8") as f:
+        ohlcv = json.load(f)["ohlcv"]
+    for n in range(1, len(ohlcv) + 1):
+        _assert_parity([ohlcv[:n]])
+
+
+@pytest.mark.parametrize("length", WINDOW_LENGTHS)
+def test_parity_on_historical_windows(history_rows, length):
+    step = max(1, (len(history_rows) - length) // 64)
+    batch = [history_rows[end - length:end] for end in range(length, len(history_rows) + 1, step)]
+    _assert_parity(batch)
+
+
+def test_flat_series_uses_unit_vol():
+    flat = [[0, 1.0, 1.0, 1.0, 100.0, 1.0]] * 50
+    _assert_parity([flat])
+
+
+def test_score_many_mixed_lengths_keeps_order(history_rows):
+    series = [history_rows[:30], history_rows[100:580], history_rows[:3], history_rows[40:70]]
+    assert score_many(series) == [pytest.approx(simple_signal(s), rel=1e-9) for s in series]
+
+
+def test_score_series_follows_close_window(history_rows, monkeypatch):
+    params = SignalParams(close_window=50)
+    monkeypatch.setattr(signal_engine, "DEFAULT_PARAMS", params)
+    rows = history_rows[:480]
+    closes = np.asarray([r[4] for r in rows], dtype=np.float64)
+    assert score_series(closes) == pytest.approx(simple_signal(rows, params), rel=1e-12)
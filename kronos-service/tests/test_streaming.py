@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+import app
+from conftest import REPO_DIR, ROWS
+from signal_engine import simple_signal
+from streaming import REANCHOR_EVERY, StreamNotFound, StreamRegistry, StreamState
+
+HISTORY_FILE = os.path.join(REPO_DIR, "data", "historical_data.json")
+
+
+@pytest.fixture(scope="module")
+def history_rows():
+    if not os.path.exists(HISTORY_FILE):
+        pytest.skip("historical candle file not available")
+    with open(HISTORY_FILE, "r", encoding="utf-8") as f:
+        candles = json.load(f)
+    return [[c["timestamp"], c["open"], c["high"], c["low"], c["close"], c["volume"]] for c in candles]
+
+
+@pytest.mark.parametrize("lookback", [480, 200, 50, 15])
+def test_incremental_matches_full_window(history_rows, lookback):
+    rows = history_rows[: lookback + 3 * REANCHOR_EVERY]
+    state = StreamState(lookback)
+    state.apply(rows[:5])
+    for end in range(6, len(rows) + 1):
+        state.apply([rows[end - 1]])
+        expected = simple_signal(rows[max(0, end - lookback):end])
+        assert state.signal() == pytest.approx(expected, rel=1e-9, abs=1e-12)
+
+
+def test_same_timestamp_replaces_last_candle(history_rows):
+    rows = [list(r) for r in history_rows[:300]]
+    state = StreamState()
+    state.apply(rows)
+    revised = list(rows[-1])
+    revised[4] += 12.5
+    assert state.apply([rows[-2], revised]) == 1  # older row ignored, last one replaced
+    assert state.signal() == pytest.approx(simple_signal(rows[:-1] + [revised]), rel=1e-9)
+
+
+def test_registry_requires_reset_for_unknown_stream(history_rows):
+    reg = StreamRegistry(max_streams=2)
+    with pytest.raises(StreamNotFound):
+        reg.update("ETH-USDT-SWAP", "15m", history_rows[:1])
+    reg.update("A", "1H", history_rows[:100], reset=True)
+    reg.update("B", "1H", history_rows[:100], reset=True)
+    reg.update("C", "1H", history_rows[:100], reset=True)
+    assert len(reg) == 2
+    with pytest.raises(StreamNotFound):
+        reg.update("A", "1H", history_rows[100:101])
+    sig, info = reg.update("B", "1H", history_rows[100:101])
+    assert info["n"] == 101 and info["applied"] == 1
+    assert sig == pytest.approx(simple_signal(history_rows[:101]), rel=1e-9)
+
+
+def test_stream_endpoint_resets_refuses_and_validates(service_post, monkeypatch):
+    monkeypatch.setattr(app, "STREAMS", StreamRegistry())
+    stream = {"symbol": "ETH-USDT-SWAP", "interval": "1m"}
+    status, payload = service_post("/forecast/stream", dict(stream, ohlcv=ROWS[:1]))
+    assert (status, payload["error"]) == (409, "stream_not_found")
+    status, payload = service_post("/forecast/stream", dict(stream, ohlcv=ROWS[:200], reset=True))
+    assert (status, payload["meta"]["stream"]) == (200, {"applied": 200, "last_ts": ROWS[199][0]})
+
+    for bad in (
+        [ROWS[200][:4]],  # too few columns
+        [ROWS[200], ROWS[201][:5]],  # mixed widths
+        [ROWS[201], ROWS[200]],  # out of time order
+    ):
+        status, payload = service_post("/forecast/stream", dict(stream, ohlcv=bad))
+        assert (status, payload["error"]) == (400, "bad_request")
+    # rejected by pydantic on FastAPI, by wire.decode_stream_item on the fallback
+    rejected = 422 if service_post.server == "fastapi" else 400
+    for bad in (
+        dict(stream, ohlcv=[ROWS[200], ["x"] + ROWS[201][1:]]),  # a later row with a bad timestamp
+        dict(stream, ohlcv=[ROWS[200]], lookback=0),
+        dict(stream, ohlcv=ROWS[:200], reset=True, lookback=1000),
+    ):
+        assert service_post("/forecast/stream", bad)[0] == rejected
+    status, payload = service_post("/forecast/stream", dict(stream, ohlcv=[ROWS[200]]))
+    assert (status, payload["meta"]["stream"]["applied"]) == (200, 1)  # the rejected bodies applied nothing
+    _, full = service_post("/forecast/stream", dict(stream, ohlcv=ROWS[:201], reset=True))
+    assert (payload["score_long"], payload["score_short"]) == pytest.approx((full["score_long"], full["score_short"]))
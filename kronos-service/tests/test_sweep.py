@@ -0,0 +1,57 @@
+import pytest
+
+import sweep
+from signal_engine import DEFAULT_PARAMS, NUMPY_AVAILABLE, SignalParams, np, simple_signal
+
+if not NUMPY_AVAILABLE:
+    pytest.skip("numpy backend not active", allow_module_level=True)
+
+CLOSES = np.array([100.0 + 5.0 * np.sin(i / 7.0) + 0.03 * i + (i % 5) * 0.2 for i in range(700)])
+
+
+def _rows(closes):
+    return [[i, 0.0, 0.0, 0.0, float(c), 0.0] for i, c in enumerate(closes)]
+
+
+@pytest.mark.parametrize(
+    "params,lookback",
+    [(DEFAULT_PARAMS, 480), (SignalParams(50, 7, 1.5, 0.3, 0.6, 0.2, 100.0), 120), (SignalParams(1, 1), 30)],
+)
+def test_signals_match_simple_signal(params, lookback):
+    sig = sweep.signals(CLOSES, params, lookback)
+    for i in range(0, len(CLOSES), 11):
+        expected = simple_signal(_rows(CLOSES[max(0, i - lookback + 1) : i + 1]), params)
+        got = {key: sig[key][i] for key in ("long", "short", "conf")}
+        assert got == pytest.approx(expected, rel=1e-9, abs=1e-9)
+
+
+def test_sweep_matches_brute_force():
+    grid = sweep.parse_grid(
+        ["avg_window=10,20", "slope_scale=2,3", "long_threshold=0.55:0.65:0.05", "min_confidence=0.5,0.6"]
+    )
+    assert sweep.combinations(grid) == 24
+    rows = list(sweep.sweep(CLOSES, grid, lookback=300, horizon=3))
+    assert len(rows) == 24
+    for row in rows[::5]:
+        params = SignalParams(*(row[name] for name in SignalParams._fields))
+        sig = sweep.signals(CLOSES, params, 300)
+        trades = hits = 0
+        total = 0.0
+        for i in range(len(CLOSES) - 3):
+            ret = CLOSES[i + 3] / CLOSES[i] - 1.0
+            if sig["conf"][i] < row["min_confidence"]:
+                continue
+            if sig["long"][i] > sig["short"][i] and sig["long"][i] >= row["long_threshold"]:
+                trades, hits, total = trades + 1, hits + (ret > 0), total + ret
+            elif sig["short"][i] > sig["long"][i] and sig["short"][i] >= row["short_threshold"]:
+                trades, hits, total = trades + 1, hits + (ret < 0), total - ret
+        assert (row["trades"], row["hit_rate"]) == (trades, pytest.approx(hits / trades))
+        assert row["total_return"] == pytest.approx(total, rel=1e-9)
+
+
+def test_parse_grid_rejects_unknown_names():
+    assert sweep.parse_values("avg_window", "5:20:5") == [5, 10, 15, 20]
+    with pytest.raises(ValueError):
+        sweep.parse_grid(["window=1"])
+    with pytest.raises(ValueError):
+        sweep.parse_grid(["close_window=0,10"])
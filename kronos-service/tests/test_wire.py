@@ -0,0 +1,182 @@
+import gzip
+import http.client
+import json
+import os
+
+import pytest
+
+import app
+import wire
+from conftest import ROWS, SERVICE_DIR
+from signal_engine import score_series, simple_signal
+
+
+@pytest.fixture(scope="module")
+def sample():
+    with open(os.path.join(SERVICE_DIR, "sample.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_roundtrip_scores_like_json(sample, monkeypatch, use_numpy):
+    if use_numpy and not wire.NUMPY_AVAILABLE:
+        pytest.skip("numpy not installed")
+    monkeypatch.setattr(wire, "NUMPY_AVAILABLE", use_numpy)
+    body = wire.encode_ohlcv(sample["ohlcv"])
+    assert len(body) == len(sample["ohlcv"]) * 6 * 8
+    for payload, encoding in ((body, None), (gzip.compress(body), "gzip")):
+        rows = wire.decode_ohlcv(payload, content_encoding=encoding)
+        assert [list(map(float, r)) for r in rows] == [list(map(float, r)) for r in sample["ohlcv"]]
+        assert score_series(rows) == pytest.approx(simple_signal(sample["ohlcv"]), rel=1e-12)
+
+
+def test_decode_request_reads_headers(sample):
+    headers = {
+        wire.HEADER_SYMBOL: "ETH-USDT-SWAP",
+        wire.HEADER_INTERVAL: "1H",
+        wire.HEADER_COLUMNS: "5",
+    }
+    body = wire.encode_ohlcv([row[:5] for row in sample["ohlcv"]])
+    data = wire.decode_request(body, headers)
+    assert (data["symbol"], data["interval"], len(data["ohlcv"])) == ("ETH-USDT-SWAP", "1H", len(sample["ohlcv"]))
+
+
+def test_rejects_truncated_body(sample):
+    body = wire.encode_ohlcv(sample["ohlcv"])
+    with pytest.raises(ValueError):
+        wire.decode_ohlcv(body[:-1])
+    with pytest.raises(ValueError):
+        wire.decode_ohlcv(body, columns=4)
+
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+@pytest.mark.parametrize("cell", [(-1, 4), (0, 4), (-1, 0)])  # a close anywhere, the last timestamp
+@pytest.mark.parametrize("bad", [float("nan"), float("inf")])
+def test_binary_rejects_non_finite_values(sample, monkeypatch, use_numpy, cell, bad):
+    if use_numpy and not wire.NUMPY_AVAILABLE:
+        pytest.skip("numpy not installed")
+    monkeypatch.setattr(wire, "NUMPY_AVAILABLE", use_numpy)
+    rows = [list(r) for r in sample["ohlcv"]]
+    rows[cell[0]][cell[1]] = bad
+    with pytest.raises(ValueError):
+        wire.decode_ohlcv(wire.encode_ohlcv(rows))
+    rows[0][0] = bad  # earlier timestamps are never read
+    rows[cell[0]][cell[1]] = sample["ohlcv"][cell[0]][cell[1]]
+    assert len(wire.decode_ohlcv(wire.encode_ohlcv(rows))) == len(rows)
+
+
+def test_binary_forecast_with_nan_close_is_a_client_error(sample, service_post, monkeypatch):
+    monkeypatch.setattr(app.cache, "CACHE", app.cache.ForecastCache(16, 60))
+    rows = [list(r) for r in sample["ohlcv"]]
+    rows[-1][4] = float("nan")
+    headers = {"Content-Type": wire.OCTET_STREAM, wire.HEADER_SYMBOL: "ETH-USDT-SWAP", wire.HEADER_INTERVAL: "1H"}
+    status, payload = service_post("/forecast", wire.encode_ohlcv(rows), headers)
+    assert (status, payload["error"]) == (400, "bad_request")
+    assert app.cache.CACHE.stats()["size"] == 0  # nothing was scored or cached
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_coerce_ohlcv_extracts_closes(sample, monkeypatch, use_numpy):
+    if use_numpy and not wire.NUMPY_AVAILABLE:
+        pytest.skip("numpy not installed")
+    monkeypatch.setattr(wire, "NUMPY_AVAILABLE", use_numpy)
+    closes = wire.coerce_ohlcv(sample["ohlcv"])
+    assert list(closes) == [float(r[4]) for r in sample["ohlcv"]]
+    assert score_series(closes) == pytest.approx(simple_signal(sample["ohlcv"]), rel=1e-12)
+    assert len(wire.coerce_ohlcv([])) == 0
+
+
+@pytest.mark.parametrize(
+    "rows",
+    [
+        "not-a-list",
+        [[1, 2, 3, 4]],
+        [[1, 2, 3, 4, 5, 6], [1, 2, 3, 4, 5]],
+        [[1, 2, 3, 4, float("nan"), 6]],
+        [[1, 2, 3, 4, None, 6]],
+        [(1, 2, 3, 4, 5, 6)],
+    ],
+)
+def test_coerce_ohlcv_rejects_bad_grids(rows):
+    with pytest.raises(ValueError):
+        wire.coerce_ohlcv(rows)
+
+
+def test_decode_json_request_strictness():
+    body = json.dumps({"ohlcv": [[1, 2, 3, 4, 5, 6]]}).encode()
+    with pytest.raises(ValueError):
+        wire.decode_json_request(body)
+    data = wire.decode_json_request(body, strict=False)
+    assert (data["symbol"], data["interval"], len(data["ohlcv"])) == ("UNKNOWN", "UNKNOWN", 1)
+
+
+@pytest.mark.parametrize("ts", ["soon", [1], None, float("inf")])
+def test_decode_json_item_rejects_bad_last_timestamp(ts):
+    rows = [[1, 2, 3, 4, 5, 6], [ts, 2, 3, 4, 5, 6]]
+    with pytest.raises(ValueError):
+        wire.decode_json_item({"symbol": "ETH", "interval": "1m", "ohlcv": rows})
+    assert wire.decode_json_item({"symbol": "ETH", "interval": "1m", "ohlcv": rows[:1]})["last_ts"] == 1.0
+
+
+@pytest.mark.skipif(not app.FASTAPI_AVAILABLE, reason="fastapi not installed")
+def test_bad_last_timestamp_is_a_client_error():
+    from fastapi.testclient import TestClient
+
+    item = {"symbol": "ETH", "interval": "1m", "ohlcv": [[1, 2, 3, 4, 5, 6], ["soon", 2, 3, 4, 5, 6]]}
+    client = TestClient(app.app)
+    assert client.post("/forecast", json=item).status_code == 422
+    assert client.post("/forecast/batch", json={"items": [item]}).status_code == 422
+
+
+BATCH = {"items": [{"symbol": f"ETH-{n}", "interval": "1m", "ohlcv": ROWS[:n]} for n in (300, 60, 180)]}
+
+
+def _without_impl(results):
+    return [dict(r, meta={k: v for k, v in r["meta"].items() if k != "impl"}) for r in results]
+
+
+def test_batch_endpoint_keeps_item_order_and_rejects_malformed_items(service_post, monkeypatch):
+    monkeypatch.setattr(app.cache, "CACHE", app.cache.ForecastCache(0, 60))
+    status, payload = service_post("/forecast/batch", BATCH)
+    assert status == 200
+    assert [(r["meta"]["symbol"], r["meta"]["n"]) for r in payload["results"]] == [
+        ("ETH-300", 300), ("ETH-60", 60), ("ETH-180", 180)
+    ]
+    expected = app.build_batch([wire.decode_json_item(it) for it in BATCH["items"]], "test")["results"]
+    assert _without_impl(payload["results"]) == _without_impl(expected)
+
+    rejected = 422 if service_post.server == "fastapi" else 400
+    for bad in ([[1, 2, 3]], [r[:4] + ["x", r[5]] for r in ROWS[:5]]):  # too few columns; non-numeric close
+        items = BATCH["items"][:1] + [dict(BATCH["items"][1], ohlcv=bad)]
+        assert service_post("/forecast/batch", {"items": items})[0] == rejected
+    assert service_post("/forecast/batch", {"items": "ETH"})[0] == rejected
+
+
+@pytest.mark.skipif(not app.FASTAPI_AVAILABLE, reason="fastapi not installed")
+def test_batch_bodies_use_the_fast_parser(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    parsed = []
+    monkeypatch.setattr(wire, "_loads", lambda body: parsed.append(len(body)) or json.loads(body))
+    client = TestClient(app.app)
+    assert client.post("/forecast/batch", json=BATCH).status_code == 200
+    headers = {"Content-Type": "application/json"}
+    assert client.post("/forecast/batch", content=b"{bad", headers=headers).status_code == 422
+    assert len(parsed) == 2
+
+
+@pytest.mark.skipif(not app.FASTAPI_AVAILABLE, reason="fastapi not installed")
+def test_batch_endpoint_matches_across_servers(fallback_server, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(app.cache, "CACHE", app.cache.ForecastCache(0, 60))
+    fastapi = TestClient(app.app).post("/forecast/batch", json=BATCH).json()["results"]
+    port, thread = fallback_server(max_requests=1)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("POST", "/forecast/batch", body=json.dumps(BATCH), headers={"Content-Type": "application/json"})
+    fallback = json.loads(conn.getresponse().read())["results"]
+    conn.close()
+    thread.join(timeout=10)
+    assert [r["meta"]["impl"] for r in fallback + fastapi] == [app.FALLBACK_IMPL] * 3 + [app.FASTAPI_IMPL] * 3
+    assert _without_impl(fallback) == _without_impl(fastapi)
@@ -0,0 +1,215 @@
+# Binary OHLCV wire format
+# - Body: packed little-endian float64, row-major, `columns` values per row (default 6:
+#   timestamp(ms), open, high, low, close, volume); optionally gzip-compressed
+# - Symbol/interval/columns travel in X-Kronos-* headers instead of a JSON envelope
+# JSON bodies are decoded here too: the OHLCV grid is checked in bulk and only closes are extracted
+
+from typing import Any, Dict, List, Mapping, Optional
+from array import array
+import gzip
+import json
+import math
+import sys
+
+from signal_engine import NUMPY_AVAILABLE, np
+
+try:  # pydantic-core ships with FastAPI/pydantic and parses JSON well ahead of the json module
+    from pydantic_core import from_json as _loads
+except Exception:
+    _loads = json.loads
+
+OCTET_STREAM = "application/octet-stream"
+DEFAULT_COLUMNS = 6
+HEADER_SYMBOL = "X-Kronos-Symbol"
+HEADER_INTERVAL = "X-Kronos-Interval"
+HEADER_COLUMNS = "X-Kronos-Columns"
+HEADER_MODEL = "X-Kronos-Model"  # model selection for any body type; a JSON "model" field wins
+
+
+def is_binary(content_type: Optional[str]) -> bool:
+    return (content_type or "").split(";")[0].strip().lower() == OCTET_STREAM
+
+
+def decode_ohlcv(body: bytes, columns: int = DEFAULT_COLUMNS, content_encoding: Optional[str] = None) -> Any:
+    """Decode a packed float64 body into rows.
+
+    Returns a read-only (rows, columns) numpy view over the body when numpy is available,
+    otherwise a list of row lists built from array('d'). Raises ValueError when a close or the
+    last timestamp is NaN or infinite, as coerce_ohlcv does for JSON rows.
+    """
+    if (content_encoding or "").strip().lower() == "gzip":
+        body = gzip.decompress(body)
+    if columns < 5:
+        raise ValueError("ohlcv needs at least 5 columns (close is column 4)")
+    row_bytes = 8 * columns
+    if len(body) % row_bytes:
+        raise ValueError(f"body length {len(body)} is not a multiple of {row_bytes} bytes")
+    rows = len(body) // row_bytes
+
+    if NUMPY_AVAILABLE:
+        grid = np.frombuffer(body, dtype="<f8").reshape(rows, columns)
+        finite = not rows or bool(np.isfinite(grid[:, 4]).all() and np.isfinite(grid[-1, 0]))
+    else:
+        flat = array("d")
+        flat.frombytes(body)
+        if sys.byteorder != "little":
+            flat.byteswap()
+        grid = [flat[i * columns:(i + 1) * columns].tolist() for i in range(rows)]
+        finite = not rows or (all(math.isfinite(r[4]) for r in grid) and math.isfinite(grid[-1][0]))
+    if not finite:
+        raise ValueError("ohlcv close column and last timestamp must be finite")
+    return grid
+
+
+def decode_request(body: bytes, headers: Mapping[str, str]) -> dict:
+    """Build the same dict a JSON /forecast body would produce from a binary request.
+
+    `headers` may be http.server's message or starlette's Headers; both look up case-insensitively.
+    """
+    columns = int(headers.get(HEADER_COLUMNS) or DEFAULT_COLUMNS)
+    ohlcv = decode_ohlcv(body, columns, headers.get("Content-Encoding"))
+    return {
+        "symbol": headers.get(HEADER_SYMBOL) or "UNKNOWN",
+        "interval": headers.get(HEADER_INTERVAL) or "UNKNOWN",
+        "ohlcv": ohlcv,
+        "last_ts": float(ohlcv[-1][0]) if len(ohlcv) else None,
+        "model": headers.get(HEADER_MODEL) or None,
+    }
+
+
+def encode_ohlcv(rows: Any) -> bytes:
+    """Pack OHLCV rows as little-endian float64 (used by clients, benchmarks and tests)."""
+    if NUMPY_AVAILABLE:
+        return np.ascontiguousarray(rows, dtype="<f8").tobytes()
+    flat = array("d", (float(v) for row in rows for v in row))
+    if sys.byteorder != "little":
+        flat.byteswap()
+    return flat.tobytes()
+
+
+def coerce_ohlcv(rows: Any) -> Any:
+    """Validate JSON OHLCV rows in bulk and return only what the signal engine reads.
+
+    Checks that rows form a rectangular grid with >= 5 columns, then pulls the close column
+    into one float64 vector (numpy array, or array('d') without numpy) and checks it for
+    finiteness in a single pass. Other columns are never converted to floats.
+    """
+    if rows is None:
+        rows = []
+    if not isinstance(rows, list):
+        raise ValueError("ohlcv must be a list of rows")
+    widths = set(map(len, rows)) if all(isinstance(r, list) for r in rows) else None
+    if widths is None:
+        raise ValueError("ohlcv rows must be lists")
+    if len(widths) > 1:
+        raise ValueError(f"ohlcv rows have mixed widths {sorted(widths)}")
+    if widths and min(widths) < 5:
+        raise ValueError(f"ohlcv rows need at least 5 columns, got {min(widths)}")
+    try:
+        if NUMPY_AVAILABLE:
+            closes = np.fromiter((r[4] for r in rows), dtype=np.float64, count=len(rows))
+            finite = bool(np.isfinite(closes).all())
+        else:
+            closes = array("d", (r[4] for r in rows))
+            finite = all(map(math.isfinite, closes))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"ohlcv close column must be numeric: {e}") from None
+    if not finite:
+        raise ValueError("ohlcv close column contains non-finite values")
+    return closes
+
+
+def _last_ts(rows: List[Any]) -> float:
+    # the last row's timestamp keys the result cache; the other timestamps are never read
+    try:
+        ts = float(rows[-1][0])
+    except (TypeError, ValueError):
+        raise ValueError("ohlcv timestamps must be numbers (ms)") from None
+    if not math.isfinite(ts):
+        raise ValueError("ohlcv timestamps must be finite")
+    return ts
+
+
+def decode_json_item(data: Any, strict: bool = True) -> Dict[str, Any]:
+    """Validate one forecast item dict; strict mode requires symbol and interval strings."""
+    if not isinstance(data, dict):
+        raise ValueError("request body must be a JSON object")
+    out: Dict[str, Any] = {}
+    for field in ("symbol", "interval"):
+        value = data.get(field)
+        if value is None and not strict:
+            value = "UNKNOWN"
+        if not isinstance(value, str):
+            raise ValueError(f"{field} is required and must be a string")
+        out[field] = value
+    if strict and "ohlcv" not in data:
+        raise ValueError("ohlcv is required")
+    rows = data.get("ohlcv")
+    out["ohlcv"] = coerce_ohlcv(rows)
+    out["last_ts"] = _last_ts(rows) if rows else None
+    model = data.get("model")
+    if model is not None and not isinstance(model, str):
+        raise ValueError("model must be a string")
+    out["model"] = model or None
+    return out
+
+
+def decode_ref_item(data: Any, max_lookback: int = 512) -> Dict[str, Any]:
+    """Validate a /forecast/ref body: {symbol, interval, end_ts, lookback?, model?}."""
+    if not isinstance(data, dict):
+        raise ValueError("request body must be a JSON object")
+    out: Dict[str, Any] = {}
+    for field in ("symbol", "interval"):
+        if not isinstance(data.get(field), str):
+            raise ValueError(f"{field} is required and must be a string")
+        out[field] = data[field]
+    end_ts = data.get("end_ts")
+    if isinstance(end_ts, bool) or not isinstance(end_ts, (int, float)) or not math.isfinite(end_ts):
+        raise ValueError("end_ts is required and must be a number (ms)")
+    out["end_ts"] = end_ts
+    lookback = data.get("lookback", 480)
+    if isinstance(lookback, bool) or not isinstance(lookback, int) or not 1 <= lookback <= max_lookback:
+        raise ValueError(f"lookback must be an integer between 1 and {max_lookback}")
+    out["lookback"] = lookback
+    model = data.get("model")
+    if model is not None and not isinstance(model, str):
+        raise ValueError("model must be a string")
+    out["model"] = model or None
+    return out
+
+
+def decode_stream_item(data: Any, max_lookback: int = 512) -> Dict[str, Any]:
+    """Validate a /forecast/stream body's candles, reset flag and lookback.
+
+    A stream applies its rows one at a time, so everything is checked up front: besides the
+    coerce_ohlcv grid, every timestamp must be a finite number and the rows must be in time
+    order (an equal timestamp revises the forming candle).
+    """
+    if not isinstance(data, dict):
+        raise ValueError("request body must be a JSON object")
+    rows = data.get("ohlcv") or []
+    coerce_ohlcv(rows)
+    prev = -math.inf
+    for row in rows:
+        ts = row[0]
+        if isinstance(ts, bool) or not isinstance(ts, (int, float)) or not math.isfinite(ts):
+            raise ValueError("ohlcv timestamps must be finite numbers (ms)")
+        if ts < prev:
+            raise ValueError("ohlcv rows must be in time order")
+        prev = ts
+    lookback = data.get("lookback")
+    if lookback is not None and (
+        isinstance(lookback, bool) or not isinstance(lookback, int) or not 1 <= lookback <= max_lookback
+    ):
+        raise ValueError(f"lookback must be an integer between 1 and {max_lookback}")
+    return {"ohlcv": rows, "reset": bool(data.get("reset")), "lookback": lookback}
+
+
+def loads(body: bytes) -> Any:
+    """Parse a JSON body, with pydantic-core's parser when it is installed."""
+    return _loads(body) if body else {}
+
+
+def decode_json_request(body: bytes, strict: bool = True) -> Dict[str, Any]:
+    """Parse a /forecast JSON body and validate it with decode_json_item."""
+    return decode_json_item(loads(body), strict)
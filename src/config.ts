@@ -271,6 +271,16 @@ export const config = {
             timeoutMs: Number(process.env.KRONOS_TIMEOUT_MS || 1200),
             interval: process.env.KRONOS_INTERVAL || '1H',
             lookback: Number(process.env.KRONOS_LOOKBACK || 480),
+            // 请求编码：'json' 或 'binary'（小端 float64 行数据）
+            wire: process.env.KRONOS_WIRE || 'json',
+            // 服务端模型名（空则使用服务默认模型）
+            model: process.env.KRONOS_MODEL || '',
+            // 'true' 时按引用请求 /forecast/ref（服务端从本地 K 线库读取历史，缺失时回退为发送数据）
+            byRef: process.env.KRONOS_BY_REF === 'true',
+            // 到服务的 keep-alive 连接数上限（复用连接，免去每次请求的 TCP 握手）
+            maxSockets: Number(process.env.KRONOS_MAX_SOCKETS || 16),
+            // 同机部署时经 Unix 域套接字访问服务（服务端 KRONOS_UDS），为空则走 baseUrl 的 TCP
+            socketPath: process.env.KRONOS_SOCKET_PATH || '',
             longThreshold: Number(process.env.KRONOS_LONG_THRESHOLD || 0.62),
             shortThreshold: Number(process.env.KRONOS_SHORT_THRESHOLD || 0.62),
             minConfidence: Number(process.env.KRONOS_MIN_CONFIDENCE || 0.55),
@@ -1,4 +1,6 @@
 import axios, { AxiosInstance } from 'axios';
+import * as http from 'http';
+import * as https from 'https';
 import NodeCache from 'node-cache';
 import { config } from '../config.js';
 
@@ -16,6 +18,11 @@ export interface KronosForecast {
   meta?: Record<string, any>;
 }
 
+const DEGRADED_TTL_S = 5;
+// below the service's keep-alive idle timeout (KRONOS_KEEPALIVE_S, 5s), so a request never
+// goes out on a socket the service is about to close
+const IDLE_SOCKET_MS = 4000;
+
 export class KronosClient {
   private http: AxiosInstance;
   private cache: NodeCache;
@@ -23,6 +30,10 @@ export class KronosClient {
   private timeoutMs: number;
   private baseUrl: string;
   private localMode: boolean;
+  private binaryWire: boolean;
+  private byRef: boolean;
+  // last candle timestamp the service holds per `${symbol}:${interval}` stream
+  private streamTs: Map<string, number> = new Map();
 
   constructor() {
     const k = (config as any)?.strategy?.kronos || {};
@@ -30,7 +41,26 @@ export class KronosClient {
     this.timeoutMs = Number(k.timeoutMs ?? 1000);
     this.baseUrl = String(k.baseUrl ?? 'http://localhost:8001');
     this.localMode = /^local|^mock|^none/i.test(this.baseUrl);
-    this.http = axios.create({ baseURL: this.baseUrl, timeout: this.timeoutMs });
+    this.binaryWire = String(k.wire ?? 'json').toLowerCase() === 'binary';
+    // ask for forecasts by (symbol, interval, end_ts) when the service holds the history itself
+    this.byRef = !!k.byRef;
+    // optional model selection; the service default is used when empty
+    const model = String(k.model ?? '');
+    // persistent connections: no TCP handshake per forecast, at most maxSockets open
+    const agent = { keepAlive: true, maxSockets: Number(k.maxSockets ?? 16), timeout: IDLE_SOCKET_MS };
+    this.http = axios.create({
+      baseURL: this.baseUrl,
+      timeout: this.timeoutMs,
+      httpAgent: new http.Agent(agent),
+      httpsAgent: new https.Agent(agent),
+      // co-located service on a Unix socket (KRONOS_UDS): no TCP stack; baseURL still supplies the paths
+      ...(k.socketPath ? { socketPath: String(k.socketPath) } : {}),
+      headers: {
+        ...(model ? { 'X-Kronos-Model': model } : {}),
+        // our timeout as the service's deadline: it sheds work we would no longer wait for
+        'X-Kronos-Budget-Ms': String(this.timeoutMs)
+      }
+    });
     this.cache = new NodeCache({ stdTTL: 30, useClones: false });
   }
 
@@ -59,11 +89,19 @@ export class KronosClient {
     }
 
     try {
-      const res = await this.http.post('/forecast', {
-        symbol: input.symbol,
-        interval: input.interval,
-        ohlcv: series
-      });
+      const res = (await this.postRef(input.symbol, input.interval, series, lookback)) ?? (this.binaryWire
+        ? await this.http.post('/forecast', encodeOhlcv(series), {
+            headers: {
+              'Content-Type': 'application/octet-stream',
+              'X-Kronos-Symbol': input.symbol,
+              'X-Kronos-Interval': input.interval
+            }
+          })
+        : await this.http.post('/forecast', {
+            symbol: input.symbol,
+            interval: input.interval,
+            ohlcv: series
+          }));
       const data = res?.data as KronosForecast;
       if (!data || !isFinite(data.score_long) || !isFinite(data.score_short)) {
         // fall back locally if response malformed
@@ -77,7 +115,7 @@ export class KronosClient {
         confidence: clamp01(data.confidence ?? 0.5),
         meta: { ...(data.meta || {}), impl: (data as any)?.meta?.impl || 'http' }
       };
-      this.cache.set(key, sanitized);
+      this.remember(key, sanitized);
       return sanitized;
     } catch (_err) {
       // Graceful local fallback on error/timeout
@@ -87,6 +125,149 @@ export class KronosClient {
     }
   }
 
+  // Forecast by reference: null when disabled or when the service lacks history up to our last candle
+  private async postRef(
+    symbol: string,
+    interval: string,
+    series: KronosForecastInput['ohlcv'],
+    lookback: number
+  ) {
+    if (!this.byRef || !series.length) return null;
+    const endTs = series[series.length - 1][0];
+    try {
+      const res = await this.http.post('/forecast/ref', {
+        symbol,
+        interval,
+        end_ts: endTs,
+        lookback: Math.min(lookback, series.length)
+      });
+      // the stored history may lag behind our latest candle: only accept an exact match
+      return res?.data?.meta?.ref?.last_ts === endTs ? res : null;
+    } catch (err: any) {
+      if (err?.response?.status !== 404) throw err;
+      return null;
+    }
+  }
+
+  // Incremental forecast: seeds a server-side stream once, then sends only new candles
+  async forecastIncremental(input: KronosForecastInput): Promise<KronosForecast | null> {
+    if (!this.enabled || this.localMode) return this.forecast(input);
+
+    const lookback = Math.min(
+      Number((config as any)?.strategy?.kronos?.lookback ?? 480),
+      512
+    );
+    const series = input.ohlcv.slice(-lookback);
+    const key = this.cacheKey(input.symbol, input.interval, series);
+    const cached = this.cache.get<KronosForecast>(key);
+    if (cached) return cached;
+
+    const streamKey = `${input.symbol}:${input.interval}`;
+    const post = (reset: boolean) => {
+      const lastTs = this.streamTs.get(streamKey);
+      const rows = reset || lastTs === undefined ? series : series.filter(r => r[0] >= lastTs);
+      return this.http.post('/forecast/stream', {
+        symbol: input.symbol,
+        interval: input.interval,
+        ohlcv: rows,
+        reset: reset || lastTs === undefined,
+        lookback
+      });
+    };
+
+    try {
+      let res;
+      try {
+        res = await post(false);
+      } catch (err: any) {
+        // service restarted or evicted our stream: resend the full window
+        if (err?.response?.status !== 409) throw err;
+        res = await post(true);
+      }
+      const data = res?.data as KronosForecast;
+      if (!data || !isFinite(data.score_long) || !isFinite(data.score_short)) {
+        throw new Error('malformed stream response');
+      }
+      if (series.length) this.streamTs.set(streamKey, series[series.length - 1][0]);
+      const sanitized: KronosForecast = {
+        score_long: clamp01(data.score_long),
+        score_short: clamp01(data.score_short),
+        confidence: clamp01(data.confidence ?? 0.5),
+        meta: { ...(data.meta || {}), impl: (data as any)?.meta?.impl || 'http' }
+      };
+      this.remember(key, sanitized);
+      return sanitized;
+    } catch (_err) {
+      this.streamTs.delete(streamKey);
+      const local = computeLocalForecast(series, input.symbol, input.interval, 'local-fallback');
+      this.cache.set(key, local);
+      return local;
+    }
+  }
+
+  // Batched forecast: one HTTP round-trip for every cache miss, results in input order
+  async forecastBatch(inputs: KronosForecastInput[]): Promise<Array<KronosForecast | null>> {
+    if (!this.enabled) return inputs.map(() => null);
+
+    const lookback = Math.min(
+      Number((config as any)?.strategy?.kronos?.lookback ?? 480),
+      512
+    );
+    const out: Array<KronosForecast | null> = new Array(inputs.length).fill(null);
+    const pending: Array<{ idx: number; key: string; input: KronosForecastInput; series: KronosForecastInput['ohlcv'] }> = [];
+
+    inputs.forEach((input, idx) => {
+      const series = input.ohlcv.slice(-lookback);
+      const key = this.cacheKey(input.symbol, input.interval, series);
+      const cached = this.cache.get<KronosForecast>(key);
+      if (cached) {
+        out[idx] = cached;
+      } else if (this.localMode) {
+        const local = computeLocalForecast(series, input.symbol, input.interval, 'local');
+        this.cache.set(key, local);
+        out[idx] = local;
+      } else {
+        pending.push({ idx, key, input, series });
+      }
+    });
+    if (!pending.length) return out;
+
+    let results: KronosForecast[] = [];
+    try {
+      const res = await this.http.post('/forecast/batch', {
+        items: pending.map(p => ({ symbol: p.input.symbol, interval: p.input.interval, ohlcv: p.series }))
+      });
+      results = Array.isArray(res?.data?.results) ? res.data.results : [];
+    } catch (_err) {
+      results = [];
+    }
+
+    pending.forEach((p, i) => {
+      const data = results[i];
+      let fc: KronosForecast;
+      if (!data || !isFinite(data.score_long) || !isFinite(data.score_short)) {
+        fc = computeLocalForecast(p.series, p.input.symbol, p.input.interval, 'local-fallback');
+      } else {
+        fc = {
+          score_long: clamp01(data.score_long),
+          score_short: clamp01(data.score_short),
+          confidence: clamp01(data.confidence ?? 0.5),
+          meta: { ...(data.meta || {}), impl: (data as any)?.meta?.impl || 'http' }
+        };
+      }
+      this.remember(p.key, fc);
+      out[p.idx] = fc;
+    });
+    return out;
+  }
+
+  // a degraded answer (the service scored a cheaper tier under load) is kept only briefly,
+  // so the full model's answer is picked up once the service has recovered
+  private remember(key: string, fc: KronosForecast): void {
+    if (fc.meta?.degraded) this.cache.set(key, fc, DEGRADED_TTL_S);
+    else this.cache.set(key, fc);
+  }
+
   private cacheKey(symbol: string, interval: string, series: KronosForecastInput['ohlcv']): string {
     const lastTs = series.length ? series[series.length - 1][0] : 0;
     const len = series.length;
@@ -94,6 +275,19 @@ export class KronosClient {
   }
 }
 
+// Pack rows as little-endian float64, the service's application/octet-stream format
+function encodeOhlcv(series: KronosForecastInput['ohlcv']): Buffer {
+  const buf = Buffer.alloc(series.length * 6 * 8);
+  let off = 0;
+  for (const row of series) {
+    for (let j = 0; j < 6; j++) {
+      buf.writeDoubleLE(Number(row[j]), off);
+      off += 8;
+    }
+  }
+  return buf;
+}
+
 function clamp01(x: number): number {
   if (!Number.isFinite(x)) return 0;
   if (x < 0) return 0;